@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import argparse
+import cProfile
+import json
+import pstats
+import random
+import time
+
+from sandcastle.processor.cluster import assign_clusters
+from sandcastle.processor.dedupe import dedupe_items
+from sandcastle.processor.terms import build_terms
+
+CLUSTERS = [
+    {"cluster_id": "focus_journal", "keywords": ["focus", "deep work", "concentration", "attention"]},
+    {"cluster_id": "gratitude", "keywords": ["gratitude", "positive", "thankful"]},
+    {"cluster_id": "shadow_work", "keywords": ["shadow work", "inner child", "healing"]},
+    {"cluster_id": "adhd_planner", "keywords": ["adhd", "executive function", "task paralysis"]},
+]
+VOCAB = [
+    "focus", "deep", "work", "journal", "printable", "planner", "gratitude", "positive", "shadow",
+    "inner", "child", "healing", "adhd", "executive", "function", "daily", "weekly", "prompts",
+    "template", "checklist", "undated", "bundle", "guided", "workbook", "cards", "attention",
+]
+TRACKED = ("normalize", "tokenize", "shingles")
+
+
+def make_rows(count: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    rows = []
+    for idx in range(count):
+        rows.append(
+            {
+                "id": f"{idx:08d}",
+                "source_url": f"https://example.com/{rng.randrange(count)}",
+                "title": " ".join(rng.choice(VOCAB) for _ in range(6)),
+                "snippet": " ".join(rng.choice(VOCAB) for _ in range(20)),
+                "query": "focus journal",
+                "engine": "searxng",
+                "collected_at": f"2024-01-01T00:00:{idx % 60:02d}Z",
+            }
+        )
+    return rows
+
+
+def run_pipeline(rows: list[dict]) -> None:
+    deduped = dedupe_items(rows)
+    clusters = assign_clusters(deduped, CLUSTERS)
+    build_terms(deduped, clusters)
+
+
+def count_calls(rows: list[dict]) -> dict[str, int]:
+    profiler = cProfile.Profile()
+    profiler.runcall(run_pipeline, rows)
+    stats = pstats.Stats(profiler).stats
+    counts = {name: 0 for name in TRACKED}
+    for (filename, _, func_name), (_, ncalls, *_rest) in stats.items():
+        if func_name in counts and filename.endswith("text.py"):
+            counts[func_name] += ncalls
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tokenizer calls and wall time for dedupe/cluster/terms")
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    start = time.perf_counter()
+    run_pipeline(rows)
+    wall_s = time.perf_counter() - start
+    print(json.dumps({"rows": args.rows, "wall_s": round(wall_s, 3), "calls": count_calls(rows)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
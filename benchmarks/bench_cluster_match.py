@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+
+from sandcastle.common.text import normalize
+from sandcastle.processor.analysis import analyze_items
+from sandcastle.processor.cluster import ClusterMatcher, tag_intents
+
+VOCAB = [
+    "focus", "deep", "work", "journal", "printable", "planner", "gratitude", "positive", "shadow",
+    "inner", "child", "healing", "adhd", "executive", "function", "daily", "weekly", "prompts",
+    "template", "checklist", "undated", "bundle", "guided", "workbook", "cards", "attention",
+    "habit", "tracker", "budget", "meal", "fitness", "reading", "study", "teacher", "kids", "anxiety",
+]
+
+
+def make_clusters(count: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "cluster_id": f"cluster_{idx:04d}",
+            "keywords": [" ".join(rng.sample(VOCAB, rng.randint(1, 2))) for _ in range(rng.randint(2, 6))],
+        }
+        for idx in range(count)
+    ]
+
+
+def make_items(count: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"{idx:08d}",
+            "titles": [" ".join(rng.choice(VOCAB) for _ in range(6))],
+            "snippets": [" ".join(rng.choice(VOCAB) for _ in range(20))],
+        }
+        for idx in range(count)
+    ]
+
+
+def naive_match(item: dict, text: str, clusters: list[tuple[dict, list[str]]]) -> dict | None:
+    # The per-cluster substring scan the matcher replaced, kept as the reference.
+    best_cluster = None
+    best_hits = 0
+    for cluster, keywords in clusters:
+        hits = sum(1 for keyword in keywords if keyword in text)
+        if hits > best_hits:
+            best_hits = hits
+            best_cluster = cluster
+        elif hits == best_hits and hits > 0 and best_cluster:
+            if cluster["cluster_id"] < best_cluster["cluster_id"]:
+                best_cluster = cluster
+    if not best_cluster:
+        return None
+    tag_text = " ".join(item.get("snippets", []) + item.get("titles", []))
+    return {"cluster_id": best_cluster["cluster_id"], "intent_tags": tag_intents(tag_text)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cluster keyword matching: substring scan vs compiled automaton")
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--skip-naive", action="store_true")
+    args = parser.parse_args()
+
+    clusters = make_clusters(args.clusters)
+    items = make_items(args.items)
+    analyses = analyze_items(items)
+
+    start = time.perf_counter()
+    matcher = ClusterMatcher(clusters)
+    build_s = time.perf_counter() - start
+    start = time.perf_counter()
+    compiled = [matcher.match(item, analyses[item["id"]]) for item in items]
+    compiled_s = time.perf_counter() - start
+    result = {
+        "clusters": args.clusters,
+        "items": args.items,
+        "keywords": len(matcher.automaton.patterns),
+        "build_s": round(build_s, 3),
+        "compiled_s": round(compiled_s, 3),
+    }
+
+    if not args.skip_naive:
+        normalized = [(cluster, [normalize(keyword) for keyword in cluster["keywords"]]) for cluster in clusters]
+        start = time.perf_counter()
+        naive = [naive_match(item, analyses[item["id"]].text, normalized) for item in items]
+        result["naive_s"] = round(time.perf_counter() - start, 3)
+        result["identical"] = naive == compiled
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
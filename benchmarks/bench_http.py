@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+import requests
+
+from sandcastle.collector.searxng import SearxNGCollector
+from sandcastle.common.http import HttpTransport
+from sandcastle.common.http_stub import StubServer, searxng_route
+
+
+class UnpooledTransport:
+    def get(self, url, params=None, headers=None, timeout=10.0):
+        return requests.get(url, params=params, headers=headers, timeout=timeout)
+
+    def close(self) -> None:
+        return
+
+
+def run(transport, pages: int) -> dict:
+    with StubServer({"/search": searxng_route()}) as server:
+        collector = SearxNGCollector(server.url("/search"), rate_limit_s=0.0, transport=transport)
+        start = time.perf_counter()
+        for page in range(1, pages + 1):
+            collector.search_page("focus journal", limit=10, page=page)
+        wall_s = time.perf_counter() - start
+        return {"wall_s": round(wall_s, 4), "requests": server.requests, "connections": server.connections}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SearxNG collector against a local stub server")
+    parser.add_argument("--pages", type=int, default=50)
+    args = parser.parse_args()
+    pooled = HttpTransport()
+    report = {"pooled": run(pooled, args.pages), "unpooled": run(UnpooledTransport(), args.pages)}
+    pooled.close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from sandcastle.common.io import JsonlWriter, append_jsonl
+
+
+def make_row(idx: int) -> dict:
+    return {
+        "id": f"{idx:064x}",
+        "query": "focus journal printable",
+        "engine": "searxng",
+        "rank": idx % 10 + 1,
+        "source_url": f"https://example.com/item/{idx}",
+        "title": f"Focus journal printable {idx}",
+        "snippet": "Deep work planner with daily prompts and gratitude pages. " * 3,
+        "collected_at": "2024-01-01T00:00:00+00:00",
+        "meta": {"engine": "stub"},
+    }
+
+
+def bench_append(path: Path, rows: list[dict]) -> float:
+    start = time.perf_counter()
+    for row in rows:
+        append_jsonl(path, [row])
+    return time.perf_counter() - start
+
+
+def bench_writer(path: Path, rows: list[dict], checkpoint_every: int) -> float:
+    start = time.perf_counter()
+    with JsonlWriter(path) as writer:
+        for idx, row in enumerate(rows, start=1):
+            writer.write(row)
+            if idx % checkpoint_every == 0:
+                writer.checkpoint()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rows/sec for per-row append_jsonl vs JsonlWriter")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--checkpoint-every", type=int, default=200)
+    parser.add_argument("--dir", default=None, help="Directory to write into (e.g. a network mount)")
+    args = parser.parse_args()
+
+    rows = [make_row(idx) for idx in range(args.rows)]
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        append_s = bench_append(Path(tmp) / "append.jsonl", rows)
+        writer_s = bench_writer(Path(tmp) / "writer.jsonl", rows, args.checkpoint_every)
+    report = {
+        "rows": args.rows,
+        "append_jsonl_rows_per_s": round(args.rows / append_s),
+        "jsonl_writer_rows_per_s": round(args.rows / writer_s),
+        "checkpoint_every": args.checkpoint_every,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sandcastle.common.io import JsonlWriter, read_jsonl
+from sandcastle.common.records import RawRow, RecordDecoder, read_records
+
+MODES = ("baseline", "dicts", "records")
+
+
+def write_corpus(path: Path, rows: int) -> None:
+    with JsonlWriter(path, fsync=False) as writer:
+        for idx in range(rows):
+            writer.write(
+                {
+                    "id": f"{idx:064x}",
+                    "query": f"query {idx % 100}",
+                    "engine": "searxng",
+                    "rank": idx % 10 + 1,
+                    "source_url": f"https://example.com/item/{idx}",
+                    "title": f"Focus journal printable {idx}",
+                    "snippet": f"Deep work planner with daily prompts number {idx}",
+                    "collected_at": "2024-01-01T00:00:00+00:00",
+                    "meta": {"engine": "stub"},
+                }
+            )
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(mode: str, path: Path) -> dict:
+    start = time.perf_counter()
+    if mode == "dicts":
+        held = list(read_jsonl(path))
+    elif mode == "records":
+        decoder = RecordDecoder(RawRow)
+        held = [record for record, _ in read_records(path, decoder)]
+    else:
+        held = []
+    return {"mode": mode, "rows": len(held), "seconds": round(time.perf_counter() - start, 2), "peak_rss_mb": round(peak_rss_mb(), 1)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Peak RSS holding raw rows as dicts vs slotted records")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--mode", choices=MODES)
+    parser.add_argument("--file")
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(measure(args.mode, Path(args.file))))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "raw_results.jsonl"
+        write_corpus(path, args.rows)
+        # Each mode runs in a fresh interpreter so peaks do not leak between them.
+        report = [
+            json.loads(
+                subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_memory", "--mode", mode, "--file", str(path)],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+            )
+            for mode in MODES
+        ]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
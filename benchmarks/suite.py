@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+from pathlib import Path
+from typing import Callable
+
+from benchmarks.synthetic import CLUSTERS, REFERENCE_UTC, CorpusSpec, iter_reddit_posts, iter_web_rows, parse_scale
+from sandcastle.common.io import append_jsonl, read_jsonl
+from sandcastle.common.metrics import Metrics
+from sandcastle.common.records import RedditPostRow, record_from_dict
+from sandcastle.common.time import iso_now
+from sandcastle.processor.analysis import analyze_items
+from sandcastle.processor.cluster import assign_clusters
+from sandcastle.processor.dedupe import dedupe_items
+from sandcastle.processor.terms import build_terms
+from sandcastle.reddit.run import build_intents
+
+CASES = ("dedupe_items", "assign_clusters", "build_terms", "build_intents")
+DEFAULT_RESULTS = Path(__file__).resolve().parent / "results.jsonl"
+
+
+def git_revision() -> tuple[str | None, bool]:
+    root = Path(__file__).resolve().parents[1]
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=root, capture_output=True, text=True, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+    return commit, bool(status.strip())
+
+
+def prepare(spec: CorpusSpec) -> dict[str, Callable[[], object]]:
+    # Inputs for each case are built outside the timed region; every case times only the function it names.
+    rows = list(iter_web_rows(spec))
+    deduped = dedupe_items(rows)
+    analyses = analyze_items(deduped)
+    clusters = assign_clusters(deduped, CLUSTERS, analyses=analyses)
+    posts = [record_from_dict(RedditPostRow, post) for post in iter_reddit_posts(spec)]
+    return {
+        "dedupe_items": lambda: dedupe_items(rows),
+        "assign_clusters": lambda: assign_clusters(deduped, CLUSTERS),
+        "build_terms": lambda: build_terms(deduped, clusters),
+        "build_intents": lambda: build_intents(posts, now=REFERENCE_UTC),
+    }
+
+
+def run_case(name: str, func: Callable[[], object], rows: int, repeat: int) -> dict:
+    metrics = Metrics("bench")
+    for _ in range(repeat):
+        with metrics.stage(name) as stage:
+            func()
+            stage.rows = rows
+    best = min(metrics.stages, key=lambda stage: stage.wall_s)
+    return {**best.to_dict(), "repeat": repeat, "wall_s_all": [round(stage.wall_s, 6) for stage in metrics.stages]}
+
+
+def spec_key(name: str, spec: dict) -> tuple[str, str]:
+    return name, json.dumps(spec, sort_keys=True)
+
+
+def previous_results(path: Path) -> dict[tuple[str, str], dict]:
+    # Latest recorded run per case and corpus spec; runs on other corpus settings are not comparable.
+    latest: dict[tuple[str, str], dict] = {}
+    if not path.exists():
+        return latest
+    for record in read_jsonl(path):
+        latest[spec_key(record["name"], record.get("spec", {}))] = record
+    return latest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Processor and Reddit stage benchmarks on synthetic corpora")
+    parser.add_argument("--scales", default="1k,10k,100k", help="Comma-separated corpus sizes")
+    parser.add_argument("--cases", default=",".join(CASES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--duplicate-rate", type=float, default=0.2)
+    parser.add_argument("--snippet-words", type=int, default=20)
+    parser.add_argument("--url-variation", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--results", default=str(DEFAULT_RESULTS), help="JSONL file results are appended to")
+    parser.add_argument("--no-record", action="store_true", help="Print results without appending them")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before a case is flagged")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    cases = [case for case in args.cases.split(",") if case]
+    unknown = sorted(set(cases) - set(CASES))
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+    results_path = Path(args.results)
+    commit, dirty = git_revision()
+    baseline = previous_results(results_path)
+    run_info = {
+        "commit": commit,
+        "dirty": dirty,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "recorded_at": iso_now(),
+    }
+
+    records = []
+    regressions = []
+    for scale in args.scales.split(","):
+        rows = parse_scale(scale)
+        spec = CorpusSpec(rows, args.duplicate_rate, args.snippet_words, args.url_variation, args.seed)
+        funcs = prepare(spec)
+        for case in cases:
+            record = {**run_info, **run_case(case, funcs[case], rows, args.repeat), "spec": vars(spec)}
+            previous = baseline.get(spec_key(case, record["spec"]))
+            if previous and previous.get("wall_s"):
+                record["vs_previous"] = round(record["wall_s"] / previous["wall_s"], 3)
+                record["previous_commit"] = previous.get("commit")
+                if record["vs_previous"] > 1 + args.tolerance:
+                    regressions.append(record)
+            records.append(record)
+            summary = {key: record.get(key) for key in ("name", "rows", "wall_s", "cpu_s", "peak_rss_mb", "vs_previous")}
+            print(json.dumps(summary))
+
+    if not args.no_record:
+        append_jsonl(results_path, records)
+    for record in regressions:
+        print(
+            f"slower: {record['name']} at {record['rows']} rows is {record['vs_previous']}x "
+            f"{record['previous_commit'] or 'the previous run'}",
+            file=sys.stderr,
+        )
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import argparse
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+from sandcastle.common.hash import sha256_text
+from sandcastle.common.io import JsonlWriter
+
+VOCAB = [
+    "focus", "deep", "work", "journal", "printable", "planner", "gratitude", "positive", "shadow",
+    "inner", "child", "healing", "adhd", "executive", "function", "daily", "weekly", "prompts",
+    "template", "checklist", "undated", "bundle", "guided", "workbook", "cards", "attention",
+    "habit", "tracker", "budget", "meal", "fitness", "reading", "study", "teacher", "kids", "anxiety",
+]
+QUERIES = ["focus journal printable", "deep work planner", "adhd gratitude journal", "anxiety shadow work prompts"]
+CLUSTERS = [
+    {"cluster_id": "focus_journal", "label": "Focus", "keywords": ["focus", "deep work", "concentration", "attention"]},
+    {"cluster_id": "gratitude", "label": "Gratitude", "keywords": ["gratitude", "positive", "thankful"]},
+    {"cluster_id": "shadow_work", "label": "Shadow work", "keywords": ["shadow work", "inner child", "healing"]},
+    {"cluster_id": "adhd_planner", "label": "ADHD", "keywords": ["adhd", "executive function", "task paralysis"]},
+]
+SUBREDDITS = ["productivity", "adhd", "getdisciplined", "journaling", "selfimprovement", "studytips"]
+# URL spellings canonicalize_url folds together: tracking params, fragments, trailing slashes, scheme.
+URL_VARIANTS = ["{url}?utm_source=newsletter", "{url}#top", "{url}/", "http://{bare}", "{url}?ref=feed&utm_medium=x"]
+# Fixed "now" so Reddit timestamps (and the windows they fall in) do not drift between runs.
+REFERENCE_UTC = 1_700_000_000
+DAY_S = 86_400
+
+
+@dataclass(frozen=True)
+class CorpusSpec:
+    rows: int = 1000
+    duplicate_rate: float = 0.2
+    snippet_words: int = 20
+    url_variation: float = 0.5
+    seed: int = 0
+
+
+def _words(rng: random.Random, count: int, idx: int) -> list[str]:
+    # One rare token per text keeps unrelated rows from looking alike through the small vocabulary.
+    words = [rng.choice(VOCAB) for _ in range(count)]
+    words[rng.randrange(count)] = f"w{idx}"
+    return words
+
+
+def _mutate(rng: random.Random, words: list[str]) -> list[str]:
+    # A near-duplicate: one word replaced, the rest of the text kept.
+    mutated = list(words)
+    mutated[rng.randrange(len(mutated))] = rng.choice(VOCAB)
+    return mutated
+
+
+def iter_web_rows(spec: CorpusSpec) -> Iterator[dict]:
+    rng = random.Random(spec.seed)
+    originals: list[tuple[str, list[str], list[str]]] = []
+    for idx in range(spec.rows):
+        if originals and rng.random() < spec.duplicate_rate:
+            url, title, snippet = rng.choice(originals)
+            title, snippet = list(title), _mutate(rng, snippet)
+            if rng.random() < spec.url_variation:
+                url = rng.choice(URL_VARIANTS).format(url=url, bare=url.split("://", 1)[1])
+        else:
+            url = f"https://example{idx % 97}.com/item/{idx}"
+            title, snippet = _words(rng, 6, idx), _words(rng, spec.snippet_words, idx)
+            originals.append((url, title, snippet))
+        query = QUERIES[idx % len(QUERIES)]
+        yield {
+            "id": sha256_text(f"web|{spec.seed}|{idx}"),
+            "query": query,
+            "engine": "searxng",
+            "rank": idx % 10 + 1,
+            "source_url": url,
+            "title": " ".join(title),
+            "snippet": " ".join(snippet),
+            "collected_at": f"2024-01-{idx % 28 + 1:02d}T00:00:00+00:00",
+            "meta": {"engine": "synthetic"},
+        }
+
+
+def iter_reddit_posts(spec: CorpusSpec, windows: tuple[str, ...] = ("14d", "60d", "180d", "365d")) -> Iterator[dict]:
+    rng = random.Random(spec.seed + 1)
+    spans = {"14d": 14, "60d": 60, "180d": 180, "365d": 365}
+    originals: list[tuple[list[str], list[str]]] = []
+    for idx in range(spec.rows):
+        # Reposts reuse an earlier title, so the same phrases show up across subreddits and windows.
+        if originals and rng.random() < spec.duplicate_rate:
+            title, selftext = rng.choice(originals)
+            selftext = _mutate(rng, selftext)
+        else:
+            title, selftext = _words(rng, 8, idx), _words(rng, spec.snippet_words, idx)
+            originals.append((title, selftext))
+        age_days = rng.randrange(365)
+        window = next((label for label in windows if age_days < spans[label]), windows[-1])
+        permalink = f"https://www.reddit.com/r/{SUBREDDITS[idx % len(SUBREDDITS)]}/comments/{idx:x}/"
+        yield {
+            "id": sha256_text(permalink),
+            "query": QUERIES[idx % len(QUERIES)],
+            "window": window,
+            "source_url": permalink,
+            "title": " ".join(title),
+            "selftext": " ".join(selftext),
+            "subreddit": SUBREDDITS[idx % len(SUBREDDITS)],
+            "score": rng.randrange(200),
+            "num_comments": rng.randrange(50),
+            "created_utc": REFERENCE_UTC - age_days * DAY_S - rng.randrange(DAY_S),
+            "collected_at": "2024-01-01T00:00:00+00:00",
+            "meta": {"id": f"{idx:x}", "author": "synthetic"},
+        }
+
+
+def write_corpus(path: str | Path, rows: Iterator[dict]) -> int:
+    count = 0
+    with JsonlWriter(path, fsync=False) as writer:
+        for row in rows:
+            writer.write(row)
+            count += 1
+    return count
+
+
+def parse_scale(value: str) -> int:
+    value = value.strip().lower()
+    if value.endswith("k"):
+        return int(float(value[:-1]) * 1000)
+    if value.endswith("m"):
+        return int(float(value[:-1]) * 1_000_000)
+    return int(value)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write a deterministic synthetic web or Reddit JSONL corpus")
+    parser.add_argument("kind", choices=("web", "reddit"))
+    parser.add_argument("--rows", default="10k", help="Row count, e.g. 1000, 10k, 1m")
+    parser.add_argument("--duplicate-rate", type=float, default=0.2)
+    parser.add_argument("--snippet-words", type=int, default=20)
+    parser.add_argument("--url-variation", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    spec = CorpusSpec(parse_scale(args.rows), args.duplicate_rate, args.snippet_words, args.url_variation, args.seed)
+    rows = iter_web_rows(spec) if args.kind == "web" else iter_reddit_posts(spec)
+    print(write_corpus(args.out, rows))
+
+
+if __name__ == "__main__":
+    main()
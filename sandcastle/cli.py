@@ -2,14 +2,19 @@ from __future__ import annotations
 
 import argparse
 import sys
+from pathlib import Path
 
 from sandcastle.collector.run import run_collect
-from sandcastle.config import load_config
+from sandcastle.config import Config, load_config, resolve_path
 from sandcastle.processor.run import run_process
 from sandcastle.reddit.run import run_reddit
-from sandcastle.common.io import count_file
+from sandcastle.common.codec import set_codec
+from sandcastle.common.counting import count_file
 from sandcastle.common.logging import setup_logging
+from sandcastle.common.metrics import Metrics, set_metrics, write_metrics
+from sandcastle.common.segments import StorageSettings, set_storage
 from sandcastle.doctor import run_doctor
+from sandcastle.export import EXPORT_SOURCES, run_export
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -18,15 +23,39 @@ def build_parser() -> argparse.ArgumentParser:
 
     collect = sub.add_parser("collect", help="Run web collectors")
     collect.add_argument("--config", required=True)
+    collect.add_argument("--profile", action="store_true", help="Write cProfile pstats for each stage")
+    collect.add_argument("--offline", action="store_true", help="Replay cached HTTP responses only")
 
     reddit = sub.add_parser("reddit", help="Run Reddit anchor")
     reddit.add_argument("--config", required=True)
+    reddit.add_argument("--profile", action="store_true", help="Write cProfile pstats for each stage")
+    reddit.add_argument("--offline", action="store_true", help="Replay cached HTTP responses only")
+    reddit.add_argument(
+        "--intents-only", action="store_true", help="Rebuild intents from stored posts without fetching"
+    )
 
     process = sub.add_parser("process", help="Run processor")
     process.add_argument("--config", required=True)
+    process.add_argument("--profile", action="store_true", help="Write cProfile pstats for each stage")
+    process.add_argument("--full-rebuild", action="store_true", help="Ignore saved state and reprocess all rows")
+    process.add_argument("--workers", type=int, default=1, help="Worker processes for shingling/MinHash")
 
     count = sub.add_parser("count", help="Count JSONL objects")
     count.add_argument("--file", required=True)
+    count.add_argument("--json-codec", default="auto", help="auto, orjson, msgspec or stdlib")
+    count.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    count.add_argument(
+        "--fields-only", action="store_true", help="Decode only id/engine/query (uses msgspec when installed)"
+    )
+    count.add_argument("--no-cache", action="store_true", help="Ignore and do not write the .stats sidecar")
+
+    export = sub.add_parser("export", help="Write Parquet copies of the raw, Reddit and deduped outputs")
+    export.add_argument("--config", required=True)
+    export.add_argument(
+        "--dataset", action="append", choices=sorted(EXPORT_SOURCES), help="Dataset to export (repeatable; default all)"
+    )
+    export.add_argument("--out-dir", help="Directory for <dataset>.parquet (default outputs.export_dir)")
+    export.add_argument("--since", help="Only rows collected at or after this ISO8601 time")
 
     doctor = sub.add_parser("doctor", help="Check config and environment")
     doctor.add_argument("--config", required=True)
@@ -34,30 +63,51 @@ def build_parser() -> argparse.ArgumentParser:
     return parser
 
 
+def _output(config: Config, key: str, default: str) -> Path:
+    return resolve_path(config.path.parent, config.outputs.get(key, default))
+
+
+def run_command(args: argparse.Namespace, config: Config) -> None:
+    if args.command == "collect":
+        run_collect(config, offline=args.offline)
+    elif args.command == "reddit":
+        run_reddit(config, offline=args.offline, fetch=not args.intents_only)
+    elif args.command == "process":
+        run_process(config, full_rebuild=args.full_rebuild, workers=args.workers)
+
+
 def main(argv: list[str] | None = None) -> None:
     parser = build_parser()
     args = parser.parse_args(argv)
     setup_logging()
 
-    if args.command == "collect":
-        config = load_config(args.config)
-        run_collect(config)
-        return
-    if args.command == "reddit":
-        config = load_config(args.config)
-        run_reddit(config)
-        return
-    if args.command == "process":
-        config = load_config(args.config)
-        run_process(config)
-        return
     if args.command == "count":
-        count_file(args.file)
+        set_codec(args.json_codec)
+        count_file(args.file, args.workers, args.fields_only, use_cache=not args.no_cache)
+        return
+
+    config = load_config(args.config)
+    set_codec(config.io.get("json_codec", "auto"))
+    set_storage(StorageSettings.from_config(config.io.get("segments") or {}))
+    if args.command in ("collect", "reddit", "process"):
+        metrics = set_metrics(Metrics(args.command, _output(config, "profiles", "data/profiles") if args.profile else None))
+        try:
+            run_command(args, config)
+        finally:
+            prometheus = config.outputs.get("metrics_prometheus")
+            write_metrics(
+                metrics,
+                _output(config, "metrics", "data/metrics.json"),
+                resolve_path(config.path.parent, prometheus) if prometheus else None,
+            )
         return
     if args.command == "doctor":
-        config = load_config(args.config)
         run_doctor(config)
         return
+    if args.command == "export":
+        for dataset, path in run_export(config, args.dataset, args.out_dir, args.since).items():
+            print(f"{dataset}: {path}")
+        return
 
     parser.print_help()
     sys.exit(1)
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
 import logging
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Container
 from urllib.parse import urlparse
 
 from sandcastle.collector.base import SearchResult
@@ -10,7 +15,12 @@ from sandcastle.collector.searxng import SearxNGCollector
 from sandcastle.collector.ddg import DuckDuckGoCollector
 from sandcastle.collector.brave import BraveCollector
 from sandcastle.common.hash import sha256_text
-from sandcastle.common.io import append_jsonl, read_jsonl
+from sandcastle.common.http import HttpSettings, build_transport
+from sandcastle.common.http_cache import CacheSettings, ResponseCache, cache_transport, open_cache
+from sandcastle.common.io import JsonlWriter
+from sandcastle.common.metrics import get_metrics
+from sandcastle.common.rate_limit import RateLimitError
+from sandcastle.common.seen import SeenIndex
 from sandcastle.common.text import normalize
 from sandcastle.common.time import iso_now
 from sandcastle.common.url import canonicalize_url
@@ -25,8 +35,19 @@ COLLECTOR_MAP = {
 }
 
 
-def build_collectors(config: Config):
+def _state_path(config: Config, value: str | None) -> Path | None:
+    return resolve_path(config.path.parent, value) if value else None
+
+
+def open_response_cache(config: Config, offline: bool = False) -> tuple[CacheSettings, ResponseCache | None]:
+    settings = CacheSettings.from_config(config.http.get("cache") or {}).with_offline(offline)
+    return settings, open_cache(settings, resolve_path(config.path.parent, settings.path))
+
+
+def build_collectors(config: Config, cache: ResponseCache | None = None, cache_settings: CacheSettings | None = None):
     collectors = []
+    transport = build_transport(HttpSettings.from_config(config.http))
+    cache_settings = cache_settings or CacheSettings()
     for engine in config.engines:
         name = engine.get("name")
         if name not in COLLECTOR_MAP:
@@ -38,6 +59,9 @@ def build_collectors(config: Config):
                     rate_limit_s=engine.get("rate_limit_s", 1.0),
                     timeout_s=engine.get("timeout_s", 10.0),
                     pages=int(engine.get("pages", 1)),
+                    transport=cache_transport(transport, cache, cache_settings, name),
+                    burst=int(engine.get("burst", 1)),
+                    rate_limit_state=_state_path(config, engine.get("rate_limit_state")),
                 )
             )
         elif name == "ddg":
@@ -70,78 +94,181 @@ def is_blocked(url: str, blocked_domains: list[str]) -> bool:
     return any(blocked in domain for blocked in blocked_domains)
 
 
-def run_collect(config: Config) -> None:
+@dataclass(frozen=True)
+class CollectLimits:
+    per_query: int
+    per_engine: int
+    no_new_pages: int
+    blocked_domains: list[str]
+
+
+class CollectBudget:
+    def __init__(self, global_max: int, max_minutes: int):
+        self.global_max = global_max
+        self.deadline = time.monotonic() + max_minutes * 60
+        self.stop = threading.Event()
+
+    def expired(self) -> bool:
+        if time.monotonic() > self.deadline:
+            self.stop.set()
+        return self.stop.is_set()
+
+    def engine_done(self, engine_ids: set[str]) -> bool:
+        # An engine never needs more than global_max rows of its own; the writer makes the actual cut.
+        return len(engine_ids) >= self.global_max or self.expired()
+
+
+@dataclass
+class QueryResult:
+    rows: list[dict] = field(default_factory=list)
+
+
+def collect_query(
+    collector,
+    query: str,
+    known_ids: Container[str],
+    engine_ids: set[str],
+    limits: CollectLimits,
+    budget: CollectBudget,
+) -> QueryResult:
+    result = QueryResult()
+    if budget.expired():
+        return result
+
+    def accept(search_result: SearchResult) -> bool:
+        if is_blocked(search_result.url, limits.blocked_domains):
+            return False
+        row = result_to_row(search_result)
+        if row["id"] in known_ids or row["id"] in engine_ids or budget.engine_done(engine_ids):
+            return False
+        result.rows.append(row)
+        engine_ids.add(row["id"])
+        return True
+
+    try:
+        if isinstance(collector, SearxNGCollector):
+            no_new_pages = 0
+            for page in range(1, collector.pages + 1):
+                if budget.expired():
+                    break
+                page_results = collector.search_page(query, limits.per_engine, page)
+                if not page_results:
+                    break
+                added_in_page = 0
+                for search_result in page_results:
+                    if accept(search_result):
+                        added_in_page += 1
+                    if len(result.rows) >= limits.per_query or budget.engine_done(engine_ids):
+                        break
+                if added_in_page == 0:
+                    no_new_pages += 1
+                    if no_new_pages >= limits.no_new_pages:
+                        logger.info("No new unique items, stopping for %s", collector.name)
+                        break
+                if len(result.rows) >= limits.per_query or budget.engine_done(engine_ids):
+                    break
+        else:
+            for search_result in collector.search(query, limit=limits.per_engine):
+                accept(search_result)
+                if len(result.rows) >= limits.per_query or budget.engine_done(engine_ids):
+                    break
+    except RuntimeError as exc:
+        logger.warning("Collector error: %s", exc)
+        if isinstance(exc, RateLimitError):
+            # Only this query is cut short; the engine moves on to the next one.
+            logger.info("Rate limit reached, skipping rest of %r for %s", query, collector.name)
+    return result
+
+
+def run_engine(
+    collector,
+    queries: list[str],
+    known_ids: Container[str],
+    limits: CollectLimits,
+    budget: CollectBudget,
+    results: dict[tuple[int, int], Future],
+    engine_idx: int,
+) -> None:
+    # Workers only collect; cross-engine dedupe and the global_max cut happen on the writing thread, in
+    # query x engine order, so the output does not depend on which engine answers first.
+    engine_ids: set[str] = set()
+    stopped = False
+    for query_idx, query in enumerate(queries):
+        future = results[(query_idx, engine_idx)]
+        if stopped or budget.engine_done(engine_ids):
+            future.set_result(QueryResult())
+            continue
+        try:
+            outcome = collect_query(collector, query, known_ids, engine_ids, limits, budget)
+        except Exception as exc:  # noqa: BLE001
+            future.set_exception(exc)
+            stopped = True
+            continue
+        future.set_result(outcome)
+
+
+def wait_for(future: Future, writer: JsonlWriter) -> QueryResult:
+    # Waiting on a slower engine is an idle point: rows already buffered still reach disk on the flush interval.
+    while True:
+        try:
+            return future.result(timeout=writer.flush_interval_s)
+        except TimeoutError:
+            writer.maybe_flush()
+
+
+def run_collect(config: Config, offline: bool = False) -> None:
     output_path = resolve_path(config.path.parent, config.outputs.get("raw_results", "data/raw_results.jsonl"))
     limits = config.limits
-    per_query = int(limits.get("per_query", 50))
-    per_engine = int(limits.get("per_engine", 50))
+    collect_limits = CollectLimits(
+        per_query=int(limits.get("per_query", 50)),
+        per_engine=int(limits.get("per_engine", 50)),
+        no_new_pages=int(limits.get("no_new_pages", 3)),
+        blocked_domains=config.raw.get("filters", {}).get("blocked_domains", []),
+    )
     global_max = int(limits.get("global_max", 1000))
     max_minutes = int(limits.get("max_minutes", 10))
-    no_new_pages_limit = int(limits.get("no_new_pages", 3))
 
-    blocked_domains = config.raw.get("filters", {}).get("blocked_domains", [])
+    cache_settings, cache = open_response_cache(config, offline)
+    collectors = build_collectors(config, cache, cache_settings)
+    queries = config.queries
+    budget = CollectBudget(global_max, max_minutes)
 
-    collectors = build_collectors(config)
-    existing_ids = {row.get("id") for row in read_jsonl(output_path)}
-
-    start_time = time.monotonic()
+    results: dict[tuple[int, int], Future] = {
+        (query_idx, engine_idx): Future()
+        for query_idx in range(len(queries))
+        for engine_idx in range(len(collectors))
+    }
     total_added = 0
+    with (
+        get_metrics().stage("fetch") as stage,
+        cache if cache is not None else nullcontext(),
+        SeenIndex(output_path) as seen_ids,
+        JsonlWriter(output_path) as writer,
+        ThreadPoolExecutor(max_workers=max(1, len(collectors)), thread_name_prefix="collect") as pool,
+    ):
+        # Engines judge "new" against the ids present when the run started; rows two engines both found
+        # are dropped below, keeping the first in query x engine order.
+        known_ids = seen_ids.snapshot()
+        for engine_idx, collector in enumerate(collectors):
+            pool.submit(run_engine, collector, queries, known_ids, collect_limits, budget, results, engine_idx)
 
-    for query in config.queries:
-        for collector in collectors:
-            added_for_combo = 0
-            no_new_pages = 0
-            try:
-                if isinstance(collector, SearxNGCollector):
-                    for page in range(1, collector.pages + 1):
-                        page_results = collector.search_page(query, per_engine, page)
-                        if not page_results:
-                            break
-                        added_in_page = 0
-                        for result in page_results:
-                            if is_blocked(result.url, blocked_domains):
-                                continue
-                            row = result_to_row(result)
-                            if row["id"] in existing_ids:
-                                continue
-                            append_jsonl(output_path, [row])
-                            existing_ids.add(row["id"])
-                            added_for_combo += 1
-                            added_in_page += 1
-                            total_added += 1
-                            if added_for_combo >= per_query or total_added >= global_max:
-                                break
-                            if time.monotonic() - start_time > max_minutes * 60:
-                                logger.info("Max minutes reached")
-                                return
-                        if added_in_page == 0:
-                            no_new_pages += 1
-                            if no_new_pages >= no_new_pages_limit:
-                                logger.info("No new unique items, stopping for %s", collector.name)
-                                break
-                        if added_for_combo >= per_query or total_added >= global_max:
-                            break
-                else:
-                    for result in collector.search(query, limit=per_engine):
-                        if is_blocked(result.url, blocked_domains):
-                            continue
-                        row = result_to_row(result)
-                        if row["id"] in existing_ids:
+        # Rows are written in query x engine order regardless of which engine finished first.
+        try:
+            for query_idx in range(len(queries)):
+                for engine_idx in range(len(collectors)):
+                    outcome = wait_for(results[(query_idx, engine_idx)], writer)
+                    for row in outcome.rows:
+                        if not seen_ids.add(row["id"]):
                             continue
-                        append_jsonl(output_path, [row])
-                        existing_ids.add(row["id"])
-                        added_for_combo += 1
+                        writer.write(row)
                         total_added += 1
-                        if added_for_combo >= per_query or total_added >= global_max:
-                            break
-                        if time.monotonic() - start_time > max_minutes * 60:
-                            logger.info("Max minutes reached")
+                        stage.rows = total_added
+                        if total_added >= global_max:
+                            logger.info("Global max reached")
                             return
-            except RuntimeError as exc:
-                logger.warning("Collector error: %s", exc)
-                if "Rate limit" in str(exc):
-                    logger.info("Rate limit reached, stopping collector %s", collector.name)
-                    break
-            if total_added >= global_max:
-                logger.info("Global max reached")
-                return
+                writer.checkpoint()
+                seen_ids.commit()
+        finally:
+            budget.stop.set()
+    if time.monotonic() > budget.deadline:
+        logger.info("Max minutes reached")
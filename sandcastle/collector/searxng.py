@@ -1,26 +1,38 @@
 from __future__ import annotations
 
 import logging
+import time
+from pathlib import Path
 from typing import Iterable
 
-import requests
-
 from sandcastle.collector.base import Collector, SearchResult
-from sandcastle.common.rate_limit import RateLimiter, backoff_sleep
+from sandcastle.common.http import Transport, default_transport
+from sandcastle.common.http_cache import CacheMissError, serves_from_cache
+from sandcastle.common.metrics import get_metrics
+from sandcastle.common.rate_limit import RateLimitError, TokenBucket, backoff_sleep
 
 logger = logging.getLogger(__name__)
 
 
 class SearxNGCollector(Collector):
-    def __init__(self, endpoint: str, rate_limit_s: float = 1.0, timeout_s: float = 10.0, pages: int = 1):
+    def __init__(
+        self,
+        endpoint: str,
+        rate_limit_s: float = 1.0,
+        timeout_s: float = 10.0,
+        pages: int = 1,
+        transport: Transport | None = None,
+        burst: int = 1,
+        rate_limit_state: str | Path | None = None,
+    ):
         self.name = "searxng"
         self.endpoint = endpoint.rstrip("/")
-        self.rate_limiter = RateLimiter(rate_limit_s)
+        self.rate_limiter = TokenBucket.from_interval(rate_limit_s, burst, rate_limit_state)
         self.timeout_s = timeout_s
         self.pages = pages
+        self.transport = transport or default_transport()
 
     def search_page(self, query: str, limit: int, page: int) -> list[SearchResult]:
-        self.rate_limiter.wait()
         params = {
             "q": query,
             "format": "json",
@@ -28,12 +40,18 @@ class SearxNGCollector(Collector):
             "safesearch": 1,
             "pageno": page,
         }
+        if not serves_from_cache(self.transport, self.endpoint, params):
+            self.rate_limiter.wait()
         attempt = 0
         while attempt < 3:
             try:
-                response = requests.get(self.endpoint, params=params, timeout=self.timeout_s)
-                if response.status_code == 429:
-                    raise RuntimeError("Rate limit reached")
+                started = time.perf_counter()
+                response = self.transport.get(self.endpoint, params=params, timeout=self.timeout_s)
+                get_metrics().record_request(
+                    self.name, response.status_code, time.perf_counter() - started, getattr(response, "from_cache", False)
+                )
+                if not self.rate_limiter.handle_response(response.status_code, response.headers):
+                    raise RateLimitError("Rate limit reached")
                 response.raise_for_status()
                 data = response.json()
                 results = data.get("results", [])[:limit]
@@ -49,6 +67,14 @@ class SearxNGCollector(Collector):
                     )
                     for idx, item in enumerate(results, start=1)
                 ]
+            except CacheMissError:
+                raise
+            except RateLimitError:
+                attempt += 1
+                logger.warning("SearxNG rate limited (attempt %d)", attempt)
+                if attempt >= 3:
+                    raise
+                self.rate_limiter.acquire()
             except Exception as exc:  # noqa: BLE001
                 attempt += 1
                 logger.warning("SearxNG request failed", exc_info=exc)
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+try:  # optional fast codecs
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - depends on environment
+    msgspec = None
+
+
+class JsonCodec:
+    name = "stdlib"
+    decode_errors: tuple[type[BaseException], ...] = (json.JSONDecodeError, UnicodeDecodeError)
+
+    def loads(self, data: bytes | str) -> Any:
+        return json.loads(data)
+
+    def dumps(self, payload: Any, pretty: bool = False) -> bytes:
+        if pretty:
+            return json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class OrjsonCodec(JsonCodec):
+    name = "orjson"
+
+    def __init__(self) -> None:
+        self.decode_errors = (orjson.JSONDecodeError,)
+
+    def loads(self, data: bytes | str) -> Any:
+        return orjson.loads(data)
+
+    def dumps(self, payload: Any, pretty: bool = False) -> bytes:
+        return orjson.dumps(payload, option=orjson.OPT_INDENT_2 if pretty else 0)
+
+
+class MsgspecCodec(JsonCodec):
+    name = "msgspec"
+
+    def __init__(self) -> None:
+        self.decode_errors = (msgspec.DecodeError,)
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def loads(self, data: bytes | str) -> Any:
+        return self._decoder.decode(data)
+
+    def dumps(self, payload: Any, pretty: bool = False) -> bytes:
+        encoded = self._encoder.encode(payload)
+        if pretty:
+            return msgspec.json.format(encoded, indent=2)
+        return encoded
+
+
+def available_codecs() -> list[str]:
+    names = []
+    if orjson is not None:
+        names.append("orjson")
+    if msgspec is not None:
+        names.append("msgspec")
+    names.append("stdlib")
+    return names
+
+
+def build_codec(name: str = "auto") -> JsonCodec:
+    if name == "auto":
+        name = available_codecs()[0]
+    if name == "orjson":
+        if orjson is None:
+            raise ValueError("json_codec 'orjson' requested but orjson is not installed")
+        return OrjsonCodec()
+    if name == "msgspec":
+        if msgspec is None:
+            raise ValueError("json_codec 'msgspec' requested but msgspec is not installed")
+        return MsgspecCodec()
+    if name == "stdlib":
+        return JsonCodec()
+    raise ValueError(f"Unknown json_codec: {name}")
+
+
+_codec = build_codec()
+
+
+def get_codec() -> JsonCodec:
+    return _codec
+
+
+def set_codec(name: str) -> JsonCodec:
+    global _codec
+    _codec = build_codec(name)
+    logger.debug("Using %s JSON codec", _codec.name)
+    return _codec
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:  # pragma: no cover - optional dependency
+    pyarrow = None
+    parquet = None
+
+logger = logging.getLogger(__name__)
+
+# Column kinds: "string", "category" (dictionary-encoded string), "int", "timestamp" (ISO8601 text),
+# "epoch_s" (unix seconds), "string_list", "flags" (the deduped flags struct) and "json" (free-form dict as text).
+DATASETS: dict[str, tuple[tuple[str, str], ...]] = {
+    "raw_results": (
+        ("id", "string"),
+        ("query", "category"),
+        ("engine", "category"),
+        ("source_url", "string"),
+        ("title", "string"),
+        ("snippet", "string"),
+        ("collected_at", "timestamp"),
+        ("rank", "int"),
+        ("meta", "json"),
+    ),
+    "reddit_posts": (
+        ("id", "string"),
+        ("query", "category"),
+        ("window", "category"),
+        ("source_url", "string"),
+        ("title", "string"),
+        ("selftext", "string"),
+        ("subreddit", "category"),
+        ("score", "int"),
+        ("num_comments", "int"),
+        ("created_utc", "epoch_s"),
+        ("collected_at", "timestamp"),
+        ("meta", "json"),
+    ),
+    "deduped": (
+        ("id", "string"),
+        ("canonical_url", "string"),
+        ("original_urls", "string_list"),
+        ("titles", "string_list"),
+        ("snippets", "string_list"),
+        ("queries", "string_list"),
+        ("engines", "string_list"),
+        ("first_seen", "timestamp"),
+        ("last_seen", "timestamp"),
+        ("flags", "flags"),
+    ),
+}
+FLAG_FIELDS = ("blocked", "suspicious")
+PARQUET_COMPRESSIONS = ("zstd", "snappy", "gzip", "none")
+
+
+@dataclass(frozen=True)
+class ParquetSettings:
+    row_group_rows: int = 65_536
+    compression: str = "zstd"
+
+    @classmethod
+    def from_config(cls, section: dict) -> "ParquetSettings":
+        compression = section.get("compression", "zstd")
+        if compression not in PARQUET_COMPRESSIONS:
+            raise ValueError(f"Unknown export compression: {compression}")
+        return cls(row_group_rows=max(1, int(section.get("row_group_rows", 65_536))), compression=compression)
+
+
+def require_pyarrow() -> None:
+    if pyarrow is None:
+        raise ValueError("Parquet output requested but pyarrow is not installed (pip install pyarrow)")
+
+
+def parse_timestamp(value: Any) -> datetime | None:
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def column_values(kind: str, values: list[Any]) -> list[Any]:
+    # Plain Python values in the shape pyarrow expects for the column's type; bad values become nulls.
+    if kind in ("string", "category"):
+        return [value if isinstance(value, str) else None for value in values]
+    if kind in ("int", "epoch_s"):
+        return [value if isinstance(value, int) and not isinstance(value, bool) else None for value in values]
+    if kind == "timestamp":
+        return [parse_timestamp(value) for value in values]
+    if kind == "string_list":
+        return [[str(entry) for entry in value] if isinstance(value, list) else None for value in values]
+    if kind == "flags":
+        return [
+            {name: bool(value.get(name, False)) for name in FLAG_FIELDS} if isinstance(value, dict) else None
+            for value in values
+        ]
+    if kind == "json":
+        return [json.dumps(value, ensure_ascii=False, sort_keys=True) if value else None for value in values]
+    raise ValueError(f"Unknown column kind: {kind}")
+
+
+def arrow_type(kind: str) -> Any:
+    return {
+        "string": pyarrow.string(),
+        "category": pyarrow.dictionary(pyarrow.int32(), pyarrow.string()),
+        "int": pyarrow.int64(),
+        "timestamp": pyarrow.timestamp("us", tz="UTC"),
+        "epoch_s": pyarrow.timestamp("s", tz="UTC"),
+        "string_list": pyarrow.list_(pyarrow.string()),
+        "flags": pyarrow.struct([(name, pyarrow.bool_()) for name in FLAG_FIELDS]),
+        "json": pyarrow.string(),
+    }[kind]
+
+
+def arrow_schema(dataset: str) -> Any:
+    require_pyarrow()
+    return pyarrow.schema([(name, arrow_type(kind)) for name, kind in DATASETS[dataset]])
+
+
+def arrow_column(kind: str, values: list[Any]) -> Any:
+    converted = column_values(kind, values)
+    if kind == "category":
+        return pyarrow.array(converted, type=pyarrow.string()).dictionary_encode()
+    return pyarrow.array(converted, type=arrow_type(kind))
+
+
+class ParquetSink:
+    # Streams row dicts into a Parquet file one row group at a time; at most row_group_rows rows are held.
+    def __init__(self, path: str | Path, dataset: str, settings: ParquetSettings | None = None):
+        require_pyarrow()
+        self.path = Path(path)
+        self.dataset = dataset
+        self.settings = settings or ParquetSettings()
+        self.columns = DATASETS[dataset]
+        self.schema = arrow_schema(dataset)
+        self.rows_written = 0
+        self._buffer: list[dict[str, Any]] = []
+        self._writer = None
+        self._tmp = self.path.with_name(self.path.name + ".tmp")
+
+    def write(self, row: dict[str, Any]) -> None:
+        self._buffer.append(row)
+        if len(self._buffer) >= self.settings.row_group_rows:
+            self.flush()
+
+    def write_many(self, rows: Iterable[dict[str, Any]]) -> None:
+        for row in rows:
+            self.write(row)
+
+    def track(self, rows: Iterable[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+        for row in rows:
+            self.write(row)
+            yield row
+
+    def _open(self) -> Any:
+        if self._writer is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            compression = None if self.settings.compression == "none" else self.settings.compression
+            # Dictionary pages only pay off for the low-cardinality columns; long text is stored plain.
+            dictionary = [name for name, kind in self.columns if kind == "category"]
+            self._writer = parquet.ParquetWriter(
+                self._tmp, self.schema, compression=compression, use_dictionary=dictionary or False
+            )
+        return self._writer
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        arrays = [arrow_column(kind, [row.get(name) for row in self._buffer]) for name, kind in self.columns]
+        table = pyarrow.Table.from_arrays(arrays, schema=self.schema)
+        self._open().write_table(table, row_group_size=self.settings.row_group_rows)
+        self.rows_written += len(self._buffer)
+        self._buffer.clear()
+
+    def close(self, commit: bool = True) -> None:
+        # The file only replaces an earlier export once it is complete.
+        try:
+            if commit:
+                self.flush()
+                self._open()
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        if commit:
+            self._tmp.replace(self.path)
+            logger.info("Wrote %s rows to %s", self.rows_written, self.path)
+        else:
+            self._tmp.unlink(missing_ok=True)
+
+    def __enter__(self) -> "ParquetSink":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        self.close(commit=exc_type is None)
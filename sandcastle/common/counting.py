@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable
+
+from sandcastle.common.codec import get_codec, msgspec, set_codec
+from sandcastle.common.io import file_checkpoint, read_json, write_json
+from sandcastle.common.segments import load_manifest, log_size, manifest_path, read_segment, segment_summary
+
+logger = logging.getLogger(__name__)
+
+COUNT_STATS_VERSION = 2
+CHUNK_BYTES = 32 * 1024 * 1024
+# 128-bit digests: a collision among distinct ids is negligible at any realistic file size.
+ID_DIGEST_BYTES = 16
+
+if msgspec is not None:
+
+    class CountFields(msgspec.Struct):
+        # Decoding into this struct skips every other field without building it.
+        id: str | None = None
+        engine: str | None = None
+        query: str | None = None
+
+    _fields_decoder = msgspec.json.Decoder(CountFields)
+else:  # pragma: no cover - depends on environment
+    _fields_decoder = None
+
+
+def hash_ids(ids: Iterable[str]) -> set[bytes]:
+    # Stable across processes and runs (unlike hash()), so the sidecar can persist them.
+    blake2b = hashlib.blake2b
+    return {blake2b(row_id.encode("utf-8"), digest_size=ID_DIGEST_BYTES).digest() for row_id in ids}
+
+
+def pack_ids(ids: Iterable[bytes]) -> bytes:
+    return b"".join(sorted(ids))
+
+
+def unpack_ids(data: bytes) -> set[bytes]:
+    return {data[start:start + ID_DIGEST_BYTES] for start in range(0, len(data), ID_DIGEST_BYTES)}
+
+
+@dataclass
+class JsonlCounts:
+    rows: int = 0
+    ids: set[bytes] = field(default_factory=set)
+    per_engine: Counter = field(default_factory=Counter)
+    per_query: Counter = field(default_factory=Counter)
+
+    def merge(self, other: "JsonlCounts") -> None:
+        # Merging in file order keeps per_engine/per_query in first-seen order, as a sequential scan would.
+        self.rows += other.rows
+        self.ids |= other.ids
+        self.per_engine.update(other.per_engine)
+        self.per_query.update(other.per_query)
+
+    def to_payload(self) -> tuple:
+        return self.rows, pack_ids(self.ids), dict(self.per_engine), dict(self.per_query)
+
+    @classmethod
+    def from_payload(cls, payload: tuple) -> "JsonlCounts":
+        rows, ids, per_engine, per_query = payload
+        return cls(rows, unpack_ids(ids), Counter(per_engine), Counter(per_query))
+
+
+def count_lines(lines: Iterable[bytes], fields_only: bool = False) -> JsonlCounts:
+    codec = get_codec()
+    decoder = _fields_decoder if fields_only else None
+    rows = 0
+    # Distinct raw ids are hashed once at the end; engines/queries are tallied by Counter in one C-level pass.
+    ids: set[str] = set()
+    engines: list[str] = []
+    queries: list[str] = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if decoder is not None:
+            try:
+                fields = decoder.decode(line)
+            except msgspec.DecodeError:
+                pass  # not an object, or odd field types: fall through to the full parse
+            else:
+                rows += 1
+                if fields.id:
+                    ids.add(fields.id)
+                if fields.engine:
+                    engines.append(fields.engine)
+                if fields.query:
+                    queries.append(fields.query)
+                continue
+        try:
+            row = codec.loads(line)
+        except codec.decode_errors:
+            continue
+        rows += 1
+        if isinstance(row, dict):
+            row_id = row.get("id")
+            if row_id:
+                # Non-string ids are keyed by repr, so 7 and "7" stay distinct as in a set of the raw values.
+                ids.add(row_id if isinstance(row_id, str) else "\x00" + repr(row_id))
+            if row.get("engine"):
+                engines.append(row["engine"])
+            if row.get("query"):
+                queries.append(row["query"])
+    return JsonlCounts(rows, hash_ids(ids), Counter(engines), Counter(queries))
+
+
+def chunk_ranges(path: Path, start: int, end: int, chunk_bytes: int | None = None) -> list[tuple[int, int]]:
+    # Byte ranges that each start right after a newline, so every line falls in exactly one chunk.
+    chunk_bytes = chunk_bytes or CHUNK_BYTES
+    ranges = []
+    if end <= start:
+        return ranges
+    with path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        position = start
+        while position < end:
+            boundary = mapped.find(b"\n", min(position + chunk_bytes, end) - 1, end)
+            stop = end if boundary < 0 else boundary + 1
+            ranges.append((position, stop))
+            position = stop
+    return ranges
+
+
+def _init_worker(codec_name: str) -> None:
+    set_codec(codec_name)
+
+
+def _count_unit(path: str, unit: tuple, fields_only: bool) -> tuple:
+    if unit[0] == "segment":
+        _, segment, skip = unit
+        data = read_segment(path, segment)[skip:]
+    else:
+        _, start, stop = unit
+        with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            data = mapped[start:stop]
+    return count_lines(data.split(b"\n"), fields_only).to_payload()
+
+
+def count_range(path: Path, offset: int, end: int, workers: int = 1, fields_only: bool = False) -> JsonlCounts:
+    # Counts the logical byte range [offset, end): sealed segments are one unit each, the live file is split
+    # into newline-aligned chunks. Units are merged in file order.
+    manifest = load_manifest(path)
+    units: list[tuple] = []
+    sealed = 0
+    tail_offset = 0
+    if manifest is not None:
+        sealed, tail_offset = manifest.sealed_bytes, manifest.tail_offset
+        for segment in manifest.segments:
+            if segment.end > offset and segment.start < end:
+                units.append(("segment", segment, max(0, offset - segment.start)))
+    if end > sealed and path.exists():
+        physical_start = max(offset, sealed) - sealed + tail_offset
+        physical_end = end - sealed + tail_offset
+        units.extend(("range", start, stop) for start, stop in chunk_ranges(path, physical_start, physical_end))
+
+    total = JsonlCounts()
+    if workers <= 1 or len(units) <= 1:
+        for unit in units:
+            total.merge(JsonlCounts.from_payload(_count_unit(str(path), unit, fields_only)))
+        return total
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(units)), initializer=_init_worker, initargs=(get_codec().name,)
+    ) as pool:
+        futures = [pool.submit(_count_unit, str(path), unit, fields_only) for unit in units]
+        for future in futures:
+            total.merge(JsonlCounts.from_payload(future.result()))
+    return total
+
+
+def stats_paths(path: Path) -> tuple[Path, Path]:
+    return path.with_name(path.name + ".stats.json"), path.with_name(path.name + ".stats.ids")
+
+
+def _fingerprint(path: Path) -> tuple[int, int]:
+    # Logical size plus the newest mtime of the live file and the segment manifest.
+    mtimes = [candidate.stat().st_mtime_ns for candidate in (path, manifest_path(path)) if candidate.exists()]
+    return log_size(path), max(mtimes, default=0)
+
+
+def _complete_end(path: Path, size: int) -> int:
+    # End of the last newline-terminated line; a row still being written is counted but not persisted.
+    if size == 0:
+        return 0
+    manifest = load_manifest(path)
+    sealed = manifest.sealed_bytes if manifest is not None else 0
+    if size <= sealed or not path.exists():
+        return size
+    tail_offset = manifest.tail_offset if manifest is not None else 0
+    with path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        newline = mapped.rfind(b"\n", tail_offset)
+    return sealed + (newline + 1 - tail_offset if newline >= 0 else 0)
+
+
+def count_jsonl(
+    path: str | Path, workers: int | None = None, fields_only: bool = False, use_cache: bool = True
+) -> dict[str, Any]:
+    file_path = Path(path)
+    workers = workers or os.cpu_count() or 1
+    meta_path, ids_path = stats_paths(file_path)
+    size, mtime_ns = _fingerprint(file_path)
+
+    state = read_json(meta_path) if use_cache else None
+    if not isinstance(state, dict) or state.get("version") != COUNT_STATS_VERSION or state.get("fields_only") != fields_only:
+        state = None
+    if state is not None and state["size"] == size and state["mtime_ns"] == mtime_ns:
+        return state["summary"]
+
+    counts = JsonlCounts()
+    offset = 0
+    if (
+        state is not None
+        and ids_path.exists()
+        and state["offset"] <= size
+        and file_checkpoint(file_path, state["offset"]) == state["checkpoint"]
+    ):
+        counts = JsonlCounts(state["rows"], unpack_ids(ids_path.read_bytes()), Counter(state["per_engine"]), Counter(state["per_query"]))
+        offset = state["offset"]
+        logger.debug("Counting %s from byte %d", file_path, offset)
+
+    complete = _complete_end(file_path, size)
+    counts.merge(count_range(file_path, offset, complete, workers, fields_only))
+    partial = count_range(file_path, complete, size, 1, fields_only)
+    summary = {
+        "valid_objects": counts.rows + partial.rows,
+        "unique_ids": len(counts.ids) + len(partial.ids - counts.ids),
+        "per_engine": dict(counts.per_engine + partial.per_engine),
+        "per_query": dict(counts.per_query + partial.per_query),
+    }
+    segments = segment_summary(file_path)
+    if segments is not None:
+        summary["segments"] = segments
+
+    if use_cache:
+        # The sidecar is only a cache: count stays usable on data the user cannot write beside.
+        try:
+            ids_path.write_bytes(pack_ids(counts.ids))
+            write_json(
+                meta_path,
+                {
+                    "version": COUNT_STATS_VERSION,
+                    "fields_only": fields_only,
+                    "size": size,
+                    "mtime_ns": mtime_ns,
+                    "offset": complete,
+                    "checkpoint": file_checkpoint(file_path, complete),
+                    "rows": counts.rows,
+                    "per_engine": dict(counts.per_engine),
+                    "per_query": dict(counts.per_query),
+                    "summary": summary,
+                },
+                compact=True,
+            )
+        except OSError as exc:
+            logger.debug("Not writing count sidecar for %s: %s", file_path, exc)
+    return summary
+
+
+def count_file(path: str | Path, workers: int | None = None, fields_only: bool = False, use_cache: bool = True) -> None:
+    file_path = Path(path)
+    summary: dict[str, Any] = {"file": str(file_path)}
+    if not file_path.exists() and not manifest_path(file_path).exists():
+        summary.update({"error": "file_not_found"})
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return
+
+    if file_path.suffix == ".jsonl":
+        summary.update(count_jsonl(file_path, workers, fields_only, use_cache))
+    elif file_path.suffix == ".json":
+        payload = read_json(file_path)
+        if isinstance(payload, list):
+            ids = {item.get("id") for item in payload if isinstance(item, dict) and item.get("id")}
+            summary.update({"items": len(payload), "unique_ids": len(ids)})
+        elif isinstance(payload, dict) and "clusters" in payload:
+            per_cluster = {
+                cluster.get("cluster_id"): len(cluster.get("items", []))
+                for cluster in payload.get("clusters", [])
+            }
+            summary.update({"clusters": len(payload.get("clusters", [])), "per_cluster": per_cluster})
+        else:
+            summary.update({"items": 1 if payload is not None else 0})
+    else:
+        summary.update({"error": "Unsupported file type"})
+
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Protocol
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USER_AGENT = "sandcastle/0.1 (research pipeline)"
+
+try:  # optional HTTP/2 support
+    import httpx
+except ImportError:  # pragma: no cover - depends on environment
+    httpx = None
+
+TRANSPORT_ERRORS: tuple[type[BaseException], ...] = (requests.RequestException,)
+if httpx is not None:
+    TRANSPORT_ERRORS = TRANSPORT_ERRORS + (httpx.HTTPError,)
+
+
+@dataclass(frozen=True)
+class HttpSettings:
+    pool_connections: int = 10
+    pool_maxsize: int = 10
+    host_pool_sizes: dict[str, int] = field(default_factory=dict)
+    http2: bool = False
+    user_agent: str = DEFAULT_USER_AGENT
+
+    @classmethod
+    def from_config(cls, section: dict) -> "HttpSettings":
+        return cls(
+            pool_connections=int(section.get("pool_connections", 10)),
+            pool_maxsize=int(section.get("pool_maxsize", 10)),
+            host_pool_sizes={host: int(size) for host, size in (section.get("hosts") or {}).items()},
+            http2=bool(section.get("http2", False)),
+            user_agent=section.get("user_agent") or DEFAULT_USER_AGENT,
+        )
+
+
+class Transport(Protocol):
+    def get(
+        self,
+        url: str,
+        params: dict[str, Any] | None = None,
+        headers: dict[str, str] | None = None,
+        timeout: float = 10.0,
+    ) -> Any:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+class HttpTransport(Transport):
+    def __init__(self, settings: HttpSettings | None = None):
+        self.settings = settings or HttpSettings()
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = self.settings.user_agent
+        adapter = HTTPAdapter(pool_connections=self.settings.pool_connections, pool_maxsize=self.settings.pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        for host, size in sorted(self.settings.host_pool_sizes.items()):
+            host_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+            self.session.mount(f"http://{host}", host_adapter)
+            self.session.mount(f"https://{host}", host_adapter)
+
+    def get(
+        self,
+        url: str,
+        params: dict[str, Any] | None = None,
+        headers: dict[str, str] | None = None,
+        timeout: float = 10.0,
+    ) -> Any:
+        return self.session.get(url, params=params, headers=headers, timeout=timeout)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class Http2Transport(Transport):
+    def __init__(self, settings: HttpSettings | None = None):
+        self.settings = settings or HttpSettings()
+        limits = httpx.Limits(
+            max_connections=self.settings.pool_maxsize,
+            max_keepalive_connections=self.settings.pool_maxsize,
+        )
+        self.client = httpx.Client(
+            http2=True,
+            limits=limits,
+            headers={"User-Agent": self.settings.user_agent},
+        )
+
+    def get(
+        self,
+        url: str,
+        params: dict[str, Any] | None = None,
+        headers: dict[str, str] | None = None,
+        timeout: float = 10.0,
+    ) -> Any:
+        return self.client.get(url, params=params, headers=headers, timeout=timeout)
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def build_transport(settings: HttpSettings | None = None) -> Transport:
+    settings = settings or HttpSettings()
+    if settings.http2:
+        if httpx is None:
+            logger.warning("http2 requested but httpx is not installed; using HTTP/1.1 keep-alive")
+        else:
+            try:
+                return Http2Transport(settings)
+            except ImportError:
+                logger.warning("http2 requested but the h2 package is not installed; using HTTP/1.1 keep-alive")
+    return HttpTransport(settings)
+
+
+_default_transport: Transport | None = None
+_default_lock = threading.Lock()
+
+
+def default_transport() -> Transport:
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = HttpTransport()
+        return _default_transport
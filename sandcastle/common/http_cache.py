@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Mapping
+
+from sandcastle.common.codec import get_codec
+from sandcastle.common.hash import sha256_text
+from sandcastle.common.http import Transport
+from sandcastle.common.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+CACHE_MODES = ("off", "online", "offline")
+DEFAULT_TTL_S = 3600.0
+# Least recently used rows are looked up this many at a time when the cache is over its size limit.
+EVICT_BATCH = 64
+# Only validators and content type are replayed; quota headers would feed stale numbers to the rate limiter.
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Date")
+
+
+class CacheMissError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class CacheSettings:
+    mode: str = "off"
+    path: str = "data/http_cache.sqlite"
+    max_bytes: int = 256 * 1024 * 1024
+    ttl_s: dict[str, float] = field(default_factory=dict)
+
+    @classmethod
+    def from_config(cls, section: dict) -> "CacheSettings":
+        mode = section.get("mode", "off")
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown http.cache mode: {mode}")
+        return cls(
+            mode=mode,
+            path=section.get("path", "data/http_cache.sqlite"),
+            max_bytes=int(float(section.get("max_mb", 256)) * 1024 * 1024),
+            ttl_s={source: float(ttl) for source, ttl in (section.get("ttl_s") or {}).items()},
+        )
+
+    def ttl_for(self, source: str) -> float:
+        return self.ttl_s.get(source, self.ttl_s.get("default", DEFAULT_TTL_S))
+
+    def with_offline(self, offline: bool) -> "CacheSettings":
+        return replace(self, mode="offline") if offline else self
+
+
+def cache_key(url: str, params: Mapping[str, Any] | None = None) -> str:
+    # Param order and value types (1 vs "1") do not change the request on the wire, so they do not change the key.
+    normalized = sorted((str(name), str(value)) for name, value in (params or {}).items() if value is not None)
+    return sha256_text(json.dumps([url.rstrip("/"), normalized], ensure_ascii=False))
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    status_code: int
+    headers: dict[str, str]
+    content: bytes
+    fetched_at: float
+    from_cache: bool = True
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return get_codec().loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code} for {self.url}")
+
+
+class ResponseCache:
+    def __init__(self, path: str | Path, max_bytes: int = 256 * 1024 * 1024):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, url TEXT NOT NULL, status INTEGER NOT NULL, headers TEXT NOT NULL, "
+            "body BLOB NOT NULL, fetched_at REAL NOT NULL, accessed_at REAL NOT NULL, size INTEGER NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (accessed_at)")
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+    def get(self, key: str) -> CachedResponse | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, status, headers, body, fetched_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        url, status, headers, body, fetched_at = row
+        return CachedResponse(url, status, json.loads(headers), bytes(body), fetched_at)
+
+    def put(self, key: str, url: str, status_code: int, headers: Mapping[str, str], content: bytes) -> CachedResponse:
+        kept = {name: headers[name] for name in KEPT_HEADERS if headers.get(name) is not None}
+        now = time.time()
+        size = len(content) + len(url) + 128
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, url, status, headers, body, fetched_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, status_code, json.dumps(kept), content, now, now, size),
+            )
+            self._size += size - (previous[0] if previous else 0)
+            self._evict()
+        return CachedResponse(url, status_code, kept, content, now)
+
+    def record(self, result: str) -> None:
+        # Collector threads share one cache, so lookup counters move under the same lock as the connection.
+        with self._lock:
+            if result == "hit":
+                self.hits += 1
+            elif result == "revalidated":
+                self.revalidated += 1
+            else:
+                self.misses += 1
+
+    def touch(self, key: str) -> None:
+        # A 304 confirms the stored body: restart its TTL without rewriting it.
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+
+    def _evict(self) -> None:
+        evicted = 0
+        while self._size > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at LIMIT ?", (EVICT_BATCH,)
+            ).fetchall()
+            if not rows:
+                break
+            self._conn.execute("BEGIN")
+            for key, size in rows:
+                if self._size <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._size -= size
+                evicted += 1
+            self._conn.execute("COMMIT")
+        if evicted:
+            logger.debug("Evicted %d cached responses (%d bytes kept)", evicted, self._size)
+
+    def close(self) -> None:
+        with self._lock:
+            hits, misses, revalidated = self.hits, self.misses, self.revalidated
+            self._conn.close()
+        lookups = hits + misses + revalidated
+        if lookups:
+            get_metrics().set_gauge("http_cache_hit_ratio", round((hits + revalidated) / lookups, 4))
+        get_metrics().set_gauge("http_cache_bytes", self._size)
+        logger.info(
+            "HTTP cache: %d hits, %d misses, %d revalidated, %d bytes stored", hits, misses, revalidated, self._size
+        )
+
+    def __enter__(self) -> "ResponseCache":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class CachingTransport(Transport):
+    def __init__(
+        self,
+        inner: Transport,
+        cache: ResponseCache,
+        ttl_s: float = DEFAULT_TTL_S,
+        offline: bool = False,
+        source: str = "default",
+    ):
+        self.inner = inner
+        self.source = source
+        self.cache = cache
+        self.ttl_s = ttl_s
+        self.offline = offline
+
+    def _usable(self, cached: CachedResponse | None) -> bool:
+        if cached is None:
+            return False
+        return self.offline or time.time() - cached.fetched_at < self.ttl_s
+
+    def serves(self, url: str, params: dict[str, Any] | None = None) -> bool:
+        # True when get() will not touch the network, so callers can skip their rate limiter.
+        if self.offline:
+            return True
+        cached = self.cache.get(cache_key(url, params))
+        return self._usable(cached)
+
+    def get(
+        self,
+        url: str,
+        params: dict[str, Any] | None = None,
+        headers: dict[str, str] | None = None,
+        timeout: float = 10.0,
+    ) -> Any:
+        key = cache_key(url, params)
+        cached = self.cache.get(key)
+        if self._usable(cached):
+            self.cache.record("hit")
+            get_metrics().inc("http_cache_requests_total", source=self.source, result="hit")
+            return cached
+        if self.offline:
+            self.cache.record("miss")
+            get_metrics().inc("http_cache_requests_total", source=self.source, result="miss")
+            raise CacheMissError(f"No cached response for {url} {params or {}}")
+
+        request_headers = dict(headers or {})
+        if cached is not None:
+            if cached.headers.get("ETag"):
+                request_headers["If-None-Match"] = cached.headers["ETag"]
+            if cached.headers.get("Last-Modified"):
+                request_headers["If-Modified-Since"] = cached.headers["Last-Modified"]
+        response = self.inner.get(url, params=params, headers=request_headers or None, timeout=timeout)
+        if response.status_code == 304 and cached is not None:
+            self.cache.touch(key)
+            self.cache.record("revalidated")
+            get_metrics().inc("http_cache_requests_total", source=self.source, result="revalidated")
+            return cached
+        self.cache.record("miss")
+        get_metrics().inc("http_cache_requests_total", source=self.source, result="miss")
+        if response.status_code == 200:
+            self.cache.put(key, url, response.status_code, response.headers, response.content)
+        return response
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+def serves_from_cache(transport: Transport, url: str, params: dict[str, Any] | None = None) -> bool:
+    return isinstance(transport, CachingTransport) and transport.serves(url, params)
+
+
+def open_cache(settings: CacheSettings, path: Path) -> ResponseCache | None:
+    if settings.mode == "off":
+        return None
+    return ResponseCache(path, settings.max_bytes)
+
+
+def cache_transport(
+    transport: Transport, cache: ResponseCache | None, settings: CacheSettings, source: str
+) -> Transport:
+    if cache is None:
+        return transport
+    return CachingTransport(transport, cache, settings.ttl_for(source), settings.mode == "offline", source)
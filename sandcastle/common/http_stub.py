@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+from urllib.parse import parse_qs, urlparse
+
+Route = Callable[[dict[str, str]], tuple[int, dict[str, Any]]]
+
+
+def searxng_route(results_per_page: int = 10) -> Route:
+    def handler(params: dict[str, str]) -> tuple[int, dict[str, Any]]:
+        query = params.get("q", "")
+        page = int(params.get("pageno", 1))
+        results = [
+            {
+                "url": f"https://example.com/{query.replace(' ', '-')}/{page}/{idx}",
+                "title": f"{query} result {page}-{idx}",
+                "content": f"Snippet for {query} on page {page} number {idx}",
+                "engine": "stub",
+            }
+            for idx in range(results_per_page)
+        ]
+        return 200, {"results": results}
+
+    return handler
+
+
+def reddit_route(posts_per_page: int = 25, pages: int = 3, newest_utc: int = 1_700_000_000, step_s: int = 3600) -> Route:
+    def handler(params: dict[str, str]) -> tuple[int, dict[str, Any]]:
+        query = params.get("q", "")
+        page = int((params.get("after") or "t3_page0").rsplit("page", 1)[-1])
+        children = []
+        for idx in range(posts_per_page):
+            position = page * posts_per_page + idx
+            children.append(
+                {
+                    "data": {
+                        "id": f"{page}x{idx}",
+                        "permalink": f"/r/stub/comments/{query.replace(' ', '_')}_{position}/",
+                        "title": f"{query} post {position}",
+                        "selftext": f"Body text for {query} number {position}",
+                        "subreddit": "stub",
+                        "score": 10,
+                        "num_comments": 3,
+                        "created_utc": newest_utc - position * step_s,
+                        "is_self": True,
+                        "over_18": False,
+                        "author": "stub",
+                    }
+                }
+            )
+        after = f"t3_page{page + 1}" if page + 1 < pages else None
+        return 200, {"data": {"children": children, "after": after}}
+
+    return handler
+
+
+class StubServer:
+    def __init__(self, routes: dict[str, Route]):
+        self.routes = routes
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}{path}"
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self) -> None:
+                super().setup()
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_GET(self) -> None:  # noqa: N802
+                with stub._lock:
+                    stub.requests += 1
+                parsed = urlparse(self.path)
+                params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+                route = stub.routes.get(parsed.path)
+                status, payload = route(params) if route else (404, {"error": "not_found"})
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+                return
+
+        return Handler
+
+    def __enter__(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
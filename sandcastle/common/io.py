@@ -1,110 +1,251 @@
 from __future__ import annotations
 
-import json
+import os
+import signal
+import threading
+import time
 from pathlib import Path
 from typing import Any, Iterable
 
 import logging
 
+from sandcastle.common.codec import get_codec
+from sandcastle.common.segments import (
+    CHECKPOINT_BYTES,
+    checkpoint_digest,
+    iter_log_lines,
+    iter_log_spans,
+    log_checkpoint,
+    manifest_path,
+    roll_due,
+    roll_segment,
+)
+
 logger = logging.getLogger(__name__)
 
 
-def read_jsonl(path: str | Path) -> Iterable[dict[str, Any]]:
+def _segmented(file_path: Path) -> bool:
+    return manifest_path(file_path).exists()
+
+
+def read_jsonl(path: str | Path, since: str | None = None) -> Iterable[dict[str, Any]]:
+    # `since` keeps rows whose collected_at is at or after it; sealed segments entirely older are skipped unread.
     file_path = Path(path)
-    if not file_path.exists():
+    segmented = _segmented(file_path)
+    if not file_path.exists() and not segmented:
         return []
 
-    def _iter():
-        with file_path.open("r", encoding="utf-8") as handle:
+    def _lines():
+        if segmented:
+            yield from (line for line, _, _ in iter_log_lines(file_path, since=since))
+            return
+        with file_path.open("rb") as handle:
             for line in handle:
                 line = line.strip()
-                if not line:
-                    continue
-                try:
-                    yield json.loads(line)
-                except json.JSONDecodeError:
-                    logger.warning("Skipping malformed JSONL line")
-                    continue
+                if line:
+                    yield line
+
+    def _iter():
+        codec = get_codec()
+        for line in _lines():
+            try:
+                row = codec.loads(line)
+            except codec.decode_errors:
+                logger.warning("Skipping malformed JSONL line")
+                continue
+            if since is not None and not (isinstance(row, dict) and str(row.get("collected_at", "")) >= since):
+                continue
+            yield row
+
+    return _iter()
+
+
+def iter_jsonl_spans(path: str | Path, offset: int = 0) -> Iterable[tuple[bytes, int, int, bool]]:
+    # (line, start, end, terminated): start is where this line begins, end where the next one does.
+    file_path = Path(path)
+    if _segmented(file_path):
+        return iter_log_spans(file_path, offset)
+    if not file_path.exists():
+        return []
+
+    def _iter():
+        position = offset
+        with file_path.open("rb") as handle:
+            handle.seek(offset)
+            for raw_line in handle:
+                start = position
+                position += len(raw_line)
+                line = raw_line.strip()
+                if line:
+                    yield line, start, position, raw_line.endswith(b"\n")
 
     return _iter()
 
 
+def iter_jsonl_lines(path: str | Path, offset: int = 0) -> Iterable[tuple[bytes, int, bool]]:
+    return ((line, end, terminated) for line, _, end, terminated in iter_jsonl_spans(path, offset))
+
+
+def read_jsonl_from(path: str | Path, offset: int = 0) -> Iterable[tuple[dict[str, Any], int]]:
+    codec = get_codec()
+    for line, position, terminated in iter_jsonl_lines(path, offset):
+        try:
+            row = codec.loads(line)
+        except codec.decode_errors:
+            if not terminated:
+                return
+            logger.warning("Skipping malformed JSONL line")
+            continue
+        yield row, position
+
+
 def append_jsonl(path: str | Path, rows: Iterable[dict[str, Any]]) -> None:
     file_path = Path(path)
     file_path.parent.mkdir(parents=True, exist_ok=True)
-    with file_path.open("a", encoding="utf-8") as handle:
+    codec = get_codec()
+    # Rolling before the append keeps date-rolled segments to one day; rolling after enforces the size limit.
+    roll_segment(file_path)
+    with file_path.open("ab") as handle:
         for row in rows:
-            handle.write(json.dumps(row, ensure_ascii=False) + "\n")
+            handle.write(codec.dumps(row) + b"\n")
+    roll_segment(file_path)
+
+
+def _raise_on_sigterm(signum: int, frame: Any) -> None:
+    raise SystemExit(128 + signum)
+
+
+class JsonlWriter:
+    def __init__(
+        self,
+        path: str | Path,
+        flush_rows: int = 500,
+        flush_bytes: int = 1 << 20,
+        flush_interval_s: float = 1.0,
+        fsync: bool = True,
+    ):
+        self.path = Path(path)
+        self.flush_rows = flush_rows
+        self.flush_bytes = flush_bytes
+        self.flush_interval_s = flush_interval_s
+        self.fsync = fsync
+        self.rows_written = 0
+        self._codec = get_codec()
+        self._handle = None
+        self._buffer: list[bytes] = []
+        self._buffered_bytes = 0
+        self._last_flush = time.monotonic()
+        self._previous_sigterm = None
+
+    def write(self, row: dict[str, Any]) -> None:
+        line = self._codec.dumps(row) + b"\n"
+        self._buffer.append(line)
+        self._buffered_bytes += len(line)
+        self.rows_written += 1
+        if (
+            len(self._buffer) >= self.flush_rows
+            or self._buffered_bytes >= self.flush_bytes
+            or time.monotonic() - self._last_flush >= self.flush_interval_s
+        ):
+            self.flush()
+
+    def write_many(self, rows: Iterable[dict[str, Any]]) -> None:
+        for row in rows:
+            self.write(row)
+
+    def maybe_flush(self) -> None:
+        # write() only checks the interval when a row arrives; callers also call this while they wait.
+        if self._buffer and time.monotonic() - self._last_flush >= self.flush_interval_s:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            if self._handle is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                roll_segment(self.path)
+                self._handle = self.path.open("ab")
+            self._handle.write(b"".join(self._buffer))
+            self._handle.flush()
+            self._buffer.clear()
+            self._buffered_bytes = 0
+        self._last_flush = time.monotonic()
+
+    def checkpoint(self) -> None:
+        self.flush()
+        if self.fsync and self._handle is not None:
+            os.fsync(self._handle.fileno())
+        if self._handle is not None and roll_due(self.path):
+            # Sealing replaces the active file's contents; the next flush reopens it.
+            self._handle.close()
+            self._handle = None
+            roll_segment(self.path)
+
+    def close(self) -> None:
+        try:
+            self.checkpoint()
+        finally:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+            if self._previous_sigterm is not None:
+                signal.signal(signal.SIGTERM, self._previous_sigterm)
+                self._previous_sigterm = None
+
+    def __enter__(self) -> "JsonlWriter":
+        # SIGTERM normally kills the process without unwinding; turn it into SystemExit so close() runs.
+        if threading.current_thread() is threading.main_thread() and signal.getsignal(signal.SIGTERM) is signal.SIG_DFL:
+            self._previous_sigterm = signal.signal(signal.SIGTERM, _raise_on_sigterm)
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def write_json(path: str | Path, payload: Any, compact: bool = False) -> None:
+    file_path = Path(path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    with file_path.open("wb") as handle:
+        handle.write(get_codec().dumps(payload, pretty=not compact) + b"\n")
 
 
-def write_json(path: str | Path, payload: Any) -> None:
+def write_json_array(path: str | Path, items: Iterable[Any], compact: bool = False) -> None:
     file_path = Path(path)
     file_path.parent.mkdir(parents=True, exist_ok=True)
-    with file_path.open("w", encoding="utf-8") as handle:
-        handle.write(json.dumps(payload, ensure_ascii=False, indent=2) + "\n")
+    codec = get_codec()
+    # Produces the same bytes as write_json(path, list(items)) without holding the list.
+    empty = True
+    with file_path.open("wb") as handle:
+        for item in items:
+            encoded = codec.dumps(item, pretty=not compact)
+            if compact:
+                handle.write((b"[" if empty else b",") + encoded)
+            else:
+                handle.write((b"[\n  " if empty else b",\n  ") + encoded.replace(b"\n", b"\n  "))
+            empty = False
+        if empty:
+            handle.write(b"[]\n")
+        else:
+            handle.write(b"]\n" if compact else b"\n]\n")
 
 
-def read_json(path: str | Path) -> Any:
+def file_checkpoint(path: str | Path, offset: int) -> str:
     file_path = Path(path)
+    if offset <= 0:
+        return ""
+    if _segmented(file_path):
+        return log_checkpoint(file_path, offset)
     if not file_path.exists():
-        return None
-    return json.loads(file_path.read_text(encoding="utf-8"))
+        return ""
+    with file_path.open("rb") as handle:
+        start = max(0, offset - CHECKPOINT_BYTES)
+        handle.seek(start)
+        chunk = handle.read(offset - start)
+    return checkpoint_digest(chunk)
 
 
-def count_file(path: str | Path) -> None:
+def read_json(path: str | Path) -> Any:
     file_path = Path(path)
-    summary: dict[str, Any] = {"file": str(file_path)}
     if not file_path.exists():
-        summary.update({"error": "file_not_found"})
-        print(json.dumps(summary, ensure_ascii=False, indent=2))
-        return
-
-    if file_path.suffix == ".jsonl":
-        count = 0
-        ids = set()
-        per_engine: dict[str, int] = {}
-        per_query: dict[str, int] = {}
-        with file_path.open("r", encoding="utf-8") as handle:
-            for line in handle:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    row = json.loads(line)
-                except json.JSONDecodeError:
-                    continue
-                count += 1
-                if isinstance(row, dict):
-                    if row.get("id"):
-                        ids.add(row.get("id"))
-                    engine = row.get("engine")
-                    if engine:
-                        per_engine[engine] = per_engine.get(engine, 0) + 1
-                    query = row.get("query")
-                    if query:
-                        per_query[query] = per_query.get(query, 0) + 1
-        summary.update(
-            {
-                "valid_objects": count,
-                "unique_ids": len(ids),
-                "per_engine": per_engine,
-                "per_query": per_query,
-            }
-        )
-    elif file_path.suffix == ".json":
-        payload = read_json(file_path)
-        if isinstance(payload, list):
-            ids = {item.get("id") for item in payload if isinstance(item, dict) and item.get("id")}
-            summary.update({"items": len(payload), "unique_ids": len(ids)})
-        elif isinstance(payload, dict) and "clusters" in payload:
-            per_cluster = {
-                cluster.get("cluster_id"): len(cluster.get("items", []))
-                for cluster in payload.get("clusters", [])
-            }
-            summary.update({"clusters": len(payload.get("clusters", [])), "per_cluster": per_cluster})
-        else:
-            summary.update({"items": 1 if payload is not None else 0})
-    else:
-        summary.update({"error": "Unsupported file type"})
+        return None
+    return get_codec().loads(file_path.read_bytes())
 
-    print(json.dumps(summary, ensure_ascii=False, indent=2))
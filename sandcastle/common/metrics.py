@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import cProfile
+import logging
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator
+
+from sandcastle.common.io import read_json, write_json
+from sandcastle.common.time import iso_now
+
+try:  # peak RSS is POSIX-only
+    import resource
+except ImportError:  # pragma: no cover - depends on platform
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def cpu_seconds() -> float:
+    # Includes reaped child processes, so process-pool workers count once the pool has shut down.
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def _labels(labels: dict[str, Any]) -> Labels:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+@dataclass
+class Histogram:
+    buckets: tuple[float, ...] = LATENCY_BUCKETS
+    counts: list[int] = field(default_factory=list)
+    total: float = 0.0
+    count: int = 0
+    max: float = 0.0
+
+    def __post_init__(self) -> None:
+        if not self.counts:
+            self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def to_dict(self) -> dict:
+        cumulative = 0
+        buckets = []
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets.append([bound, cumulative])
+        buckets.append(["+Inf", self.count])
+        return {"count": self.count, "sum": round(self.total, 6), "max": round(self.max, 6), "buckets": buckets}
+
+
+@dataclass
+class StageTiming:
+    name: str
+    rows: int = 0
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    peak_rss_mb: float | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "wall_s": round(self.wall_s, 6),
+            "cpu_s": round(self.cpu_s, 6),
+            "peak_rss_mb": self.peak_rss_mb,
+            "rows": self.rows,
+            "rows_per_s": round(self.rows / self.wall_s, 1) if self.rows and self.wall_s > 0 else None,
+        }
+
+
+class Metrics:
+    def __init__(self, command: str = "", profile_dir: str | Path | None = None):
+        self.command = command
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.stages: list[StageTiming] = []
+        self.counters: dict[tuple[str, Labels], float] = {}
+        self.gauges: dict[tuple[str, Labels], float] = {}
+        self.histograms: dict[tuple[str, Labels], Histogram] = {}
+        self._lock = threading.Lock()
+        self._profiling = False
+        self._started = (time.perf_counter(), cpu_seconds())
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        with self._lock:
+            self.gauges[(name, _labels(labels))] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def record_request(self, engine: str, status_code: int, seconds: float, cached: bool = False) -> None:
+        self.observe("http_request_seconds", seconds, engine=engine, cached=cached)
+        self.inc("http_requests_total", engine=engine, status=status_code)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageTiming]:
+        timing = StageTiming(name)
+        profiler = None
+        # cProfile cannot nest and only sees the calling thread; the outermost stage owns it.
+        if self.profile_dir is not None and not self._profiling:
+            profiler = cProfile.Profile()
+            self._profiling = True
+            profiler.enable()
+        wall, cpu = time.perf_counter(), cpu_seconds()
+        try:
+            yield timing
+        finally:
+            timing.wall_s = time.perf_counter() - wall
+            timing.cpu_s = cpu_seconds() - cpu
+            timing.peak_rss_mb = peak_rss_mb()
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+                self.profile_dir.mkdir(parents=True, exist_ok=True)
+                stats_path = self.profile_dir / f"{self.command or 'run'}.{name}.pstats"
+                profiler.dump_stats(stats_path)
+                logger.info("Profile written to %s", stats_path)
+            with self._lock:
+                self.stages.append(timing)
+
+    def to_dict(self) -> dict:
+        wall, cpu = self._started
+        with self._lock:
+            return {
+                "finished_at": iso_now(),
+                "wall_s": round(time.perf_counter() - wall, 6),
+                "cpu_s": round(cpu_seconds() - cpu, 6),
+                "peak_rss_mb": peak_rss_mb(),
+                "stages": [stage.to_dict() for stage in self.stages],
+                "counters": _series(self.counters),
+                "gauges": _series(self.gauges),
+                "histograms": _series({key: histogram.to_dict() for key, histogram in self.histograms.items()}),
+            }
+
+
+def _series(values: dict[tuple[str, Labels], Any]) -> dict[str, list[dict]]:
+    series: dict[str, list[dict]] = {}
+    for (name, labels), value in sorted(values.items(), key=lambda item: item[0]):
+        point = {"labels": dict(labels)}
+        point.update(value if isinstance(value, dict) else {"value": value})
+        series.setdefault(name, []).append(point)
+    return series
+
+
+def _prom_labels(labels: dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    escaped = []
+    for name, value in labels.items():
+        text = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{name}="{text}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def render_prometheus(snapshots: dict[str, dict], prefix: str = "sandcastle") -> str:
+    # The text format wants each family's samples in one group, so lines are collected per family first.
+    families: dict[str, tuple[str, list[str]]] = {}
+
+    def emit(name: str, kind: str, labels: dict[str, Any], value: Any, suffix: str = "") -> None:
+        family = f"{prefix}_{name}"
+        families.setdefault(family, (kind, []))[1].append(f"{family}{suffix}{_prom_labels(labels)} {value}")
+
+    for command, snapshot in sorted(snapshots.items()):
+        base = {"command": command}
+        for stage in snapshot.get("stages", []):
+            labels = {**base, "stage": stage["name"]}
+            emit("stage_wall_seconds", "gauge", labels, stage["wall_s"])
+            emit("stage_cpu_seconds", "gauge", labels, stage["cpu_s"])
+            emit("stage_rows", "gauge", labels, stage["rows"])
+            if stage.get("peak_rss_mb") is not None:
+                emit("stage_peak_rss_bytes", "gauge", labels, int(stage["peak_rss_mb"] * 1024 * 1024))
+        for kind in ("counters", "gauges"):
+            for name, series in snapshot.get(kind, {}).items():
+                for point in series:
+                    emit(name, "counter" if kind == "counters" else "gauge", {**base, **point["labels"]}, point["value"])
+        for name, series in snapshot.get("histograms", {}).items():
+            for point in series:
+                labels = {**base, **point["labels"]}
+                for bound, count in point["buckets"]:
+                    emit(name, "histogram", {**labels, "le": bound}, count, "_bucket")
+                emit(name, "histogram", labels, point["sum"], "_sum")
+                emit(name, "histogram", labels, point["count"], "_count")
+    lines = []
+    for family, (kind, samples) in families.items():
+        lines.append(f"# TYPE {family} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(metrics: Metrics, path: str | Path, prometheus_path: str | Path | None = None) -> dict:
+    # One file for all commands: each run replaces its own command's entry and keeps the others.
+    file_path = Path(path)
+    try:
+        snapshots = read_json(file_path)
+    except ValueError:
+        snapshots = {}
+    if not isinstance(snapshots, dict):
+        snapshots = {}
+    snapshots[metrics.command or "run"] = metrics.to_dict()
+    write_json(file_path, snapshots)
+    if prometheus_path is not None:
+        # Textfile collectors may read at any moment, so replace the file atomically.
+        prom_path = Path(prometheus_path)
+        prom_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = prom_path.with_name(f"{prom_path.name}.tmp")
+        tmp_path.write_text(render_prometheus(snapshots), encoding="utf-8")
+        os.replace(tmp_path, prom_path)
+    return snapshots
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+def set_metrics(metrics: Metrics) -> Metrics:
+    global _metrics
+    _metrics = metrics
+    return metrics
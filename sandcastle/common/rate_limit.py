@@ -1,7 +1,26 @@
 from __future__ import annotations
 
+import json
+import logging
+import math
+import threading
 import time
-from dataclasses import dataclass
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Iterator, Mapping
+
+try:  # cross-process locking is POSIX-only
+    import fcntl
+except ImportError:  # pragma: no cover - depends on platform
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitError(RuntimeError):
+    pass
 
 
 @dataclass
@@ -20,3 +39,148 @@ class RateLimiter:
 def backoff_sleep(attempt: int, base: float = 1.0, cap: float = 30.0) -> None:
     delay = min(cap, base * (2 ** max(0, attempt - 1)))
     time.sleep(delay)
+
+
+def parse_retry_after(value: str | None, now: float | None = None) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at - (time.time() if now is None else now))
+
+
+@dataclass
+class BucketState:
+    tokens: float
+    rate: float
+    updated: float
+    blocked_until: float = 0.0
+
+
+class TokenBucket:
+    def __init__(
+        self,
+        rate: float,
+        capacity: float = 1.0,
+        state_path: str | Path | None = None,
+        min_rate: float | None = None,
+        recovery: float = 0.1,
+    ):
+        # rate is requests per second; math.inf disables waiting except for server-imposed pauses.
+        self.max_rate = rate
+        self.capacity = max(1.0, capacity)
+        self.min_rate = min_rate if min_rate is not None else (rate / 16 if math.isfinite(rate) else 1.0)
+        self.recovery = recovery
+        self.state_path = Path(state_path) if state_path else None
+        self._lock = threading.Lock()
+        self._state = BucketState(tokens=self.capacity, rate=rate, updated=time.time())
+
+    @classmethod
+    def from_interval(
+        cls, interval_s: float, capacity: float = 1.0, state_path: str | Path | None = None
+    ) -> "TokenBucket":
+        return cls(1.0 / interval_s if interval_s > 0 else math.inf, capacity, state_path)
+
+    @contextmanager
+    def _locked(self) -> Iterator[BucketState]:
+        # State lives in a small JSON file when shared, so other processes see tokens and penalties too.
+        with self._lock:
+            if self.state_path is None:
+                yield self._state
+                return
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.state_path.open("a+") as handle:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_EX)
+                handle.seek(0)
+                try:
+                    state = BucketState(**json.loads(handle.read()))
+                except (ValueError, TypeError):
+                    state = BucketState(tokens=self.capacity, rate=self.max_rate, updated=time.time())
+                yield state
+                handle.seek(0)
+                handle.truncate()
+                handle.write(json.dumps(asdict(state)))
+                handle.flush()
+
+    def _refill(self, state: BucketState, now: float) -> None:
+        if math.isinf(state.rate):
+            state.tokens = self.capacity
+        else:
+            state.tokens = min(self.capacity, state.tokens + max(0.0, now - state.updated) * state.rate)
+        state.updated = now
+
+    def acquire(self) -> float:
+        waited = 0.0
+        while True:
+            with self._locked() as state:
+                now = time.time()
+                self._refill(state, now)
+                delay = state.blocked_until - now
+                if delay <= 0:
+                    if state.tokens >= 1.0:
+                        state.tokens -= 1.0
+                        return waited
+                    delay = (1.0 - state.tokens) / state.rate
+            time.sleep(delay)
+            waited += delay
+
+    def wait(self) -> None:
+        self.acquire()
+
+    def record_success(self) -> None:
+        # Additive increase back towards the configured rate after a penalty.
+        with self._locked() as state:
+            if state.rate < self.max_rate:
+                step = self.recovery * (self.max_rate if math.isfinite(self.max_rate) else self.min_rate)
+                state.rate = min(self.max_rate, state.rate + step)
+
+    def penalize(self, retry_after: float | None = None) -> None:
+        # Multiplicative decrease on 429; Retry-After (when sent) also pauses every sharer of this bucket.
+        with self._locked() as state:
+            now = time.time()
+            self._refill(state, now)
+            current = state.rate if math.isfinite(state.rate) else 2 * self.min_rate
+            state.rate = max(self.min_rate, min(current, self.max_rate) / 2)
+            state.tokens = min(state.tokens, 0.0)
+            pause = retry_after if retry_after is not None else 1.0 / state.rate
+            state.blocked_until = max(state.blocked_until, now + pause)
+        logger.info("Rate limited; slowing to %.3f req/s for %.1fs", state.rate, pause)
+
+    def observe(self, headers: Mapping[str, str]) -> bool:
+        # Reddit-style quota headers: requests left in the window and seconds until it resets.
+        remaining = _header_float(headers, "X-Ratelimit-Remaining")
+        reset = _header_float(headers, "X-Ratelimit-Reset")
+        if remaining is None or reset is None:
+            return False
+        with self._locked() as state:
+            if remaining < 1:
+                state.blocked_until = max(state.blocked_until, time.time() + reset)
+            else:
+                state.rate = max(self.min_rate, min(self.max_rate, remaining / max(reset, 1.0)))
+        return True
+
+    def handle_response(self, status_code: int, headers: Mapping[str, str]) -> bool:
+        quota = self.observe(headers)
+        if status_code == 429:
+            self.penalize(parse_retry_after(headers.get("Retry-After")))
+            return False
+        if not quota:
+            self.record_success()
+        return True
+
+
+def _header_float(headers: Mapping[str, str], name: str) -> float | None:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
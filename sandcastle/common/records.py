@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import logging
+import typing
+from dataclasses import MISSING, dataclass, field, fields
+from pathlib import Path
+from typing import Any, Generic, Iterable, TypeVar
+
+from sandcastle.common.codec import get_codec, msgspec
+from sandcastle.common.io import iter_jsonl_spans
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class RecordError(ValueError):
+    pass
+
+
+@dataclass(slots=True)
+class RawRow:
+    id: str
+    query: str
+    engine: str
+    source_url: str
+    title: str
+    snippet: str
+    collected_at: str
+    rank: int = 0
+    meta: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class RedditPostRow:
+    id: str
+    query: str
+    window: str
+    source_url: str
+    title: str
+    selftext: str
+    subreddit: str
+    score: int
+    num_comments: int
+    created_utc: int
+    collected_at: str
+    meta: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class DedupedItem:
+    id: str
+    canonical_url: str
+    original_urls: list[str]
+    titles: list[str]
+    snippets: list[str]
+    queries: list[str]
+    engines: list[str]
+    first_seen: str
+    last_seen: str
+    flags: dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def _matches(value: Any, hint: Any) -> bool:
+    origin = typing.get_origin(hint) or hint
+    if origin is int:
+        return isinstance(value, int) and not isinstance(value, bool)
+    if origin is list:
+        (item_hint,) = typing.get_args(hint)
+        return isinstance(value, list) and all(_matches(item, item_hint) for item in value)
+    if origin is dict:
+        return isinstance(value, dict)
+    return isinstance(value, origin)
+
+
+_HINTS: dict[type, list[tuple[str, Any, bool]]] = {}
+
+
+def _field_hints(record_type: type) -> list[tuple[str, Any, bool]]:
+    if record_type not in _HINTS:
+        hints = typing.get_type_hints(record_type)
+        _HINTS[record_type] = [
+            (item.name, hints[item.name], item.default is MISSING and item.default_factory is MISSING)
+            for item in fields(record_type)
+        ]
+    return _HINTS[record_type]
+
+
+def record_from_dict(record_type: type[T], row: Any) -> T:
+    if not isinstance(row, dict):
+        raise RecordError(f"Expected object, got {type(row).__name__}")
+    values = {}
+    for name, hint, required in _field_hints(record_type):
+        if name not in row:
+            if required:
+                raise RecordError(f"Missing field: {name}")
+            continue
+        value = row[name]
+        if not _matches(value, hint):
+            raise RecordError(f"Invalid type for field: {name}")
+        values[name] = value
+    return record_type(**values)
+
+
+@dataclass
+class DecodeStats:
+    rows: int = 0
+    malformed: int = 0
+    invalid: int = 0
+
+    def log(self, path: str | Path) -> None:
+        if self.malformed or self.invalid:
+            logger.warning(
+                "Skipped rows while decoding %s: %d malformed JSON, %d failed schema validation",
+                path,
+                self.malformed,
+                self.invalid,
+            )
+
+
+class RecordDecoder(Generic[T]):
+    def __init__(self, record_type: type[T]):
+        self.record_type = record_type
+        self.stats = DecodeStats()
+        self._typed = msgspec.json.Decoder(record_type) if msgspec is not None else None
+        self._codec = get_codec()
+
+    def decode(self, line: bytes) -> T:
+        if self._typed is not None:
+            try:
+                return self._typed.decode(line)
+            except msgspec.ValidationError as exc:
+                raise RecordError(str(exc)) from exc
+        return record_from_dict(self.record_type, self._codec.loads(line))
+
+    def convert(self, row: Any) -> T:
+        # Same validation as decode() for a row that is already parsed.
+        if isinstance(row, self.record_type):
+            return row
+        if self._typed is not None:
+            try:
+                return msgspec.convert(row, self.record_type)
+            except msgspec.ValidationError as exc:
+                raise RecordError(str(exc)) from exc
+        return record_from_dict(self.record_type, row)
+
+    @property
+    def malformed_errors(self) -> tuple[type[BaseException], ...]:
+        if self._typed is not None:
+            return (msgspec.DecodeError,)
+        return self._codec.decode_errors
+
+
+def read_records(path: str | Path, decoder: RecordDecoder[T], offset: int = 0) -> Iterable[tuple[T, int]]:
+    for record, _, end in read_record_spans(path, decoder, offset):
+        yield record, end
+
+
+def read_record_spans(path: str | Path, decoder: RecordDecoder[T], offset: int = 0) -> Iterable[tuple[T, int, int]]:
+    # (record, start, end): start is the record's own line, so it can be re-read later by seeking there.
+    malformed_errors = decoder.malformed_errors
+    stats = decoder.stats
+    for line, start, end, terminated in iter_jsonl_spans(path, offset):
+        try:
+            record = decoder.decode(line)
+        except RecordError:
+            stats.invalid += 1
+            continue
+        except malformed_errors:
+            if not terminated:
+                return
+            stats.malformed += 1
+            continue
+        stats.rows += 1
+        yield record, start, end
+
+
+def convert_records(rows: Iterable[Any], decoder: RecordDecoder[T]) -> Iterable[T]:
+    # In-memory counterpart of read_records: rows failing validation are counted in decoder.stats and skipped.
+    stats = decoder.stats
+    for row in rows:
+        try:
+            record = decoder.convert(row)
+        except RecordError:
+            stats.invalid += 1
+            continue
+        stats.rows += 1
+        yield record
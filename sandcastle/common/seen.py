@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any
+
+from sandcastle.common.codec import get_codec
+from sandcastle.common.io import file_checkpoint, iter_jsonl_lines
+from sandcastle.common.segments import log_size
+
+logger = logging.getLogger(__name__)
+
+SEEN_INDEX_VERSION = 1
+
+
+def seen_index_path(source: str | Path) -> Path:
+    source_path = Path(source)
+    return source_path.with_name(f"{source_path.stem}.seen.sqlite")
+
+
+def _key(row_id: str) -> bytes:
+    # Row ids are sha256 hex digests; store the 32 raw bytes instead of 64 characters.
+    if len(row_id) == 64:
+        try:
+            return bytes.fromhex(row_id)
+        except ValueError:
+            pass
+    return row_id.encode("utf-8")
+
+
+class SeenSnapshot:
+    def __init__(self, index: "SeenIndex", seq: int):
+        self.index = index
+        self.seq = seq
+
+    def __contains__(self, row_id: object) -> bool:
+        return isinstance(row_id, str) and self.index.contains(row_id, self.seq)
+
+
+class SeenIndex:
+    def __init__(self, source: str | Path, path: str | Path | None = None):
+        self.source = Path(source)
+        self.path = Path(path) if path is not None else seen_index_path(self.source)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value) WITHOUT ROWID")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen (key BLOB PRIMARY KEY, seq INTEGER NOT NULL) WITHOUT ROWID"
+        )
+        self._seq = self._meta("seq", 0)
+        self._catch_up()
+        self.opened_seq = self._seq
+
+    def _meta(self, name: str, default: Any) -> Any:
+        row = self._conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return default if row is None else row[0]
+
+    def _set_meta(self, name: str, value: Any) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, value))
+
+    def _catch_up(self) -> None:
+        offset = self._meta("offset", 0)
+        size = log_size(self.source)
+        if (
+            self._meta("version", SEEN_INDEX_VERSION) != SEEN_INDEX_VERSION
+            or size < offset
+            or file_checkpoint(self.source, offset) != self._meta("checkpoint", "")
+        ):
+            logger.info("Rebuilding seen-id index for %s", self.source)
+            self._conn.execute("DELETE FROM seen")
+            self._seq = 0
+            offset = 0
+        if size == offset:
+            self._commit(offset)
+            return
+        # Rows appended since the last commit (by a crashed run or another tool) are folded in here.
+        codec = get_codec()
+        for line, position, terminated in iter_jsonl_lines(self.source, offset):
+            if not terminated:
+                break
+            try:
+                row = codec.loads(line)
+            except codec.decode_errors:
+                row = None
+            if isinstance(row, dict) and isinstance(row.get("id"), str):
+                self._insert(row["id"])
+            offset = position
+        self._commit(offset)
+
+    def _insert(self, row_id: str) -> bool:
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO seen (key, seq) VALUES (?, ?)", (_key(row_id), self._seq + 1)
+        )
+        if cursor.rowcount:
+            self._seq += 1
+            return True
+        return False
+
+    def _commit(self, offset: int) -> None:
+        self._set_meta("version", SEEN_INDEX_VERSION)
+        self._set_meta("offset", offset)
+        self._set_meta("checkpoint", file_checkpoint(self.source, offset))
+        self._set_meta("seq", self._seq)
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        return self._seq
+
+    def __contains__(self, row_id: object) -> bool:
+        return isinstance(row_id, str) and self.contains(row_id)
+
+    def contains(self, row_id: str, max_seq: int | None = None) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT seq FROM seen WHERE key = ?", (_key(row_id),)).fetchone()
+        return row is not None and (max_seq is None or row[0] <= max_seq)
+
+    def snapshot(self) -> SeenSnapshot:
+        return SeenSnapshot(self, self._seq)
+
+    def add(self, row_id: str) -> bool:
+        with self._lock:
+            return self._insert(row_id)
+
+    def commit(self) -> None:
+        # Call after the JSONL writer has flushed: the stored offset must cover every committed id.
+        with self._lock:
+            self._commit(log_size(self.source))
+
+    def close(self, commit: bool = True) -> None:
+        if commit:
+            self.commit()
+        else:
+            self._conn.rollback()
+        self._conn.close()
+
+    def __enter__(self) -> "SeenIndex":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        # On error the uncommitted ids are dropped; the next open re-reads them from the JSONL.
+        self.close(commit=exc_type is None)
@@ -0,0 +1,535 @@
+from __future__ import annotations
+
+import gzip
+import io
+import logging
+import os
+import shutil
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from sandcastle.common.codec import get_codec
+from sandcastle.common.hash import sha256_text
+from sandcastle.common.time import iso_now
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_MANIFEST_VERSION = 1
+CHECKPOINT_BYTES = 1024
+ROLL_MODES = ("size", "daily")
+COMPRESSIONS = ("auto", "zstd", "gzip")
+_SUFFIXES = {"zstd": ".zst", "gzip": ".gz"}
+
+
+@dataclass(frozen=True)
+class StorageSettings:
+    # segment_bytes == 0 and roll == "size" keeps the append-only logs as single plain files.
+    segment_bytes: int = 0
+    roll: str = "size"
+    compression: str = "auto"
+    workers: int = 4
+
+    @classmethod
+    def from_config(cls, section: dict) -> "StorageSettings":
+        roll = section.get("roll", "size")
+        if roll not in ROLL_MODES:
+            raise ValueError(f"Unknown io.segments roll mode: {roll}")
+        compression = section.get("compression", "auto")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown io.segments compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("io.segments compression 'zstd' requested but zstandard is not installed")
+        return cls(
+            segment_bytes=int(float(section.get("segment_mb", 0)) * 1024 * 1024),
+            roll=roll,
+            compression=compression,
+            workers=max(1, int(section.get("workers", 4))),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.segment_bytes > 0 or self.roll == "daily"
+
+    @property
+    def codec(self) -> str:
+        if self.compression == "auto":
+            return "zstd" if zstandard is not None else "gzip"
+        return self.compression
+
+
+_storage = StorageSettings()
+
+
+def get_storage() -> StorageSettings:
+    return _storage
+
+
+def set_storage(settings: StorageSettings) -> StorageSettings:
+    global _storage
+    _storage = settings
+    return _storage
+
+
+@dataclass
+class Segment:
+    # start/size are in logical (uncompressed) bytes: offsets into a segmented log match the plain file it replaces.
+    name: str
+    start: int
+    size: int
+    rows: int
+    compression: str
+    stored_bytes: int
+    min_collected_at: str | None = None
+    max_collected_at: str | None = None
+    tail_checkpoint: str = ""
+
+    @property
+    def end(self) -> int:
+        return self.start + self.size
+
+
+@dataclass
+class Manifest:
+    segments: list[Segment] = field(default_factory=list)
+    # Bytes at the head of the active file that a roll already sealed but had not yet truncated.
+    tail_offset: int = 0
+
+    @property
+    def sealed_bytes(self) -> int:
+        return self.segments[-1].end if self.segments else 0
+
+    @property
+    def sealed_rows(self) -> int:
+        return sum(segment.rows for segment in self.segments)
+
+
+def segments_dir(path: str | Path) -> Path:
+    file_path = Path(path)
+    return file_path.with_name(file_path.name + ".segments")
+
+
+def manifest_path(path: str | Path) -> Path:
+    return segments_dir(path) / "manifest.json"
+
+
+def load_manifest(path: str | Path) -> Manifest | None:
+    manifest_file = manifest_path(path)
+    if not manifest_file.exists():
+        return None
+    payload = get_codec().loads(manifest_file.read_bytes())
+    if payload.get("version") != SEGMENT_MANIFEST_VERSION:
+        raise ValueError(f"Unsupported segment manifest version in {manifest_file}")
+    return Manifest(
+        segments=[Segment(**segment) for segment in payload["segments"]],
+        tail_offset=payload.get("tail_offset", 0),
+    )
+
+
+def save_manifest(path: str | Path, manifest: Manifest) -> None:
+    manifest_file = manifest_path(path)
+    payload = {
+        "version": SEGMENT_MANIFEST_VERSION,
+        "updated_at": iso_now(),
+        "tail_offset": manifest.tail_offset,
+        "segments": [asdict(segment) for segment in manifest.segments],
+    }
+    _replace_bytes(manifest_file, get_codec().dumps(payload, pretty=True) + b"\n")
+
+
+def _replace_bytes(target: Path, data: bytes) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + ".tmp")
+    with tmp.open("wb") as handle:
+        handle.write(data)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp, target)
+
+
+def _active_size(path: Path) -> int:
+    return path.stat().st_size if path.exists() else 0
+
+
+def log_size(path: str | Path) -> int:
+    # Logical size: what st_size would be if the log were still one plain file.
+    file_path = Path(path)
+    manifest = load_manifest(file_path)
+    if manifest is None:
+        return _active_size(file_path)
+    return manifest.sealed_bytes + max(0, _active_size(file_path) - manifest.tail_offset)
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def compress_writer(handle: Any, codec: str, size: int) -> Any:
+    # Streaming counterpart of compress(); closing the writer ends the frame but leaves handle open.
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3).stream_writer(handle, size=size, closefd=False)
+    return gzip.GzipFile(filename="", mode="wb", compresslevel=6, fileobj=handle, mtime=0)
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Segment is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def read_segment(path: str | Path, segment: Segment) -> bytes:
+    return decompress((segments_dir(path) / segment.name).read_bytes(), segment.compression)
+
+
+def iter_segment_data(
+    path: str | Path, segments: list[Segment], workers: int | None = None
+) -> Iterator[tuple[Segment, bytes]]:
+    # zlib and zstd release the GIL, so threads decompress upcoming segments while the caller parses this one.
+    # At most `workers` decompressed segments are held ahead of the consumer.
+    workers = workers or get_storage().workers
+    if workers <= 1 or len(segments) <= 1:
+        for segment in segments:
+            yield segment, read_segment(path, segment)
+        return
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="segments") as pool:
+        remaining = iter(segments)
+        pending = deque((segment, pool.submit(read_segment, path, segment)) for _, segment in zip(range(workers), remaining))
+        while pending:
+            segment, future = pending.popleft()
+            upcoming = next(remaining, None)
+            if upcoming is not None:
+                pending.append((upcoming, pool.submit(read_segment, path, upcoming)))
+            yield segment, future.result()
+
+
+def iter_log_spans(
+    path: str | Path, offset: int = 0, since: str | None = None, workers: int | None = None
+) -> Iterator[tuple[bytes, int, int, bool]]:
+    # Same contract as io.iter_jsonl_spans, with logical positions. Sealed segments that end before the offset
+    # (or whose newest row predates `since`) are never opened.
+    file_path = Path(path)
+    manifest = load_manifest(file_path) or Manifest()
+    wanted = [
+        segment
+        for segment in manifest.segments
+        if segment.end > offset and not (since and segment.max_collected_at and segment.max_collected_at < since)
+    ]
+    for segment, data in iter_segment_data(file_path, wanted, workers):
+        position = max(offset, segment.start)
+        buffer = io.BytesIO(data)
+        buffer.seek(position - segment.start)
+        for raw_line in buffer:
+            start = position
+            position += len(raw_line)
+            line = raw_line.strip()
+            if line:
+                yield line, start, position, True
+    if not file_path.exists():
+        return
+    position = max(offset, manifest.sealed_bytes)
+    with file_path.open("rb") as handle:
+        handle.seek(position - manifest.sealed_bytes + manifest.tail_offset)
+        for raw_line in handle:
+            start = position
+            position += len(raw_line)
+            line = raw_line.strip()
+            if line:
+                yield line, start, position, raw_line.endswith(b"\n")
+
+
+def iter_log_lines(
+    path: str | Path, offset: int = 0, since: str | None = None, workers: int | None = None
+) -> Iterator[tuple[bytes, int, bool]]:
+    for line, _, end, terminated in iter_log_spans(path, offset, since, workers):
+        yield line, end, terminated
+
+
+class LogReader:
+    # Random access by logical offset. Decompressed segments are kept in a small LRU bounded by cache_bytes.
+    def __init__(self, path: str | Path, cache_bytes: int = 256 * 1024 * 1024):
+        self.path = Path(path)
+        self.manifest = load_manifest(self.path) or Manifest()
+        self._starts = [segment.start for segment in self.manifest.segments]
+        self.cache_bytes = cache_bytes
+        self._cache: OrderedDict[str, bytes] = OrderedDict()
+        self._cached_bytes = 0
+        self._handle = None
+
+    def _segment_data(self, segment: Segment) -> bytes:
+        data = self._cache.get(segment.name)
+        if data is not None:
+            self._cache.move_to_end(segment.name)
+            return data
+        data = read_segment(self.path, segment)
+        self._cache[segment.name] = data
+        self._cached_bytes += len(data)
+        while self._cached_bytes > self.cache_bytes and len(self._cache) > 1:
+            _, dropped = self._cache.popitem(last=False)
+            self._cached_bytes -= len(dropped)
+        return data
+
+    def _segment_at(self, offset: int) -> Segment | None:
+        idx = bisect_right(self._starts, offset) - 1
+        if idx >= 0 and offset < self.manifest.segments[idx].end:
+            return self.manifest.segments[idx]
+        return None
+
+    def _active(self):
+        if self._handle is None:
+            self._handle = self.path.open("rb")
+        return self._handle
+
+    def read_line(self, offset: int) -> bytes:
+        segment = self._segment_at(offset)
+        if segment is not None:
+            data = self._segment_data(segment)
+            local = offset - segment.start
+            end = data.find(b"\n", local)
+            return data[local:] if end < 0 else data[local:end + 1]
+        handle = self._active()
+        handle.seek(offset - self.manifest.sealed_bytes + self.manifest.tail_offset)
+        return handle.readline()
+
+    def read_range(self, start: int, end: int) -> bytes:
+        chunks = []
+        position = start
+        while position < end:
+            segment = self._segment_at(position)
+            if segment is None:
+                break
+            stop = min(end, segment.end)
+            chunks.append(self._segment_data(segment)[position - segment.start:stop - segment.start])
+            position = stop
+        if position < end and self.path.exists():
+            handle = self._active()
+            handle.seek(position - self.manifest.sealed_bytes + self.manifest.tail_offset)
+            chunks.append(handle.read(end - position))
+        return b"".join(chunks)
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        self._cache.clear()
+        self._cached_bytes = 0
+
+    def __enter__(self) -> "LogReader":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def checkpoint_digest(chunk: bytes) -> str:
+    return sha256_text(chunk.decode("utf-8", errors="replace"))
+
+
+def log_checkpoint(path: str | Path, offset: int) -> str:
+    # The hash covers the CHECKPOINT_BYTES before offset; a segment boundary reuses the digest stored at roll time.
+    manifest = load_manifest(path) or Manifest()
+    for segment in manifest.segments:
+        if segment.end == offset and segment.size >= CHECKPOINT_BYTES and segment.tail_checkpoint:
+            return segment.tail_checkpoint
+    with LogReader(path) as reader:
+        return checkpoint_digest(reader.read_range(max(0, offset - CHECKPOINT_BYTES), offset))
+
+
+def _row_stats(lines: Iterable[bytes]) -> tuple[int, str | None, str | None]:
+    codec = get_codec()
+    rows = 0
+    oldest = newest = None
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = codec.loads(line)
+        except codec.decode_errors:
+            continue
+        rows += 1
+        collected_at = row.get("collected_at") if isinstance(row, dict) else None
+        if isinstance(collected_at, str):
+            oldest = collected_at if oldest is None or collected_at < oldest else oldest
+            newest = collected_at if newest is None or collected_at > newest else newest
+    return rows, oldest, newest
+
+
+def _first_collected_at(path: Path, skip: int) -> str | None:
+    with path.open("rb") as handle:
+        handle.seek(skip)
+        line = handle.readline().strip()
+    if not line:
+        return None
+    codec = get_codec()
+    try:
+        row = codec.loads(line)
+    except codec.decode_errors:
+        return None
+    value = row.get("collected_at") if isinstance(row, dict) else None
+    return value if isinstance(value, str) else None
+
+
+def _drop_prefix(path: Path, count: int) -> None:
+    # Streams what follows the first `count` bytes into a replacement file; the sealed prefix is never loaded.
+    if _active_size(path) <= count:
+        with path.open("wb") as handle:
+            handle.flush()
+            os.fsync(handle.fileno())
+        return
+    tmp = path.with_name(path.name + ".tmp")
+    with path.open("rb") as source, tmp.open("wb") as target:
+        source.seek(count)
+        shutil.copyfileobj(source, target, 1024 * 1024)
+        target.flush()
+        os.fsync(target.fileno())
+    os.replace(tmp, path)
+
+
+def _finish_roll(path: Path, manifest: Manifest) -> None:
+    # A roll interrupted between recording segments and emptying the active file: drop the sealed prefix now.
+    if manifest.tail_offset <= 0:
+        return
+    _drop_prefix(path, manifest.tail_offset)
+    manifest.tail_offset = 0
+    save_manifest(path, manifest)
+
+
+def roll_due(path: str | Path, settings: StorageSettings | None = None) -> bool:
+    settings = settings or get_storage()
+    file_path = Path(path)
+    if not settings.enabled or not file_path.exists():
+        return False
+    manifest = load_manifest(file_path) or Manifest()
+    active = _active_size(file_path) - manifest.tail_offset
+    if active <= 0:
+        return False
+    if settings.segment_bytes and active >= settings.segment_bytes:
+        return True
+    if settings.roll == "daily":
+        first = _first_collected_at(file_path, manifest.tail_offset)
+        return first is not None and first[:10] < iso_now()[:10]
+    return False
+
+
+def _cut_points(handle: Any, size: int, segment_bytes: int, seal_rest: bool) -> list[int]:
+    # Segment ends in the active file: each cut is the first line end at or past segment_bytes from the last.
+    cuts = []
+    position = 0
+    while segment_bytes and size - position >= segment_bytes:
+        handle.seek(position + segment_bytes - 1)
+        handle.readline()
+        position = min(handle.tell(), size)
+        cuts.append(position)
+    if seal_rest and position < size:
+        cuts.append(size)
+    return cuts
+
+
+def _copy_lines(handle: Any, size: int, writer: Any, tail: bytearray) -> Iterator[bytes]:
+    remaining = size
+    while remaining > 0:
+        line = handle.readline(remaining)
+        if not line:
+            break
+        remaining -= len(line)
+        writer.write(line)
+        tail += line
+        del tail[:-CHECKPOINT_BYTES]
+        yield line
+
+
+def _seal(file_path: Path, manifest: Manifest, handle: Any, size: int, codec: str) -> Segment:
+    # Compresses the next `size` bytes of the active file into a segment file, one line at a time.
+    name = f"{len(manifest.segments) + 1:06d}.jsonl{_SUFFIXES[codec]}"
+    target = segments_dir(file_path) / name
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + ".tmp")
+    tail = bytearray()
+    with tmp.open("wb") as out:
+        writer = compress_writer(out, codec, size)
+        rows, oldest, newest = _row_stats(_copy_lines(handle, size, writer, tail))
+        writer.close()
+        out.flush()
+        os.fsync(out.fileno())
+        stored_bytes = out.tell()
+    os.replace(tmp, target)
+    return Segment(
+        name=name,
+        start=manifest.sealed_bytes,
+        size=size,
+        rows=rows,
+        compression=codec,
+        stored_bytes=stored_bytes,
+        min_collected_at=oldest,
+        max_collected_at=newest,
+        tail_checkpoint=checkpoint_digest(bytes(tail)),
+    )
+
+
+def roll_segment(path: str | Path, settings: StorageSettings | None = None, force: bool = False) -> Segment | None:
+    # Seals the active file into compressed segments of about segment_bytes each, cut at line ends. In size mode
+    # a remainder shorter than segment_bytes stays active; daily rolls and `force` seal everything. Callers must
+    # not hold an open append handle: the active file is replaced once the sealed prefix is dropped.
+    settings = settings or get_storage()
+    file_path = Path(path)
+    manifest = load_manifest(file_path)
+    if manifest is not None:
+        _finish_roll(file_path, manifest)
+    if not force and not roll_due(file_path, settings):
+        return None
+    manifest = manifest or Manifest()
+    size = _active_size(file_path)
+    if not size:
+        return None
+
+    sealed = []
+    with file_path.open("rb") as handle:
+        handle.seek(size - 1)
+        if handle.read(1) != b"\n":
+            # A torn final line means a writer crashed mid-row; sealing it would freeze the damage into a segment.
+            logger.warning("Not rolling %s: the last line is incomplete", file_path)
+            return None
+        cuts = _cut_points(handle, size, settings.segment_bytes, force or settings.roll == "daily")
+        handle.seek(0)
+        for cut in cuts:
+            segment = _seal(file_path, manifest, handle, cut - manifest.tail_offset, settings.codec)
+            # Recorded segment by segment, so a crash mid-roll loses nothing: the next roll drops the prefix.
+            manifest.segments.append(segment)
+            manifest.tail_offset = cut
+            save_manifest(file_path, manifest)
+            sealed.append(segment)
+            logger.info(
+                "Sealed %s segment %s: %d rows, %d -> %d bytes",
+                file_path.name,
+                segment.name,
+                segment.rows,
+                segment.size,
+                segment.stored_bytes,
+            )
+    _finish_roll(file_path, manifest)
+    return sealed[-1] if sealed else None
+
+
+def segment_summary(path: str | Path) -> dict[str, Any] | None:
+    manifest = load_manifest(path)
+    if manifest is None:
+        return None
+    return {
+        "segments": len(manifest.segments),
+        "sealed_rows": manifest.sealed_rows,
+        "sealed_bytes": manifest.sealed_bytes,
+        "stored_bytes": sum(segment.stored_bytes for segment in manifest.segments),
+    }
+
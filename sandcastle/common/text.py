@@ -21,13 +21,19 @@ def normalize(text: str) -> str:
 
 
 def tokenize(text: str) -> list[str]:
-    normalized = normalize(text)
+    return tokens_from_normalized(normalize(text))
+
+
+def tokens_from_normalized(normalized: str) -> list[str]:
     tokens = [token for token in normalized.split(" ") if token and token not in STOPWORDS]
     return tokens
 
 
 def shingles(text: str, size: int = 3) -> set[str]:
-    tokens = tokenize(text)
+    return shingles_from_tokens(tokenize(text), size=size)
+
+
+def shingles_from_tokens(tokens: list[str], size: int = 3) -> set[str]:
     if len(tokens) < size:
         return set(tokens)
     return {" ".join(tokens[idx: idx + size]) for idx in range(len(tokens) - size + 1)}
@@ -32,6 +32,18 @@ class Config:
     def reddit(self) -> dict[str, Any]:
         return self.raw.get("reddit", {})
 
+    @property
+    def dedupe(self) -> dict[str, Any]:
+        return self.raw.get("dedupe", {})
+
+    @property
+    def http(self) -> dict[str, Any]:
+        return self.raw.get("http", {})
+
+    @property
+    def io(self) -> dict[str, Any]:
+        return self.raw.get("io", {})
+
     @property
     def clustering(self) -> dict[str, Any]:
         return self.raw.get("clustering", {})
@@ -4,9 +4,9 @@ import json
 import os
 from pathlib import Path
 
-import requests
-
+from sandcastle.common.http import TRANSPORT_ERRORS, HttpSettings, build_transport
 from sandcastle.config import Config, resolve_path
+from sandcastle.reddit.search import REDDIT_SEARCH_URL
 
 
 def check_writable(path: Path) -> bool:
@@ -16,9 +16,19 @@ def check_writable(path: Path) -> bool:
 
 def run_doctor(config: Config) -> None:
     checks = []
+    transport = build_transport(HttpSettings.from_config(config.http))
 
     outputs = config.outputs
-    for key in ["raw_results", "deduped", "clusters", "terms", "quality", "reddit_posts", "reddit_intents"]:
+    for key in [
+        "raw_results",
+        "deduped",
+        "clusters",
+        "terms",
+        "quality",
+        "process_state",
+        "reddit_posts",
+        "reddit_intents",
+    ]:
         path = resolve_path(config.path.parent, outputs.get(key, f"data/{key}"))
         checks.append({"check": f"output_writable:{key}", "ok": check_writable(path)})
 
@@ -28,24 +38,25 @@ def run_doctor(config: Config) -> None:
             ok = False
             if endpoint:
                 try:
-                    resp = requests.get(endpoint, params={"q": "test", "format": "json"}, timeout=5)
+                    resp = transport.get(endpoint, params={"q": "test", "format": "json"}, timeout=5)
                     ok = resp.status_code < 400
-                except requests.RequestException:
+                except TRANSPORT_ERRORS:
                     ok = False
             checks.append({"check": "searxng_reachable", "ok": ok, "endpoint": endpoint})
 
     reddit_query = (config.reddit.get("queries") or [None])[0]
     if reddit_query:
         try:
-            resp = requests.get(
-                "https://www.reddit.com/search.json",
+            resp = transport.get(
+                config.reddit.get("endpoint", REDDIT_SEARCH_URL),
                 params={"q": reddit_query, "limit": 1, "type": "link"},
                 headers={"User-Agent": "sandcastle/0.1"},
                 timeout=5,
             )
             ok = resp.status_code < 400
-        except requests.RequestException:
+        except TRANSPORT_ERRORS:
             ok = False
         checks.append({"check": "reddit_reachable", "ok": ok})
 
+    transport.close()
     print(json.dumps({"checks": checks}, ensure_ascii=False, indent=2))
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Any, Iterable
+
+from sandcastle.common.columnar import DATASETS, ParquetSettings, ParquetSink, require_pyarrow
+from sandcastle.common.io import read_json, read_jsonl
+from sandcastle.config import Config, resolve_path
+
+logger = logging.getLogger(__name__)
+
+EXPORT_SOURCES = {
+    "raw_results": ("raw_results", "data/raw_results.jsonl"),
+    "reddit_posts": ("reddit_posts", "data/reddit_posts.jsonl"),
+    "deduped": ("deduped", "data/deduped.json"),
+}
+
+
+def iter_dataset_rows(dataset: str, path: Path, since: str | None = None) -> Iterable[dict[str, Any]]:
+    if dataset == "deduped":
+        # deduped.json is one JSON array; setting outputs.deduped_parquet lets `process` skip this re-parse.
+        payload = read_json(path)
+        items = payload if isinstance(payload, list) else []
+        return (item for item in items if not since or str(item.get("last_seen", "")) >= since)
+    return (row for row in read_jsonl(path, since=since) if isinstance(row, dict))
+
+
+def run_export(
+    config: Config, datasets: list[str] | None = None, out_dir: str | None = None, since: str | None = None
+) -> dict[str, Path]:
+    require_pyarrow()
+    settings = ParquetSettings.from_config(config.raw.get("export", {}))
+    target = resolve_path(config.path.parent, out_dir or config.outputs.get("export_dir", "data/export"))
+    written = {}
+    for dataset in datasets or list(DATASETS):
+        key, default = EXPORT_SOURCES[dataset]
+        source = resolve_path(config.path.parent, config.outputs.get(key, default))
+        rows = iter_dataset_rows(dataset, source, since)
+        path = target / f"{dataset}.parquet"
+        with ParquetSink(path, dataset, settings) as sink:
+            sink.write_many(rows)
+        written[dataset] = path
+    return written
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from sandcastle.common.text import normalize, shingles_from_tokens, tokens_from_normalized
+from sandcastle.processor.minhash import hash_shingle
+
+
+@dataclass(slots=True)
+class ItemAnalysis:
+    text: str
+    tokens: list[str]
+    shingles: set[str]
+
+    @property
+    def hashed_shingles(self) -> list[int]:
+        return [hash_shingle(shingle) for shingle in sorted(self.shingles)]
+
+
+def analyze_text(text: str, shingle_size: int = 3) -> ItemAnalysis:
+    normalized = normalize(text)
+    tokens = tokens_from_normalized(normalized)
+    return ItemAnalysis(text=normalized, tokens=tokens, shingles=shingles_from_tokens(tokens, size=shingle_size))
+
+
+def item_text(item: dict) -> str:
+    return " ".join(item.get("titles", []) + item.get("snippets", []))
+
+
+def analyze_items(items: list[dict]) -> dict[str, ItemAnalysis]:
+    return {item["id"]: analyze_text(item_text(item)) for item in items}
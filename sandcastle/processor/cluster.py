@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 import re
-from collections import defaultdict
+from collections import Counter
+from itertools import chain
 
-from sandcastle.common.text import normalize, tokenize, limit_tag_length
+from sandcastle.common.text import normalize
+from sandcastle.processor.analysis import ItemAnalysis, analyze_items
+from sandcastle.processor.matcher import KeywordAutomaton, TagMatcher
 
 DEFAULT_TAGS = {
     "pdf": re.compile(r"\bpdf\b"),
@@ -18,36 +21,55 @@ DEFAULT_TAGS = {
 }
 
 
-def tag_intents(text: str, extra_tags: dict[str, str] | None = None) -> list[str]:
+def compile_tags(extra_tags: dict[str, str] | None = None) -> TagMatcher:
     tags = dict(DEFAULT_TAGS)
     if extra_tags:
         tags.update({name: re.compile(pattern) for name, pattern in extra_tags.items()})
-    found = [limit_tag_length(name) for name, pattern in tags.items() if pattern.search(text)]
-    return sorted(set(found))
+    return TagMatcher(tags)
+
+
+def tag_intents(text: str, extra_tags: dict[str, str] | None = None) -> list[str]:
+    return compile_tags(extra_tags).match(text)
+
+
+class ClusterMatcher:
+    def __init__(self, clusters: list[dict], extra_tags: dict[str, str] | None = None):
+        # Clusters are indexed in cluster_id order so the lowest index wins a tie on hits.
+        self.clusters = sorted(clusters, key=lambda cluster: cluster["cluster_id"])
+        self.tags = compile_tags(extra_tags)
+        keywords = [[normalize(keyword) for keyword in cluster.get("keywords", [])] for cluster in self.clusters]
+        self.automaton = KeywordAutomaton(keyword for cluster_keywords in keywords for keyword in cluster_keywords)
+        pattern_ids = {pattern: idx for idx, pattern in enumerate(self.automaton.patterns)}
+        # Keyword -> clusters listing it (once per listing, so repeated keywords still count twice).
+        self._pattern_clusters: list[list[int]] = [[] for _ in self.automaton.patterns]
+        # An empty keyword is a substring of every text, so it always scores.
+        self._base_hits: Counter[int] = Counter()
+        for cluster_idx, cluster_keywords in enumerate(keywords):
+            for keyword in cluster_keywords:
+                if keyword:
+                    self._pattern_clusters[pattern_ids[keyword]].append(cluster_idx)
+                else:
+                    self._base_hits[cluster_idx] += 1
 
+    def match(self, item: dict, analysis: ItemAnalysis) -> dict | None:
+        hits = self._base_hits.copy()
+        pattern_clusters = self._pattern_clusters
+        hits.update(chain.from_iterable(pattern_clusters[idx] for idx in self.automaton.find(analysis.text)))
+        if not hits:
+            return None
+        best_hits = max(hits.values())
+        best_idx = min(idx for idx, count in hits.items() if count == best_hits)
+        tag_text = " ".join(item.get("snippets", []) + item.get("titles", []))
+        return {"cluster_id": self.clusters[best_idx]["cluster_id"], "intent_tags": self.tags.match(tag_text)}
 
-def assign_clusters(items: list[dict], clusters: list[dict], extra_tags: dict[str, str] | None = None) -> dict:
+
+def build_cluster_payload(clusters: list[dict], memberships: dict[str, dict]) -> dict:
     cluster_map = {cluster["cluster_id"]: cluster for cluster in clusters}
     assignments: dict[str, dict] = {cluster["cluster_id"]: {"items": [], "intent_tags": []} for cluster in clusters}
-
-    for item in items:
-        text = normalize(" ".join(item.get("titles", []) + item.get("snippets", [])))
-        best_cluster = None
-        best_hits = 0
-        for cluster in clusters:
-            keywords = cluster.get("keywords", [])
-            hits = sum(1 for keyword in keywords if normalize(keyword) in text)
-            if hits > best_hits:
-                best_hits = hits
-                best_cluster = cluster
-            elif hits == best_hits and hits > 0 and best_cluster:
-                if cluster["cluster_id"] < best_cluster["cluster_id"]:
-                    best_cluster = cluster
-        if best_cluster and best_hits > 0:
-            cluster_id = best_cluster["cluster_id"]
-            assignments[cluster_id]["items"].append(item["id"])
-            tag_text = " ".join(item.get("snippets", []) + item.get("titles", []))
-            assignments[cluster_id]["intent_tags"].extend(tag_intents(tag_text, extra_tags))
+    for item_id, membership in memberships.items():
+        payload = assignments[membership["cluster_id"]]
+        payload["items"].append(item_id)
+        payload["intent_tags"].extend(membership["intent_tags"])
 
     clusters_out = []
     for cluster_id, payload in assignments.items():
@@ -68,13 +90,34 @@ def assign_clusters(items: list[dict], clusters: list[dict], extra_tags: dict[st
     return {"clusters": clusters_out}
 
 
-def flatten_cluster_text(items: list[dict], cluster_items: list[str]) -> list[str]:
-    item_map = {item["id"]: item for item in items}
+def assign_clusters(
+    items: list[dict],
+    clusters: list[dict],
+    extra_tags: dict[str, str] | None = None,
+    analyses: dict[str, ItemAnalysis] | None = None,
+) -> dict:
+    if analyses is None:
+        analyses = analyze_items(items)
+    matcher = ClusterMatcher(clusters, extra_tags)
+    memberships: dict[str, dict] = {}
+    for item in items:
+        membership = matcher.match(item, analyses[item["id"]])
+        if membership:
+            memberships[item["id"]] = membership
+    return build_cluster_payload(clusters, memberships)
+
+
+def flatten_cluster_text(
+    items: list[dict],
+    cluster_items: list[str],
+    analyses: dict[str, ItemAnalysis] | None = None,
+) -> list[str]:
+    if analyses is None:
+        analyses = analyze_items(items)
     tokens: list[str] = []
     for item_id in cluster_items:
-        item = item_map.get(item_id)
-        if not item:
+        analysis = analyses.get(item_id)
+        if not analysis:
             continue
-        combined = " ".join(item.get("titles", []) + item.get("snippets", []))
-        tokens.extend(tokenize(combined))
+        tokens.extend(analysis.tokens)
     return tokens
@@ -1,15 +1,28 @@
 from __future__ import annotations
 
-from collections import defaultdict
+import base64
+import math
+from array import array
+from collections import Counter, OrderedDict, defaultdict
 from dataclasses import dataclass
-from typing import Iterable
+from pathlib import Path
+from typing import Iterable, Iterator
 
-from sandcastle.common.text import normalize
+from sandcastle.common.records import DedupedItem, RawRow, RecordDecoder, RecordError, convert_records
+from sandcastle.common.segments import LogReader
+from sandcastle.common.text import shingles
 from sandcastle.common.url import canonicalize_url
-from sandcastle.processor.minhash import jaccard_similarity
+from sandcastle.processor.analysis import analyze_text
+from sandcastle.processor.minhash import (
+    LSHIndex,
+    LSHParams,
+    MinHasher,
+    estimate_similarity,
+    jaccard_sets,
+)
 
 
-@dataclass
+@dataclass(slots=True)
 class RawItem:
     id: str
     canonical_url: str
@@ -20,96 +33,447 @@ class RawItem:
     engine: str
     collected_at: str
 
+    @classmethod
+    def from_row(cls, raw: RawRow, canonical_url: str | None = None) -> "RawItem":
+        return cls(
+            id=raw.id,
+            canonical_url=canonicalize_url(raw.source_url) if canonical_url is None else canonical_url,
+            source_url=raw.source_url,
+            title=raw.title,
+            snippet=raw.snippet,
+            query=raw.query,
+            engine=raw.engine,
+            collected_at=raw.collected_at,
+        )
+
+
+@dataclass(slots=True)
+class ItemFeatures:
+    canonical_url: str
+    text: str
+    shingles: set[str]
+    signature: tuple[int, ...]
+    band_hashes: list[int]
+
+
+def item_features(raw: RawRow, hasher: MinHasher, index: LSHIndex) -> ItemFeatures:
+    analysis = analyze_text(f"{raw.title} {raw.snippet}")
+    signature = hasher.signature(analysis.hashed_shingles)
+    return ItemFeatures(
+        canonical_url=canonicalize_url(raw.source_url),
+        text=analysis.text,
+        shingles=analysis.shingles,
+        signature=signature,
+        band_hashes=index.band_hashes(signature),
+    )
+
+
+@dataclass(slots=True)
+class DedupeGroup:
+    first_seen: str
+    first_id: str
+    canonical_url: str
+    last_seen: str
+    original_urls: set[str]
+    titles: set[str]
+    snippets: set[str]
+    queries: set[str]
+    engines: set[str]
+
+    @classmethod
+    def from_item(cls, item: RawItem) -> "DedupeGroup":
+        return cls(
+            first_seen=item.collected_at,
+            first_id=item.id,
+            canonical_url=item.canonical_url,
+            last_seen=item.collected_at,
+            original_urls={item.source_url} if item.source_url else set(),
+            titles={item.title} if item.title else set(),
+            snippets={item.snippet} if item.snippet else set(),
+            queries={item.query} if item.query else set(),
+            engines={item.engine} if item.engine else set(),
+        )
+
+    @classmethod
+    def from_state(cls, payload: dict) -> "DedupeGroup":
+        return cls(
+            first_seen=payload["first_seen"],
+            first_id=payload["first_id"],
+            canonical_url=payload["canonical_url"],
+            last_seen=payload["last_seen"],
+            original_urls=set(payload["original_urls"]),
+            titles=set(payload["titles"]),
+            snippets=set(payload["snippets"]),
+            queries=set(payload["queries"]),
+            engines=set(payload["engines"]),
+        )
+
+    def merge(self, other: "DedupeGroup") -> None:
+        if (other.first_seen, other.first_id) < (self.first_seen, self.first_id):
+            self.first_seen = other.first_seen
+            self.first_id = other.first_id
+            self.canonical_url = other.canonical_url
+        self.last_seen = max(self.last_seen, other.last_seen)
+        self.original_urls |= other.original_urls
+        self.titles |= other.titles
+        self.snippets |= other.snippets
+        self.queries |= other.queries
+        self.engines |= other.engines
+
+    def to_record(self, group_id: str) -> DedupedItem:
+        return DedupedItem(
+            id=group_id,
+            canonical_url=self.canonical_url,
+            original_urls=sorted(self.original_urls),
+            titles=sorted(self.titles),
+            snippets=sorted(self.snippets),
+            queries=sorted(self.queries),
+            engines=sorted(self.engines),
+            first_seen=self.first_seen,
+            last_seen=self.last_seen,
+            flags={"blocked": False, "suspicious": False},
+        )
+
+    def to_dict(self, group_id: str) -> dict:
+        return self.to_record(group_id).to_dict()
+
+    def to_state(self) -> dict:
+        payload = self.to_dict("")
+        payload.pop("id")
+        payload.pop("flags")
+        payload["first_id"] = self.first_id
+        return payload
+
 
 class UnionFind:
-    def __init__(self, items: list[str]):
-        self.parent = {item: item for item in items}
+    def __init__(self, items: Iterable[str] = ()):
+        # Items are interned to integer ids; each root also tracks its lexicographically smallest
+        # member, which is what find() reports, so group ids do not depend on union order.
+        self.ids: dict[str, int] = {}
+        self.items: list[str] = []
+        self._parent = array("i")
+        self._size = array("i")
+        self._smallest = array("i")
+        for item in items:
+            self.add(item)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __contains__(self, item: str) -> bool:
+        return item in self.ids
+
+    def add(self, item: str) -> int:
+        idx = self.ids.get(item)
+        if idx is None:
+            idx = len(self.items)
+            self.ids[item] = idx
+            self.items.append(item)
+            self._parent.append(idx)
+            self._size.append(1)
+            self._smallest.append(idx)
+        return idx
+
+    def _root(self, idx: int) -> int:
+        parent = self._parent
+        root = idx
+        while parent[root] != root:
+            root = parent[root]
+        while parent[idx] != root:
+            parent[idx], idx = root, parent[idx]
+        return root
 
     def find(self, item: str) -> str:
-        if self.parent[item] != item:
-            self.parent[item] = self.find(self.parent[item])
-        return self.parent[item]
+        return self.items[self._smallest[self._root(self.ids[item])]]
 
-    def union(self, left: str, right: str) -> None:
-        root_left = self.find(left)
-        root_right = self.find(right)
-        if root_left == root_right:
-            return
-        chosen = min(root_left, root_right)
-        other = max(root_left, root_right)
-        self.parent[other] = chosen
+    def union(self, left: str, right: str) -> str:
+        root_left = self._root(self.ids[left])
+        root_right = self._root(self.ids[right])
+        if root_left != root_right:
+            if self._size[root_left] < self._size[root_right]:
+                root_left, root_right = root_right, root_left
+            self._parent[root_right] = root_left
+            self._size[root_left] += self._size[root_right]
+            if self.items[self._smallest[root_right]] < self.items[self._smallest[root_left]]:
+                self._smallest[root_left] = self._smallest[root_right]
+        return self.items[self._smallest[root_left]]
+
+    def to_parents(self) -> dict[str, str]:
+        return {item: self.find(item) for item in sorted(self.items)}
+
+    @classmethod
+    def from_parents(cls, parents: dict[str, str]) -> "UnionFind":
+        uf = cls(parents)
+        for item, root in parents.items():
+            uf.add(root)
+            uf.union(item, root)
+        return uf
+
+
+def similar_pairs(shingle_sets: dict[str, set[str]], similarity_threshold: float) -> Iterator[tuple[str, str]]:
+    # Prefix filtering: order shingles rarest-first; two sets with Jaccard >= t must share one of the
+    # first |x| - ceil(t * |x|) + 1 shingles of each, so only sets meeting in that prefix are compared.
+    frequency = Counter(shingle for item_shingles in shingle_sets.values() for shingle in item_shingles)
+    index: dict[str, list[str]] = defaultdict(list)
+    for item in sorted(shingle_sets, key=lambda item: (len(shingle_sets[item]), item)):
+        item_shingles = shingle_sets[item]
+        size = len(item_shingles)
+        if not size:
+            continue
+        prefix_len = size - math.ceil(similarity_threshold * size - 1e-9) + 1
+        prefix = sorted(item_shingles, key=lambda shingle: (frequency[shingle], shingle))[:prefix_len]
+        min_size = similarity_threshold * size - 1e-9
+        seen: set[str] = set()
+        for shingle in prefix:
+            for other in index[shingle]:
+                if other in seen:
+                    continue
+                seen.add(other)
+                if len(shingle_sets[other]) < min_size:
+                    continue
+                if jaccard_sets(item_shingles, shingle_sets[other]) >= similarity_threshold:
+                    yield other, item
+            index[shingle].append(item)
 
 
 def union_find_groups(items: list[str], similarity_threshold: float = 0.85) -> list[list[str]]:
     sorted_items = sorted(items)
     uf = UnionFind(sorted_items)
-    for idx, item in enumerate(sorted_items):
-        for other in sorted_items[idx + 1:]:
-            if item == other:
-                continue
-            score = jaccard_similarity(item, other, shingle_size=2)
-            if score >= similarity_threshold:
-                uf.union(item, other)
+    shingle_sets = {item: shingles(item, size=2) for item in sorted_items}
+    if similarity_threshold <= 0:
+        # Every pair scores at least 0.0, so everything collapses into one group.
+        for item in sorted_items:
+            uf.union(sorted_items[0], item)
+    else:
+        empty = [item for item, item_shingles in shingle_sets.items() if not item_shingles]
+        if similarity_threshold <= 1.0:
+            # jaccard_sets scores two empty sets as 1.0.
+            for item in empty:
+                uf.union(empty[0], item)
+        for left, right in similar_pairs(shingle_sets, similarity_threshold):
+            uf.union(left, right)
     groups: dict[str, list[str]] = defaultdict(list)
     for item in sorted_items:
         groups[uf.find(item)].append(item)
     return [sorted(group) for group in groups.values()]
 
 
-def dedupe_items(raw_items: Iterable[dict]) -> list[dict]:
-    items: list[RawItem] = []
-    for raw in raw_items:
-        items.append(
-            RawItem(
-                id=raw.get("id"),
-                canonical_url=canonicalize_url(raw.get("source_url", "")),
-                source_url=raw.get("source_url", ""),
-                title=raw.get("title", ""),
-                snippet=raw.get("snippet", ""),
-                query=raw.get("query", ""),
-                engine=raw.get("engine", ""),
-                collected_at=raw.get("collected_at", ""),
-            )
-        )
+class DedupeIndex:
+    def __init__(
+        self,
+        similarity_threshold: float = 0.85,
+        params: LSHParams | None = None,
+        verify: bool = True,
+        source: Path | None = None,
+        shingle_cache_size: int = 100_000,
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.params = params or LSHParams()
+        self.verify = verify
+        self.hasher = MinHasher(self.params.num_perm, self.params.seed)
+        self.index = LSHIndex(self.params.bands, self.params.rows)
+        self.uf = UnionFind([])
+        self.url_map: dict[str, str] = {}
+        self.source = source
+        self.offsets: dict[str, int] = {}
+        self.texts: dict[str, str] = {}
+        # With verify off, MinHash signatures are kept flat, num_perm values per union-find id.
+        self.signatures = array("I")
+        self.groups: dict[str, DedupeGroup] = {}
+        self.touched: set[str] = set()
+        self.removed: set[str] = set()
+        self.shingle_cache_size = shingle_cache_size
+        # LSH candidates seen and similarity scores actually computed (candidates already grouped are skipped).
+        self.candidates = 0
+        self.comparisons = 0
+        self._shingles: OrderedDict[str, set[str]] = OrderedDict()
+        self._source_handle = None
+        self._source_decoder = RecordDecoder(RawRow)
 
-    items.sort(key=lambda item: item.id)
-    uf = UnionFind([item.id for item in items])
+    def features(self, raw: RawRow) -> ItemFeatures:
+        return item_features(raw, self.hasher, self.index)
 
-    url_map: dict[str, str] = {}
-    for item in items:
-        if item.canonical_url in url_map:
-            uf.union(item.id, url_map[item.canonical_url])
+    def add(self, raw: RawRow, offset: int | None = None, features: ItemFeatures | None = None) -> None:
+        if features is None:
+            features = self.features(raw)
+        item = RawItem.from_row(raw, features.canonical_url)
+        idx = self.uf.add(item.id)
+        if not self.verify:
+            self._store_signature(idx, features.signature)
+        group = DedupeGroup.from_item(item)
+        root = self.uf.find(item.id)
+        if root in self.groups:
+            self.groups[root].merge(group)
         else:
-            url_map[item.canonical_url] = item.id
-
-    for idx, item in enumerate(items):
-        text_a = normalize(f"{item.title} {item.snippet}")
-        for other in items[idx + 1:]:
-            text_b = normalize(f"{other.title} {other.snippet}")
-            score = jaccard_similarity(text_a, text_b)
-            if score >= 0.85:
-                uf.union(item.id, other.id)
-
-    grouped: dict[str, list[RawItem]] = defaultdict(list)
-    for item in items:
-        grouped[uf.find(item.id)].append(item)
-
-    results = []
-    for group_id, group_items in grouped.items():
-        group_items.sort(key=lambda item: item.collected_at)
-        results.append(
-            {
-                "id": group_id,
-                "canonical_url": group_items[0].canonical_url,
-                "original_urls": sorted({item.source_url for item in group_items if item.source_url}),
-                "titles": sorted({item.title for item in group_items if item.title}),
-                "snippets": sorted({item.snippet for item in group_items if item.snippet}),
-                "queries": sorted({item.query for item in group_items if item.query}),
-                "engines": sorted({item.engine for item in group_items if item.engine}),
-                "first_seen": group_items[0].collected_at,
-                "last_seen": group_items[-1].collected_at,
-                "flags": {"blocked": False, "suspicious": False},
-            }
-        )
+            self.groups[root] = group
+        self.touched.add(root)
+
+        if item.canonical_url in self.url_map:
+            self._union(item.id, self.url_map[item.canonical_url])
+        else:
+            self.url_map[item.canonical_url] = item.id
+
+        if offset is not None and self.source is not None:
+            self.offsets[item.id] = offset
+            self.texts.pop(item.id, None)
+        else:
+            self.texts[item.id] = features.text
+        self._cache_shingles(item.id, features.shingles)
+        for other_id in self.index.insert_hashes(item.id, features.band_hashes):
+            self.candidates += 1
+            if self.uf.find(item.id) == self.uf.find(other_id):
+                continue
+            self.comparisons += 1
+            if self.verify:
+                score = jaccard_sets(features.shingles, self._item_shingles(other_id))
+            else:
+                score = estimate_similarity(features.signature, self._signature(other_id))
+            if score >= self.similarity_threshold:
+                self._union(item.id, other_id)
+
+    def _store_signature(self, idx: int, signature: tuple[int, ...]) -> None:
+        start = idx * self.params.num_perm
+        if start == len(self.signatures):
+            self.signatures.extend(signature)
+        else:
+            self.signatures[start:start + self.params.num_perm] = array("I", signature)
+
+    def _signature(self, item_id: str) -> array:
+        start = self.uf.ids[item_id] * self.params.num_perm
+        return self.signatures[start:start + self.params.num_perm]
+
+    def _cache_shingles(self, item_id: str, item_shingles: set[str]) -> None:
+        self._shingles[item_id] = item_shingles
+        self._shingles.move_to_end(item_id)
+        while len(self._shingles) > self.shingle_cache_size:
+            self._shingles.popitem(last=False)
+
+    def _item_shingles(self, item_id: str) -> set[str]:
+        cached = self._shingles.get(item_id)
+        if cached is None:
+            cached = analyze_text(self._item_text(item_id)).shingles
+            self._cache_shingles(item_id, cached)
+        return cached
+
+    def _item_text(self, item_id: str) -> str:
+        if item_id in self.texts:
+            return self.texts[item_id]
+        if self._source_handle is None:
+            self._source_handle = LogReader(self.source)
+        # Offsets point at the row's own line; state written before that pointed at the end of the previous
+        # valid row, so blank, malformed or invalid lines in between are skipped.
+        offset = self.offsets[item_id]
+        skipped = (RecordError, *self._source_decoder.malformed_errors)
+        while True:
+            raw_line = self._source_handle.read_line(offset)
+            if not raw_line:
+                raise KeyError(item_id)
+            offset += len(raw_line)
+            line = raw_line.strip()
+            if not line:
+                continue
+            try:
+                raw = self._source_decoder.decode(line)
+            except skipped:
+                continue
+            if raw.id == item_id:
+                return f"{raw.title} {raw.snippet}"
+
+    def close(self) -> None:
+        if self._source_handle is not None:
+            self._source_handle.close()
+            self._source_handle = None
+
+    def _union(self, left: str, right: str) -> None:
+        root_left = self.uf.find(left)
+        root_right = self.uf.find(right)
+        if root_left == root_right:
+            return
+        root = self.uf.union(left, right)
+        other = root_right if root == root_left else root_left
+        self.groups[root].merge(self.groups.pop(other))
+        self.touched.discard(other)
+        self.touched.add(root)
+        self.removed.add(other)
+
+    def drain_changes(self) -> tuple[set[str], set[str]]:
+        touched, removed = self.touched, self.removed - self.touched
+        self.touched, self.removed = set(), set()
+        return touched, removed
+
+    def item(self, group_id: str) -> dict:
+        return self.groups[group_id].to_dict(group_id)
+
+    def iter_results(self) -> Iterator[dict]:
+        for group_id in sorted(self.groups):
+            yield self.item(group_id)
+
+    def results(self) -> list[dict]:
+        return list(self.iter_results())
+
+    def _pack_rows(self, values: array, width: int) -> str:
+        # Rows in sorted item order, which is the union-find order from_parents() rebuilds on load.
+        ordered = array(values.typecode)
+        for item in sorted(self.uf.items) if values else ():
+            start = self.uf.ids[item] * width
+            ordered.extend(values[start:start + width])
+        return base64.b64encode(ordered.tobytes()).decode("ascii")
+
+    def _band_rows(self) -> array:
+        # Band hashes live only in the LSH buckets; the per-item rows are recovered from them for the state.
+        bands = self.params.bands
+        rows = array("Q", [0]) * (bands * len(self.uf))
+        ids = self.uf.ids
+        for (band, value), keys in self.index.buckets.items():
+            for key in keys:
+                rows[ids[key] * bands + band] = value
+        return rows
+
+    def to_state(self) -> dict:
+        return {
+            "parents": self.uf.to_parents(),
+            "url_map": dict(sorted(self.url_map.items())),
+            "offsets": dict(sorted(self.offsets.items())),
+            "texts": dict(sorted(self.texts.items())),
+            "band_hashes": self._pack_rows(self._band_rows(), self.params.bands),
+            "signatures": self._pack_rows(self.signatures, self.params.num_perm),
+            "groups": {group_id: group.to_state() for group_id, group in sorted(self.groups.items())},
+        }
+
+    @classmethod
+    def from_state(
+        cls,
+        payload: dict,
+        similarity_threshold: float = 0.85,
+        params: LSHParams | None = None,
+        verify: bool = True,
+        source: Path | None = None,
+        shingle_cache_size: int = 100_000,
+    ) -> "DedupeIndex":
+        dedupe = cls(similarity_threshold, params, verify, source, shingle_cache_size)
+        dedupe.uf = UnionFind.from_parents(payload["parents"])
+        dedupe.url_map = dict(payload["url_map"])
+        dedupe.offsets = dict(payload["offsets"])
+        dedupe.texts = dict(payload["texts"])
+        dedupe.signatures.frombytes(base64.b64decode(payload["signatures"]))
+        band_rows = array("Q", base64.b64decode(payload["band_hashes"]))
+        bands = dedupe.params.bands
+        for idx, item in enumerate(dedupe.uf.items):
+            dedupe.index.restore(item, band_rows[idx * bands:(idx + 1) * bands])
+        dedupe.groups = {group_id: DedupeGroup.from_state(group) for group_id, group in payload["groups"].items()}
+        return dedupe
+
 
-    return sorted(results, key=lambda item: item["id"])
+def dedupe_items(
+    raw_items: Iterable[dict | RawRow],
+    similarity_threshold: float = 0.85,
+    params: LSHParams | None = None,
+    verify: bool = True,
+) -> list[dict]:
+    decoder = RecordDecoder(RawRow)
+    records = list(convert_records(raw_items, decoder))
+    decoder.stats.log("dedupe input")
+    dedupe = DedupeIndex(similarity_threshold, params, verify)
+    for raw in sorted(records, key=lambda raw: raw.id):
+        dedupe.add(raw)
+    return dedupe.results()
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import re
+from collections import deque
+from typing import Iterable
+
+from sandcastle.common.text import limit_tag_length
+
+
+class KeywordAutomaton:
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = list(dict.fromkeys(pattern for pattern in patterns if pattern))
+        self._goto: list[dict[str, int]] = [{}]
+        self._out: list[tuple[int, ...]] = [()]
+        for pattern_id, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._out.append(())
+                    self._goto[state][char] = nxt
+                state = nxt
+            self._out[state] = self._out[state] + (pattern_id,)
+        self._build_failure_links()
+
+    def _build_failure_links(self) -> None:
+        # Breadth-first, so each state's failure target is already resolved into a full transition table
+        # by the time its children need it; scanning then costs one dict lookup per character.
+        goto = self._goto
+        queue = deque((child, 0) for child in goto[0].values())
+        while queue:
+            state, fail = queue.popleft()
+            self._out[state] = self._out[state] + self._out[fail]
+            fail_goto = goto[fail]
+            for char, child in goto[state].items():
+                queue.append((child, fail_goto.get(char, 0) if state else 0))
+            for char, target in fail_goto.items():
+                goto[state].setdefault(char, target)
+
+    def find(self, text: str) -> set[int]:
+        goto = self._goto
+        visited = set()
+        state = 0
+        for char in text:
+            state = goto[state].get(char, 0)
+            visited.add(state)
+        out = self._out
+        found: set[int] = set()
+        for state in visited:
+            found.update(out[state])
+        return found
+
+
+_NUMBERED_GROUP_REF = re.compile(r"\\[1-9]|\(\?\(\d")
+
+
+class TagMatcher:
+    def __init__(self, tags: dict[str, re.Pattern]):
+        self.tags = [(limit_tag_length(name), pattern) for name, pattern in tags.items()]
+        self._gate: re.Pattern | None = None
+        # One alternation over every tag: if it finds nothing, no individual pattern can match either.
+        if self.tags and all(
+            pattern.flags == re.UNICODE and not _NUMBERED_GROUP_REF.search(pattern.pattern) for _, pattern in self.tags
+        ):
+            try:
+                self._gate = re.compile("|".join(f"(?:{pattern.pattern})" for _, pattern in self.tags))
+            except re.error:
+                self._gate = None
+
+    def match(self, text: str) -> list[str]:
+        if self._gate is not None and not self._gate.search(text):
+            return []
+        return sorted({name for name, pattern in self.tags if pattern.search(text)})
@@ -1,11 +1,18 @@
 from __future__ import annotations
 
+import hashlib
+import random
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Iterable, Sequence
+
 from sandcastle.common.text import shingles
 
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
 
-def jaccard_similarity(text_a: str, text_b: str, shingle_size: int = 3) -> float:
-    set_a = shingles(text_a, size=shingle_size)
-    set_b = shingles(text_b, size=shingle_size)
+
+def jaccard_sets(set_a: set, set_b: set) -> float:
     if not set_a and not set_b:
         return 1.0
     if not set_a or not set_b:
@@ -13,3 +20,99 @@ def jaccard_similarity(text_a: str, text_b: str, shingle_size: int = 3) -> float
     intersection = len(set_a & set_b)
     union = len(set_a | set_b)
     return intersection / union
+
+
+def jaccard_similarity(text_a: str, text_b: str, shingle_size: int = 3) -> float:
+    set_a = shingles(text_a, size=shingle_size)
+    set_b = shingles(text_b, size=shingle_size)
+    return jaccard_sets(set_a, set_b)
+
+
+def hash_shingle(shingle: str) -> int:
+    digest = hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "big")
+
+
+@dataclass(frozen=True)
+class LSHParams:
+    num_perm: int = 128
+    bands: int = 16
+    rows: int = 8
+    seed: int = 1
+
+    def __post_init__(self) -> None:
+        if self.bands <= 0 or self.rows <= 0:
+            raise ValueError("LSH bands and rows must be positive")
+        if self.bands * self.rows > self.num_perm:
+            raise ValueError(
+                f"LSH bands*rows ({self.bands}*{self.rows}) exceeds num_perm ({self.num_perm})"
+            )
+
+    @classmethod
+    def from_config(cls, section: dict) -> "LSHParams":
+        return cls(
+            num_perm=int(section.get("num_perm", cls.num_perm)),
+            bands=int(section.get("bands", cls.bands)),
+            rows=int(section.get("rows", cls.rows)),
+            seed=int(section.get("seed", cls.seed)),
+        )
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.permutations = [
+            (rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, hashed_shingles: Iterable[int]) -> tuple[int, ...]:
+        values = list(hashed_shingles)
+        if not values:
+            return (MAX_HASH,) * self.num_perm
+        prime = MERSENNE_PRIME
+        return tuple(
+            min([((a * value + b) % prime) & MAX_HASH for value in values])
+            for a, b in self.permutations
+        )
+
+
+def band_hash(values: Sequence[int]) -> int:
+    payload = b"".join(value.to_bytes(4, "big") for value in values)
+    return int.from_bytes(hashlib.blake2b(payload, digest_size=8).digest(), "big")
+
+
+def estimate_similarity(sig_a: Sequence[int], sig_b: Sequence[int]) -> float:
+    if not sig_a:
+        return 0.0
+    matches = sum(1 for left, right in zip(sig_a, sig_b) if left == right)
+    return matches / len(sig_a)
+
+
+@dataclass
+class LSHIndex:
+    bands: int
+    rows: int
+    buckets: dict[tuple[int, int], list[str]] = field(default_factory=lambda: defaultdict(list))
+
+    def band_hashes(self, signature: Sequence[int]) -> list[int]:
+        rows = self.rows
+        return [band_hash(signature[band * rows:(band + 1) * rows]) for band in range(self.bands)]
+
+    def insert(self, key: str, signature: Sequence[int]) -> list[str]:
+        return self.insert_hashes(key, self.band_hashes(signature))
+
+    def insert_hashes(self, key: str, hashes: Sequence[int]) -> list[str]:
+        candidates: dict[str, None] = {}
+        for band, value in enumerate(hashes):
+            bucket = self.buckets[(band, value)]
+            for other in bucket:
+                candidates[other] = None
+            bucket.append(key)
+        candidates.pop(key, None)
+        return list(candidates)
+
+    def restore(self, key: str, hashes: Sequence[int]) -> None:
+        for band, value in enumerate(hashes):
+            self.buckets[(band, value)].append(key)
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator
+
+from sandcastle.common.records import RawRow
+from sandcastle.processor.dedupe import ItemFeatures, item_features
+from sandcastle.processor.minhash import LSHIndex, LSHParams, MinHasher
+
+_hasher: MinHasher | None = None
+_index: LSHIndex | None = None
+
+
+def _init_worker(params: LSHParams) -> None:
+    global _hasher, _index
+    _hasher = MinHasher(params.num_perm, params.seed)
+    _index = LSHIndex(params.bands, params.rows)
+
+
+def _featurize(rows: list[RawRow]) -> list[ItemFeatures]:
+    return [item_features(row, _hasher, _index) for row in rows]
+
+
+def iter_features(
+    records: Iterable[tuple[RawRow, int, int]],
+    params: LSHParams,
+    workers: int,
+    batch_size: int = 512,
+) -> Iterator[tuple[RawRow, int, int, ItemFeatures]]:
+    # Batches come back in input order, so the caller applies unions exactly as a single-process run would.
+    records = iter(records)
+    pending: deque[tuple[list[tuple[RawRow, int, int]], Future]] = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(params,)) as pool:
+        while True:
+            while len(pending) < workers * 2:
+                batch = list(islice(records, batch_size))
+                if not batch:
+                    break
+                pending.append((batch, pool.submit(_featurize, [row for row, _, _ in batch])))
+            if not pending:
+                return
+            batch, future = pending.popleft()
+            for (row, start, end), features in zip(batch, future.result()):
+                yield row, start, end, features
@@ -1,18 +1,34 @@
 from __future__ import annotations
 
 from collections import Counter
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
 from urllib.parse import urlparse
 
 
-def compute_quality(raw_count: int, deduped: list[dict], clusters: dict) -> dict:
-    deduped_count = len(deduped)
-    dedupe_ratio = 1.0 - (deduped_count / raw_count) if raw_count else 0.0
+@dataclass
+class QualityCounters:
+    raw_count: int = 0
+    deduped_count: int = 0
+    domains: Counter = field(default_factory=Counter)
 
-    domains = Counter()
-    for item in deduped:
+    def observe(self, item: dict) -> None:
+        self.deduped_count += 1
         domain = urlparse(item.get("canonical_url", "")).netloc
         if domain:
-            domains[domain] += 1
+            self.domains[domain] += 1
+
+    def track(self, items: Iterable[dict]) -> Iterator[dict]:
+        for item in items:
+            self.observe(item)
+            yield item
+
+
+def compute_quality(counters: QualityCounters, clusters: dict) -> dict:
+    raw_count = counters.raw_count
+    deduped_count = counters.deduped_count
+    dedupe_ratio = 1.0 - (deduped_count / raw_count) if raw_count else 0.0
+    domains = counters.domains
 
     top_domains = [{"domain": domain, "count": count} for domain, count in domains.most_common(10)]
 
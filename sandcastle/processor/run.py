@@ -1,40 +1,139 @@
 from __future__ import annotations
 
 import logging
+from contextlib import nullcontext
 
-from sandcastle.common.io import read_jsonl, write_json
+from sandcastle.common.columnar import ParquetSettings, ParquetSink, require_pyarrow
+from sandcastle.common.io import file_checkpoint, write_json, write_json_array
+from sandcastle.common.metrics import get_metrics
+from sandcastle.common.records import RawRow, RecordDecoder, read_record_spans
 from sandcastle.config import Config, resolve_path
-from sandcastle.processor.cluster import assign_clusters
-from sandcastle.processor.dedupe import dedupe_items
+from sandcastle.processor.analysis import analyze_items
+from sandcastle.processor.cluster import ClusterMatcher, build_cluster_payload
+from sandcastle.processor.dedupe import DedupeIndex
+from sandcastle.processor.minhash import LSHParams
+from sandcastle.processor.parallel import iter_features
+from sandcastle.processor.state import ProcessState, config_fingerprint, load_state, save_state
 from sandcastle.processor.terms import build_terms
-from sandcastle.processor.quality import compute_quality
+from sandcastle.processor.quality import QualityCounters, compute_quality
 
 logger = logging.getLogger(__name__)
 
 
-def run_process(config: Config) -> None:
+def run_process(config: Config, full_rebuild: bool = False, workers: int = 1) -> None:
     outputs = config.outputs
     raw_path = resolve_path(config.path.parent, outputs.get("raw_results", "data/raw_results.jsonl"))
     deduped_path = resolve_path(config.path.parent, outputs.get("deduped", "data/deduped.json"))
     clusters_path = resolve_path(config.path.parent, outputs.get("clusters", "data/clusters.json"))
     terms_path = resolve_path(config.path.parent, outputs.get("terms", "data/terms.json"))
     quality_path = resolve_path(config.path.parent, outputs.get("quality", "data/quality.json"))
+    state_path = resolve_path(config.path.parent, outputs.get("process_state", "data/process_state.json"))
+    parquet_output = outputs.get("deduped_parquet")
+    parquet_path = resolve_path(config.path.parent, parquet_output) if parquet_output else None
+    if parquet_path is not None:
+        require_pyarrow()
 
-    raw_items = list(read_jsonl(raw_path))
-    deduped_items = dedupe_items(raw_items)
-    clusters_cfg = config.clustering.get("clusters", [])
-    extra_tags = config.clustering.get("intent_tags", {})
-    clusters = assign_clusters(deduped_items, clusters_cfg, extra_tags)
-    terms = build_terms(deduped_items, clusters)
-    for cluster in clusters.get("clusters", []):
-        term_payload = terms.get("cluster_terms", {}).get(cluster["cluster_id"], {})
-        cluster["top_terms"] = [item["term"] for item in term_payload.get("top_terms", [])]
-        cluster["top_bigrams"] = [item["bigram"] for item in term_payload.get("top_bigrams", [])]
-    quality = compute_quality(len(raw_items), deduped_items, clusters)
-
-    write_json(deduped_path, deduped_items)
-    write_json(clusters_path, clusters)
-    write_json(terms_path, terms)
-    write_json(quality_path, quality)
-
-    logger.info("Processing complete", extra={"deduped": len(deduped_items)})
+    dedupe_cfg = config.dedupe
+    similarity_threshold = float(dedupe_cfg.get("similarity_threshold", 0.85))
+    params = LSHParams.from_config(dedupe_cfg)
+    verify = bool(dedupe_cfg.get("verify", True))
+    shingle_cache_size = int(dedupe_cfg.get("shingle_cache", 100_000))
+
+    fingerprint = config_fingerprint(config)
+    state = None if full_rebuild else load_state(state_path, fingerprint, raw_path)
+    if state is None:
+        logger.info("Rebuilding processor outputs from scratch")
+        state = ProcessState(fingerprint=fingerprint)
+        dedupe = DedupeIndex(similarity_threshold, params, verify, raw_path, shingle_cache_size)
+    else:
+        dedupe = DedupeIndex.from_state(
+            state.dedupe, similarity_threshold, params, verify, raw_path, shingle_cache_size
+        )
+
+    metrics = get_metrics()
+    # Pass 1: stream new rows into the union-find/LSH index; rows are referenced by byte offset, not kept.
+    # With workers, shingling and MinHash signatures run in a process pool; unions stay here, in row order.
+    with metrics.stage("dedupe") as stage:
+        offset = state.offset
+        decoder = RecordDecoder(RawRow)
+        records = read_record_spans(raw_path, decoder, state.offset)
+        if workers > 1:
+            featured = iter_features(records, params, workers)
+        else:
+            featured = ((row, start, end, None) for row, start, end in records)
+        try:
+            for row, start, end, features in featured:
+                dedupe.add(row, start, features)
+                offset = end
+        finally:
+            dedupe.close()
+        decoder.stats.log(raw_path)
+        new_rows = decoder.stats.rows
+        touched, removed = dedupe.drain_changes()
+        stage.rows = new_rows
+    metrics.inc("dedupe_candidates_total", dedupe.candidates)
+    metrics.inc("dedupe_comparisons_total", dedupe.comparisons)
+
+    with metrics.stage("cluster") as stage:
+        clusters_cfg = config.clustering.get("clusters", [])
+        extra_tags = config.clustering.get("intent_tags", {})
+        matcher = ClusterMatcher(clusters_cfg, extra_tags)
+        memberships = state.memberships
+        dirty_clusters: set[str] = set()
+        for group_id in touched | removed:
+            previous = memberships.pop(group_id, None)
+            if previous:
+                dirty_clusters.add(previous["cluster_id"])
+        touched_items = [dedupe.item(group_id) for group_id in sorted(touched)]
+        analyses = analyze_items(touched_items)
+        for item in touched_items:
+            membership = matcher.match(item, analyses[item["id"]])
+            if membership:
+                memberships[item["id"]] = membership
+                dirty_clusters.add(membership["cluster_id"])
+        clusters = build_cluster_payload(clusters_cfg, memberships)
+        stage.rows = len(touched_items)
+
+    with metrics.stage("terms") as stage:
+        dirty_clusters.update(
+            cluster["cluster_id"] for cluster in clusters["clusters"] if cluster["cluster_id"] not in state.cluster_terms
+        )
+        dirty = [cluster for cluster in clusters["clusters"] if cluster["cluster_id"] in dirty_clusters]
+        dirty_items = [dedupe.item(item_id) for cluster in dirty for item_id in cluster["items"]]
+        analyses.update(analyze_items([item for item in dirty_items if item["id"] not in analyses]))
+        fresh_terms = build_terms(dirty_items, {"clusters": dirty}, analyses).get("cluster_terms", {})
+        cluster_terms = {
+            cluster["cluster_id"]: fresh_terms.get(cluster["cluster_id"], state.cluster_terms.get(cluster["cluster_id"]))
+            for cluster in clusters["clusters"]
+        }
+        terms = {"cluster_terms": cluster_terms}
+        for cluster in clusters.get("clusters", []):
+            term_payload = terms.get("cluster_terms", {}).get(cluster["cluster_id"], {})
+            cluster["top_terms"] = [item["term"] for item in term_payload.get("top_terms", [])]
+            cluster["top_bigrams"] = [item["bigram"] for item in term_payload.get("top_bigrams", [])]
+        stage.rows = len(dirty_items)
+
+    # Pass 2: stream grouped items to disk, collecting quality counters on the way.
+    with metrics.stage("write") as stage:
+        counters = QualityCounters(raw_count=state.raw_count + new_rows)
+        items = counters.track(dedupe.iter_results())
+        parquet_settings = ParquetSettings.from_config(config.raw.get("export", {}))
+        with ParquetSink(parquet_path, "deduped", parquet_settings) if parquet_path else nullcontext() as sink:
+            if sink is not None:
+                items = sink.track(items)
+            write_json_array(deduped_path, items, compact=bool(config.io.get("compact", False)))
+        quality = compute_quality(counters, clusters)
+        write_json(clusters_path, clusters)
+        write_json(terms_path, terms)
+        write_json(quality_path, quality)
+        stage.rows = counters.deduped_count
+
+    state.offset = offset
+    state.checkpoint = file_checkpoint(raw_path, offset)
+    state.raw_count = counters.raw_count
+    state.dedupe = dedupe.to_state()
+    state.memberships = memberships
+    state.cluster_terms = cluster_terms
+    save_state(state_path, state)
+
+    logger.info("Processing complete", extra={"deduped": counters.deduped_count, "new_rows": new_rows})
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from sandcastle.common.hash import sha256_text
+from sandcastle.common.io import file_checkpoint, read_json, write_json
+from sandcastle.common.segments import log_size
+from sandcastle.config import Config
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 4
+
+
+@dataclass
+class ProcessState:
+    fingerprint: str
+    version: int = STATE_VERSION
+    offset: int = 0
+    checkpoint: str = ""
+    raw_count: int = 0
+    dedupe: dict | None = None
+    memberships: dict[str, dict] = field(default_factory=dict)
+    cluster_terms: dict[str, dict] = field(default_factory=dict)
+
+
+def config_fingerprint(config: Config) -> str:
+    payload = {"version": STATE_VERSION, "dedupe": config.dedupe, "clustering": config.clustering}
+    return sha256_text(json.dumps(payload, sort_keys=True, ensure_ascii=False))
+
+
+def load_state(path: str | Path, fingerprint: str, raw_path: str | Path) -> ProcessState | None:
+    payload = read_json(path)
+    if not isinstance(payload, dict):
+        return None
+    if payload.get("version") != STATE_VERSION or payload.get("fingerprint") != fingerprint:
+        logger.info("Process state is stale (config or version changed)")
+        return None
+    state = ProcessState(**payload)
+    raw_file = Path(raw_path)
+    size = log_size(raw_file)
+    if size < state.offset or file_checkpoint(raw_file, state.offset) != state.checkpoint:
+        logger.info("Raw results changed before the saved offset")
+        return None
+    return state
+
+
+def save_state(path: str | Path, state: ProcessState) -> None:
+    write_json(path, asdict(state), compact=True)
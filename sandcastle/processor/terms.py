@@ -1,17 +1,102 @@
 from __future__ import annotations
 
-from sandcastle.common.text import top_bigrams, top_terms
-from sandcastle.processor.cluster import flatten_cluster_text
+from collections import Counter
+from itertools import chain
+from typing import Iterable
 
+from sandcastle.processor.analysis import ItemAnalysis, analyze_items
+
+try:  # optional vectorised counting
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on environment
+    np = None
+
+
+class TermIndex:
+    def __init__(self) -> None:
+        # Tokens are interned to integer ids and every item's ids sit in one flat list, addressed by span.
+        self.ids: dict[str, int] = {}
+        self.flat: list[int] = []
+        self.spans: dict[str, tuple[int, int]] = {}
+        self._array = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, item_id: str, tokens: list[str]) -> None:
+        if item_id in self.spans:
+            return
+        ids = self.ids
+        start = len(self.flat)
+        self.flat.extend([ids.setdefault(token, len(ids)) for token in tokens])
+        self.spans[item_id] = (start, len(self.flat))
+        self._array = None
+
+    def terms(self) -> list[str]:
+        return list(self.ids)
+
+    def stream(self, item_ids: Iterable[str]):
+        spans = [self.spans[item_id] for item_id in item_ids if item_id in self.spans]
+        if np is None:
+            return list(chain.from_iterable(self.flat[start:end] for start, end in spans))
+        if self._array is None:
+            self._array = np.asarray(self.flat, dtype=np.int64)
+        if not spans:
+            return self._array[:0]
+        starts, ends = np.asarray(spans, dtype=np.int64).T
+        lengths = ends - starts
+        # Gather every span in one indexing op: offset each output slot back to its span's start.
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        return self._array[offsets + np.arange(int(lengths.sum()), dtype=np.int64)]
+
+
+def _most_common(values, limit: int, size: int | None = None) -> list[tuple[int, int]]:
+    # Counter.most_common order: count descending, then first occurrence in the stream.
+    if np is None:
+        return Counter(values).most_common(limit)
+    if size is not None:
+        # Dense ids: count and locate first occurrences in O(n) instead of sorting.
+        counts = np.bincount(values, minlength=size)
+        first = np.full(size, len(values), dtype=np.int64)
+        np.minimum.at(first, values, np.arange(len(values), dtype=np.int64))
+        unique = np.flatnonzero(counts)
+        counts, first = counts[unique], first[unique]
+    else:
+        unique, first, counts = np.unique(values, return_index=True, return_counts=True)
+    order = np.lexsort((first, -counts))[:limit]
+    return [(int(value), int(count)) for value, count in zip(unique[order], counts[order])]
+
+
+def top_term_ids(stream, vocab_size: int, limit: int = 20) -> tuple[list, list]:
+    # Bigrams run across item boundaries, exactly as when the cluster's tokens were one flat list.
+    if np is not None:
+        bigrams = stream[:-1] * vocab_size + stream[1:]
+    else:
+        bigrams = [left * vocab_size + right for left, right in zip(stream, stream[1:])]
+    terms = _most_common(stream, limit, vocab_size) if len(stream) else []
+    pairs = [(divmod(code, vocab_size), count) for code, count in _most_common(bigrams, limit)] if len(bigrams) else []
+    return terms, pairs
+
+
+def build_terms(items: list[dict], clusters: dict, analyses: dict[str, ItemAnalysis] | None = None) -> dict:
+    if analyses is None:
+        analyses = analyze_items(items)
+    index = TermIndex()
+    for cluster in clusters.get("clusters", []):
+        for item_id in cluster.get("items", []):
+            if item_id in analyses:
+                index.add(item_id, analyses[item_id].tokens)
+    terms = index.terms()
 
-def build_terms(items: list[dict], clusters: dict) -> dict:
     cluster_terms = {}
     for cluster in clusters.get("clusters", []):
-        tokens = flatten_cluster_text(items, cluster.get("items", []))
-        top_terms_list = top_terms(tokens, limit=20)
-        top_bigrams_list = top_bigrams(tokens, limit=20)
+        stream = index.stream(cluster.get("items", []))
+        top_terms_list, top_bigrams_list = top_term_ids(stream, len(index), limit=20)
         cluster_terms[cluster["cluster_id"]] = {
-            "top_terms": [{"term": term, "count": count} for term, count in top_terms_list],
-            "top_bigrams": [{"bigram": bigram, "count": count} for bigram, count in top_bigrams_list],
+            "top_terms": [{"term": terms[term], "count": count} for term, count in top_terms_list],
+            "top_bigrams": [
+                {"bigram": f"{terms[left]} {terms[right]}", "count": count}
+                for (left, right), count in top_bigrams_list
+            ],
         }
     return {"cluster_terms": cluster_terms}
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import logging
+from bisect import bisect_right
+from collections import Counter, defaultdict
+from itertools import accumulate
+from pathlib import Path
+from typing import Iterable
+
+from sandcastle.common.io import file_checkpoint, read_json, write_json
+from sandcastle.common.records import RecordDecoder, RedditPostRow, read_records
+from sandcastle.common.segments import log_size
+from sandcastle.common.text import tokenize
+from sandcastle.reddit.windows import TimeWindow, day_index, window_day_ranges
+
+logger = logging.getLogger(__name__)
+
+PHRASE_STATE_VERSION = 2
+MAX_EXAMPLES = 3
+
+
+def extract_phrases(text: str, limit: int = 5) -> list[str]:
+    tokens = tokenize(text)
+    if not tokens:
+        return []
+    bigrams = [" ".join(tokens[i:i+2]) for i in range(len(tokens) - 1)]
+    trigrams = [" ".join(tokens[i:i+3]) for i in range(len(tokens) - 2)]
+    counts = Counter(bigrams + trigrams)
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    return [phrase for phrase, _ in ranked[:limit]]
+
+
+def window_counts(days: Counter, ranges: list[tuple[TimeWindow, int, int]]) -> dict[str, int]:
+    # Prefix sums over the sorted day buckets: each window is two lookups, however many days it spans.
+    keys = sorted(days)
+    totals = list(accumulate(days[day] for day in keys))
+
+    def upto(day: int) -> int:
+        idx = bisect_right(keys, day)
+        return totals[idx - 1] if idx else 0
+
+    counts = {}
+    for window, first, last in ranges:
+        if last >= first:
+            count = upto(last) - upto(first - 1)
+            if count:
+                counts[window.label] = counts.get(window.label, 0) + count
+    return counts
+
+
+class PhraseStore:
+    def __init__(self) -> None:
+        # Per-phrase evidence accumulated in post order; offset/checkpoint record how much of the JSONL it covers.
+        # Evidence is bucketed by the post's created_utc day, so windows are chosen when intents are built.
+        self.days: dict[str, Counter] = defaultdict(Counter)
+        self.subreddits: dict[str, Counter] = defaultdict(Counter)
+        self.examples: dict[str, list[dict]] = defaultdict(list)
+        self.offset = 0
+        self.checkpoint = ""
+        self.posts = 0
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def phrases(self) -> list[str]:
+        return sorted(self.days)
+
+    def window_counts(self, phrases: Iterable[str], windows: list[TimeWindow], now: int) -> dict[str, int]:
+        days: Counter = Counter()
+        for phrase in phrases:
+            days.update(self.days[phrase])
+        return window_counts(days, window_day_ranges(windows, now))
+
+    def add(self, post: RedditPostRow) -> None:
+        day = day_index(post.created_utc)
+        for phrase in extract_phrases(f"{post.title} {post.selftext}"):
+            self.days[phrase][day] += 1
+            self.subreddits[phrase][post.subreddit] += 1
+            examples = self.examples[phrase]
+            if len(examples) < MAX_EXAMPLES:
+                examples.append({"source_url": post.source_url, "title": post.title, "snippet": post.selftext[:200]})
+        self.posts += 1
+
+    def catch_up(self, posts_path: str | Path, decoder: RecordDecoder[RedditPostRow] | None = None) -> int:
+        decoder = decoder or RecordDecoder(RedditPostRow)
+        added = 0
+        for post, end in read_records(posts_path, decoder, self.offset):
+            self.add(post)
+            self.offset = end
+            added += 1
+        self.checkpoint = file_checkpoint(posts_path, self.offset)
+        return added
+
+    def to_state(self) -> dict:
+        return {
+            "version": PHRASE_STATE_VERSION,
+            "offset": self.offset,
+            "checkpoint": self.checkpoint,
+            "posts": self.posts,
+            "days": {phrase: {str(day): count for day, count in counts.items()} for phrase, counts in self.days.items()},
+            "subreddits": {phrase: dict(counts) for phrase, counts in self.subreddits.items()},
+            "examples": dict(self.examples),
+        }
+
+    @classmethod
+    def from_state(cls, payload: dict) -> "PhraseStore":
+        store = cls()
+        store.offset = payload["offset"]
+        store.checkpoint = payload["checkpoint"]
+        store.posts = payload["posts"]
+        # JSON object keys are strings; day buckets are ints.
+        store.days.update(
+            (phrase, Counter({int(day): count for day, count in counts.items()}))
+            for phrase, counts in payload["days"].items()
+        )
+        store.subreddits.update((phrase, Counter(counts)) for phrase, counts in payload["subreddits"].items())
+        store.examples.update(payload["examples"])
+        return store
+
+
+def load_phrase_store(path: str | Path, posts_path: str | Path) -> PhraseStore:
+    payload = read_json(path)
+    if not isinstance(payload, dict) or payload.get("version") != PHRASE_STATE_VERSION:
+        return PhraseStore()
+    posts_file = Path(posts_path)
+    size = log_size(posts_file)
+    if size < payload["offset"] or file_checkpoint(posts_file, payload["offset"]) != payload["checkpoint"]:
+        logger.info("Reddit posts changed before the saved phrase offset; rebuilding phrase stats")
+        return PhraseStore()
+    return PhraseStore.from_state(payload)
+
+
+def save_phrase_store(path: str | Path, store: PhraseStore) -> None:
+    write_json(path, store.to_state(), compact=True)
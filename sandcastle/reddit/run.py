@@ -1,16 +1,32 @@
 from __future__ import annotations
 
 import logging
-from collections import Counter, defaultdict
+from collections import Counter
+from contextlib import nullcontext
 from pathlib import Path
+from typing import Iterable
 
+from sandcastle.collector.run import open_response_cache
 from sandcastle.common.hash import sha256_text
-from sandcastle.common.io import append_jsonl, read_jsonl, write_json
-from sandcastle.common.text import normalize, tokenize
-from sandcastle.common.time import iso_now
+from sandcastle.common.http import HttpSettings, build_transport
+from sandcastle.common.http_cache import CacheMissError, cache_transport
+from sandcastle.common.io import JsonlWriter, write_json
+from sandcastle.common.metrics import get_metrics
+from sandcastle.common.records import RecordDecoder, RedditPostRow
+from sandcastle.common.seen import SeenIndex
+from sandcastle.common.text import normalize
+from sandcastle.common.time import iso_now, now_timestamp
 from sandcastle.config import Config, resolve_path
-from sandcastle.reddit.search import iter_posts
-from sandcastle.reddit.windows import build_windows, window_bounds
+from sandcastle.reddit.phrases import PhraseStore, load_phrase_store, save_phrase_store
+from sandcastle.reddit.search import REDDIT_SEARCH_URL, RedditSearchClient, iter_posts
+from sandcastle.reddit.windows import (
+    DEFAULT_WINDOWS,
+    TimeWindow,
+    assign_window,
+    build_windows,
+    split_windows,
+    window_bounds,
+)
 from sandcastle.processor.dedupe import union_find_groups
 
 logger = logging.getLogger(__name__)
@@ -34,38 +50,20 @@ def post_to_row(post: dict, query: str, window_label: str) -> dict:
     }
 
 
-def extract_phrases(text: str, limit: int = 5) -> list[str]:
-    tokens = tokenize(text)
-    if not tokens:
-        return []
-    bigrams = [" ".join(tokens[i:i+2]) for i in range(len(tokens) - 1)]
-    trigrams = [" ".join(tokens[i:i+3]) for i in range(len(tokens) - 2)]
-    counts = Counter(bigrams + trigrams)
-    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
-    return [phrase for phrase, _ in ranked[:limit]]
-
+def build_intents(
+    posts: Iterable[RedditPostRow], windows: list[TimeWindow] | None = None, now: int | None = None
+) -> dict:
+    store = PhraseStore()
+    for post in posts:
+        store.add(post)
+    return intents_from_store(store, windows, now)
 
-def build_intents(posts: list[dict]) -> dict:
-    phrase_windows: dict[str, Counter] = defaultdict(Counter)
-    phrase_examples: dict[str, list[dict]] = defaultdict(list)
-    phrase_subreddits: dict[str, Counter] = defaultdict(Counter)
 
-    for post in posts:
-        text = f"{post.get('title', '')} {post.get('selftext', '')}"
-        phrases = extract_phrases(text)
-        for phrase in phrases:
-            phrase_windows[phrase][post["window"]] += 1
-            phrase_subreddits[phrase][post.get("subreddit", "")] += 1
-            if len(phrase_examples[phrase]) < 3:
-                phrase_examples[phrase].append(
-                    {
-                        "source_url": post.get("source_url"),
-                        "title": post.get("title"),
-                        "snippet": (post.get("selftext") or "")[:200],
-                    }
-                )
-
-    phrases = sorted(phrase_windows.keys())
+def intents_from_store(store: PhraseStore, windows: list[TimeWindow] | None = None, now: int | None = None) -> dict:
+    # Window evidence is computed from created_utc day buckets relative to `now`, not from labels set at fetch time.
+    windows = build_windows(DEFAULT_WINDOWS) if windows is None else windows
+    now = now_timestamp() if now is None else now
+    phrases = store.phrases()
     groups = union_find_groups(phrases, similarity_threshold=0.6)
 
     intents = []
@@ -73,21 +71,20 @@ def build_intents(posts: list[dict]) -> dict:
         sorted_group = sorted(group)
         label = sorted_group[0]
         intent_id = normalize(label).replace(" ", "_")[:40] or "intent"
-        evidence_counts = Counter()
         combined_subreddits = Counter()
         combined_examples = []
         common_phrases = []
         for phrase in sorted_group:
-            evidence_counts.update(phrase_windows[phrase])
-            combined_subreddits.update(phrase_subreddits[phrase])
+            combined_subreddits.update(store.subreddits[phrase])
             common_phrases.append(phrase)
-            combined_examples.extend(phrase_examples[phrase])
-        classification = classify_intent(evidence_counts)
+            combined_examples.extend(store.examples[phrase])
+        evidence_counts = store.window_counts(sorted_group, windows, now)
+        classification = classify_intent(Counter(evidence_counts), windows)
         intents.append(
             {
                 "intent_id": intent_id,
                 "label": label,
-                "evidence_counts": dict(evidence_counts),
+                "evidence_counts": evidence_counts,
                 "classification": classification,
                 "common_phrases": common_phrases[:10],
                 "top_subreddits": [
@@ -99,18 +96,23 @@ def build_intents(posts: list[dict]) -> dict:
         )
 
     intents = sorted(intents, key=lambda item: item["intent_id"])
+    recent, long_term = split_windows(windows)
     return {
         "intents": intents,
         "rules": {
-            "structural_if": "evidence in >=2 windows including one of {180d,365d} and recent {14d or 60d} > 0",
-            "temporal_if": "evidence mostly in recent windows and near-zero in {180d,365d}",
+            "structural_if": (
+                f"evidence in >=2 windows including one of {{{','.join(long_term)}}} "
+                f"and recent {{{' or '.join(recent)}}} > 0"
+            ),
+            "temporal_if": f"evidence mostly in recent windows and near-zero in {{{','.join(long_term)}}}",
         },
     }
 
 
-def classify_intent(counts: Counter) -> str:
-    recent = counts.get("14d", 0) + counts.get("60d", 0)
-    long_term = counts.get("180d", 0) + counts.get("365d", 0)
+def classify_intent(counts: Counter, windows: list[TimeWindow] | None = None) -> str:
+    recent_labels, long_labels = split_windows(build_windows(DEFAULT_WINDOWS) if windows is None else windows)
+    recent = sum(counts.get(label, 0) for label in recent_labels)
+    long_term = sum(counts.get(label, 0) for label in long_labels)
     windows_with_evidence = sum(1 for value in counts.values() if value > 0)
     if long_term > 0 and recent > 0 and windows_with_evidence >= 2:
         return "structural"
@@ -119,13 +121,9 @@ def classify_intent(counts: Counter) -> str:
     return "structural" if long_term >= recent else "temporal"
 
 
-def run_reddit(config: Config) -> None:
-    outputs = config.outputs
-    posts_path = resolve_path(config.path.parent, outputs.get("reddit_posts", "data/reddit_posts.jsonl"))
-    intents_path = resolve_path(config.path.parent, outputs.get("reddit_intents", "data/reddit_intents.json"))
+def fetch_posts(config: Config, posts_path: Path, windows: list[TimeWindow], offline: bool = False) -> None:
     reddit_cfg = config.reddit
     queries = reddit_cfg.get("queries", [])
-    windows = build_windows(reddit_cfg.get("windows", ["14d", "60d", "180d", "365d"]))
     filters = reddit_cfg.get("filters", {})
     min_score = int(filters.get("min_score", 0))
     min_comments = int(filters.get("min_comments", 0))
@@ -133,22 +131,66 @@ def run_reddit(config: Config) -> None:
     only_posts = bool(filters.get("only_posts", True))
     max_pages = int(filters.get("max_pages", 3))
 
-    existing_ids = {row.get("id") for row in read_jsonl(posts_path)}
-
-    for query in queries:
-        for window in windows:
-            start_ts, end_ts = window_bounds(window)
-            for post in iter_posts(query, max_pages, min_score, min_comments, allow_nsfw, only_posts):
-                created = int(post.get("created_utc") or 0)
-                if created < start_ts or created > end_ts:
-                    continue
-                row = post_to_row(post, query=query, window_label=window.label)
-                if row["id"] in existing_ids:
-                    continue
-                append_jsonl(posts_path, [row])
-                existing_ids.add(row["id"])
-
-    posts = list(read_jsonl(posts_path))
-    intents = build_intents(posts)
-    write_json(intents_path, intents)
+    state_path = reddit_cfg.get("rate_limit_state")
+    cache_settings, cache = open_response_cache(config, offline)
+    transport = build_transport(HttpSettings.from_config(config.http))
+    client = RedditSearchClient(
+        rate_limit_s=float(reddit_cfg.get("rate_limit_s", 1.0)),
+        timeout_s=float(reddit_cfg.get("timeout_s", 10.0)),
+        transport=cache_transport(transport, cache, cache_settings, "reddit"),
+        base_url=reddit_cfg.get("endpoint", REDDIT_SEARCH_URL),
+        burst=int(reddit_cfg.get("burst", 1)),
+        rate_limit_state=resolve_path(config.path.parent, state_path) if state_path else None,
+    )
+
+    with (
+        get_metrics().stage("fetch") as stage,
+        cache if cache is not None else nullcontext(),
+        SeenIndex(posts_path) as seen_ids,
+        JsonlWriter(posts_path) as writer,
+    ):
+        for query in queries:
+            if not windows:
+                break
+            # One fetch per query; each post is labelled with the first configured window it falls in.
+            bounds = [(window, *window_bounds(window)) for window in windows]
+            oldest = min(start_ts for _, start_ts, _ in bounds)
+            posts = iter_posts(query, max_pages, min_score, min_comments, allow_nsfw, only_posts, client, oldest)
+            try:
+                for post in posts:
+                    writer.maybe_flush()
+                    window = assign_window(int(post.get("created_utc") or 0), bounds)
+                    if window is None:
+                        continue
+                    row = post_to_row(post, query=query, window_label=window.label)
+                    if not seen_ids.add(row["id"]):
+                        continue
+                    writer.write(row)
+                    stage.rows += 1
+            except CacheMissError as exc:
+                logger.warning("Offline replay: %s", exc)
+            writer.checkpoint()
+            seen_ids.commit()
+
+
+def run_reddit(config: Config, offline: bool = False, fetch: bool = True) -> None:
+    outputs = config.outputs
+    posts_path = resolve_path(config.path.parent, outputs.get("reddit_posts", "data/reddit_posts.jsonl"))
+    intents_path = resolve_path(config.path.parent, outputs.get("reddit_intents", "data/reddit_intents.json"))
+    phrases_path = resolve_path(config.path.parent, outputs.get("reddit_phrases", "data/reddit_phrases.json"))
+    windows = build_windows(config.reddit.get("windows", list(DEFAULT_WINDOWS)))
+    # Windows only bound how far back fetching goes; evidence counts are recomputed from day buckets below,
+    # so with fetch=False a changed window list is applied to the posts already collected.
+    if fetch:
+        fetch_posts(config, posts_path, windows, offline)
+
+    # Only posts appended since the last run are read; earlier evidence comes from the phrase store.
+    with get_metrics().stage("intents") as stage:
+        store = load_phrase_store(phrases_path, posts_path)
+        decoder = RecordDecoder(RedditPostRow)
+        stage.rows = store.catch_up(posts_path, decoder)
+        decoder.stats.log(posts_path)
+        save_phrase_store(phrases_path, store)
+        intents = intents_from_store(store, windows)
+        write_json(intents_path, intents)
     logger.info("Reddit intents written", extra={"count": len(intents.get("intents", []))})
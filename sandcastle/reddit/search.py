@@ -1,23 +1,36 @@
 from __future__ import annotations
 
 import logging
+import time
+from pathlib import Path
 from typing import Iterable
 
-import requests
-
-from sandcastle.common.rate_limit import RateLimiter, backoff_sleep
+from sandcastle.common.http import Transport, default_transport
+from sandcastle.common.http_cache import CacheMissError, serves_from_cache
+from sandcastle.common.metrics import get_metrics
+from sandcastle.common.rate_limit import RateLimitError, TokenBucket, backoff_sleep
 
 logger = logging.getLogger(__name__)
 
+REDDIT_SEARCH_URL = "https://www.reddit.com/search.json"
+
 
 class RedditSearchClient:
-    def __init__(self, rate_limit_s: float = 1.0, timeout_s: float = 10.0):
-        self.rate_limiter = RateLimiter(rate_limit_s)
+    def __init__(
+        self,
+        rate_limit_s: float = 1.0,
+        timeout_s: float = 10.0,
+        transport: Transport | None = None,
+        base_url: str = REDDIT_SEARCH_URL,
+        burst: int = 1,
+        rate_limit_state: str | Path | None = None,
+    ):
+        self.rate_limiter = TokenBucket.from_interval(rate_limit_s, burst, rate_limit_state)
         self.timeout_s = timeout_s
-        self.base_url = "https://www.reddit.com/search.json"
+        self.base_url = base_url
+        self.transport = transport or default_transport()
 
     def search(self, query: str, limit: int, after: str | None = None) -> dict:
-        self.rate_limiter.wait()
         params = {
             "q": query,
             "sort": "new",
@@ -26,15 +39,29 @@ class RedditSearchClient:
         }
         if after:
             params["after"] = after
+        if not serves_from_cache(self.transport, self.base_url, params):
+            self.rate_limiter.wait()
         headers = {"User-Agent": "sandcastle/0.1 (research pipeline)"}
         attempt = 0
         while attempt < 3:
             try:
-                resp = requests.get(self.base_url, params=params, headers=headers, timeout=self.timeout_s)
-                if resp.status_code == 429:
-                    raise RuntimeError("Rate limit reached")
+                started = time.perf_counter()
+                resp = self.transport.get(self.base_url, params=params, headers=headers, timeout=self.timeout_s)
+                get_metrics().record_request(
+                    "reddit", resp.status_code, time.perf_counter() - started, getattr(resp, "from_cache", False)
+                )
+                if not self.rate_limiter.handle_response(resp.status_code, resp.headers):
+                    raise RateLimitError("Rate limit reached")
                 resp.raise_for_status()
                 return resp.json()
+            except CacheMissError:
+                raise
+            except RateLimitError:
+                attempt += 1
+                logger.warning("Reddit rate limited (attempt %d)", attempt)
+                if attempt >= 3:
+                    raise
+                self.rate_limiter.acquire()
             except Exception as exc:  # noqa: BLE001
                 attempt += 1
                 logger.warning("Reddit request failed", exc_info=exc)
@@ -44,8 +71,17 @@ class RedditSearchClient:
         return {}
 
 
-def iter_posts(query: str, max_pages: int, min_score: int, min_comments: int, allow_nsfw: bool, only_posts: bool) -> Iterable[dict]:
-    client = RedditSearchClient()
+def iter_posts(
+    query: str,
+    max_pages: int,
+    min_score: int,
+    min_comments: int,
+    allow_nsfw: bool,
+    only_posts: bool,
+    client: RedditSearchClient | None = None,
+    min_created: int | None = None,
+) -> Iterable[dict]:
+    client = client or RedditSearchClient()
     after = None
     page = 0
     while page < max_pages:
@@ -69,3 +105,8 @@ def iter_posts(query: str, max_pages: int, min_score: int, min_comments: int, al
         page += 1
         if not after:
             break
+        # Results are sorted by new: once a page reaches past min_created, later pages are all older.
+        if min_created is not None:
+            created = [int(child.get("data", {}).get("created_utc") or 0) for child in children]
+            if min(created) < min_created:
+                break
@@ -1,27 +1,90 @@
 from __future__ import annotations
 
+import logging
+import re
 from dataclasses import dataclass
-from typing import Iterable
+from typing import Any, Iterable
 
 from sandcastle.common.time import now_timestamp
 
+logger = logging.getLogger(__name__)
+
+DAY_S = 24 * 3600
+DEFAULT_WINDOWS = ("14d", "60d", "180d", "365d")
+# classify_intent treats windows up to RECENT_MAX_DAYS as recent and from LONG_TERM_MIN_DAYS as long-term.
+RECENT_MAX_DAYS = 60
+LONG_TERM_MIN_DAYS = 180
+_LABEL = re.compile(r"^(\d+)([dw])$")
+_UNIT_DAYS = {"d": 1, "w": 7}
+
 
 @dataclass(frozen=True)
 class TimeWindow:
     label: str
     seconds: int
 
+    @property
+    def days(self) -> int:
+        return self.seconds // DAY_S
+
+
+def parse_window(spec: Any) -> TimeWindow | None:
+    # "14d", "6w", or {"label": "quarter", "days": 90}.
+    if isinstance(spec, dict):
+        try:
+            days = int(spec["days"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        label = str(spec.get("label") or f"{days}d")
+    else:
+        match = _LABEL.match(str(spec).strip().lower())
+        if match is None:
+            return None
+        label, days = str(spec), int(match[1]) * _UNIT_DAYS[match[2]]
+    return TimeWindow(label=label, seconds=days * DAY_S) if days > 0 else None
 
-def build_windows(labels: Iterable[str]) -> list[TimeWindow]:
-    mapping = {
-        "14d": 14 * 24 * 3600,
-        "60d": 60 * 24 * 3600,
-        "180d": 180 * 24 * 3600,
-        "365d": 365 * 24 * 3600,
-    }
-    return [TimeWindow(label=label, seconds=mapping[label]) for label in labels if label in mapping]
+
+def build_windows(specs: Iterable[Any]) -> list[TimeWindow]:
+    windows = []
+    for spec in specs:
+        window = parse_window(spec)
+        if window is None:
+            logger.warning("Ignoring unsupported reddit window %r", spec)
+            continue
+        windows.append(window)
+    return windows
 
 
 def window_bounds(window: TimeWindow) -> tuple[int, int]:
     now = now_timestamp()
     return now - window.seconds, now
+
+
+def assign_window(created_utc: int, bounds: list[tuple[TimeWindow, int, int]]) -> TimeWindow | None:
+    for window, start_ts, end_ts in bounds:
+        if start_ts <= created_utc <= end_ts:
+            return window
+    return None
+
+
+def day_index(created_utc: int) -> int:
+    return created_utc // DAY_S
+
+
+def window_day_ranges(windows: Iterable[TimeWindow], now: int) -> list[tuple[TimeWindow, int, int]]:
+    # Inclusive day-index range per window. An "Nd" window covers the last N calendar days including today,
+    # and like assign_window each post counts once, in the first listed window that contains it.
+    today = day_index(now)
+    claimed = 0
+    ranges = []
+    for window in windows:
+        ranges.append((window, today - window.days + 1, today - claimed))
+        claimed = max(claimed, window.days)
+    return ranges
+
+
+def split_windows(windows: Iterable[TimeWindow]) -> tuple[list[str], list[str]]:
+    windows = list(windows)
+    recent = [window.label for window in windows if window.days <= RECENT_MAX_DAYS]
+    long_term = [window.label for window in windows if window.days >= LONG_TERM_MIN_DAYS]
+    return recent, long_term
@@ -0,0 +1,41 @@
+import json
+import sys
+
+from benchmarks import suite
+from benchmarks.synthetic import CorpusSpec, iter_reddit_posts, iter_web_rows
+from sandcastle.common.url import canonicalize_url
+from sandcastle.processor.dedupe import dedupe_items
+
+
+def test_generator_is_deterministic_and_controls_duplicates():
+    spec = CorpusSpec(rows=400, duplicate_rate=0.3, url_variation=1.0, seed=7)
+    rows = list(iter_web_rows(spec))
+    assert rows == list(iter_web_rows(spec))
+    assert len({row["id"] for row in rows}) == 400
+
+    # Every duplicate's URL is a variant spelling, yet canonicalizes to one of the originals.
+    canonical = {canonicalize_url(row["source_url"]) for row in rows}
+    assert len({row["source_url"] for row in rows}) > len(canonical)
+    assert 80 <= 400 - len(canonical) <= 160
+    assert len(dedupe_items(rows)) == len(canonical)
+
+    unique = list(iter_web_rows(CorpusSpec(rows=200, duplicate_rate=0.0)))
+    assert len(dedupe_items(unique)) == 200
+    posts = list(iter_reddit_posts(CorpusSpec(rows=50, snippet_words=12)))
+    assert {post["window"] for post in posts} <= {"14d", "60d", "180d", "365d"}
+    assert all(len(post["selftext"].split()) == 12 for post in posts)
+
+
+def test_suite_records_runs_and_compares_with_previous(tmp_path, monkeypatch, capsys):
+    results = tmp_path / "results.jsonl"
+    argv = ["suite", "--scales", "200", "--repeat", "1", "--results", str(results)]
+    monkeypatch.setattr(sys, "argv", argv)
+    suite.main()
+    suite.main()
+
+    records = [json.loads(line) for line in results.read_text().splitlines()]
+    assert [record["name"] for record in records] == list(suite.CASES) * 2
+    assert all("vs_previous" not in record for record in records[:4])
+    assert all(record["vs_previous"] > 0 for record in records[4:])
+    assert records[0]["rows"] == 200 and records[0]["rows_per_s"] > 0
+    assert capsys.readouterr().out.count("\n") == 8
@@ -0,0 +1,48 @@
+import random
+import re
+
+from sandcastle.common.text import normalize
+from sandcastle.processor.analysis import analyze_text
+from sandcastle.processor.cluster import DEFAULT_TAGS, ClusterMatcher, tag_intents
+from sandcastle.processor.matcher import KeywordAutomaton
+
+
+def _naive_cluster(text: str, clusters: list[dict]) -> str | None:
+    best_cluster = None
+    best_hits = 0
+    for cluster in clusters:
+        hits = sum(1 for keyword in cluster["keywords"] if normalize(keyword) in text)
+        if hits > best_hits or (hits == best_hits and hits > 0 and cluster["cluster_id"] < best_cluster["cluster_id"]):
+            best_hits = hits
+            best_cluster = cluster
+    return best_cluster["cluster_id"] if best_cluster else None
+
+
+def test_automaton_reports_overlapping_and_nested_keywords():
+    automaton = KeywordAutomaton(["he", "she", "his", "hers", "deep work", "work"])
+    found = {automaton.patterns[idx] for idx in automaton.find("ushers do deep workouts")}
+    assert found == {"he", "she", "hers", "deep work", "work"}
+
+
+def test_cluster_matcher_matches_substring_scan():
+    rng = random.Random(3)
+    vocab = ["focus", "foc", "journal", "deep", "deep work", "work", "planner", "plan", "printable", "us", ""]
+    clusters = [
+        {"cluster_id": f"c{rng.randrange(50):02d}_{idx}", "keywords": rng.sample(vocab, 3) + [rng.choice(vocab)]}
+        for idx in range(40)
+    ]
+    matcher = ClusterMatcher(clusters)
+    words = ["focus", "unfocused", "journaling", "deep", "workplace", "planners", "Printable", "bus", "tea"]
+    for _ in range(300):
+        text = " ".join(rng.choice(words) for _ in range(rng.randrange(1, 8)))
+        item = {"titles": [text], "snippets": []}
+        membership = matcher.match(item, analyze_text(text))
+        assert (membership or {}).get("cluster_id") == _naive_cluster(normalize(text), clusters)
+
+
+def test_tag_intents_matches_individual_patterns():
+    extra = {"journal": r"\bjournal(s)?\b", "repeat": r"(ab)\1"}
+    tags = {**DEFAULT_TAGS, **{name: re.compile(pattern) for name, pattern in extra.items()}}
+    for text in ["", "printable pdf prompts", "abab journals", "no tags here", "cards bundle undated"]:
+        expected = sorted({name for name, pattern in tags.items() if pattern.search(text)})
+        assert tag_intents(text, extra) == expected
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+from sandcastle.common.codec import available_codecs, build_codec
+
+PAYLOAD = {
+    "id": "abc",
+    "titles": ["Café planner", "focus"],
+    "counts": {"14d": 2, "60d": 0},
+    "score": 0.85,
+    "flags": {"blocked": False, "suspicious": None},
+}
+
+
+@pytest.mark.parametrize("name", available_codecs())
+def test_codec_roundtrip_is_deterministic(name):
+    codec = build_codec(name)
+    for pretty in (False, True):
+        encoded = codec.dumps(PAYLOAD, pretty=pretty)
+        assert encoded == codec.dumps(codec.loads(encoded), pretty=pretty)
+        assert codec.loads(encoded) == PAYLOAD
+    assert b"\n" not in codec.dumps(PAYLOAD)
+
+
+def test_stdlib_pretty_output_matches_json_module():
+    codec = build_codec("stdlib")
+    assert codec.dumps(PAYLOAD, pretty=True).decode("utf-8") == json.dumps(PAYLOAD, ensure_ascii=False, indent=2)
+
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError):
+        build_codec("yaml")
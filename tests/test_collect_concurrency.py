@@ -0,0 +1,76 @@
+import json
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+
+from sandcastle.collector import run as collect_run
+from sandcastle.collector.base import SearchResult
+from sandcastle.common.rate_limit import RateLimitError
+from sandcastle.config import Config
+
+
+class FakeCollector:
+    def __init__(self, name, delay, host=None):
+        self.name = name
+        self.delay = delay
+        self.host = host or name
+        self.calls = []
+
+    def search(self, query, limit):
+        self.calls.append(query)
+        time.sleep(self.delay)
+        for rank in range(1, 4):
+            yield SearchResult(
+                query=query,
+                engine=self.name,
+                rank=rank,
+                url=f"https://{self.host}.example.com/{query}/{rank}",
+                title=f"{query} {rank}",
+                snippet=f"{self.host} result",
+                meta={},
+            )
+
+
+def _run(tmp_path, monkeypatch, limits, collectors=None):
+    collectors = collectors or [FakeCollector("slow", 0.05), FakeCollector("fast", 0.0)]
+    monkeypatch.setattr(collect_run, "build_collectors", lambda config, *args: collectors)
+    raw = {"queries": ["q1", "q2", "q3"], "outputs": {"raw_results": "raw.jsonl"}, "limits": limits}
+    collect_run.run_collect(Config(raw=raw, path=tmp_path / "config.yaml"))
+    lines = (tmp_path / "raw.jsonl").read_text().splitlines()
+    return [(row["query"], row["engine"], row["rank"]) for row in map(json.loads, lines)], collectors
+
+
+def test_rows_written_in_query_engine_order(tmp_path, monkeypatch):
+    rows, collectors = _run(tmp_path, monkeypatch, {"per_query": 2})
+    expected = [(query, engine, rank) for query in ["q1", "q2", "q3"] for engine in ["slow", "fast"] for rank in (1, 2)]
+    assert rows == expected
+    assert all(collector.calls == ["q1", "q2", "q3"] for collector in collectors)
+
+
+def test_global_max_caps_output(tmp_path, monkeypatch):
+    rows, _ = _run(tmp_path, monkeypatch, {"per_query": 3, "global_max": 4})
+    assert rows == [("q1", "slow", 1), ("q1", "slow", 2), ("q1", "slow", 3), ("q1", "fast", 1)]
+
+
+def test_rows_found_by_several_engines_count_once_against_global_max(tmp_path, monkeypatch):
+    collectors = [FakeCollector("slow", 0.05, host="shared"), FakeCollector("fast", 0.0, host="shared")]
+    rows, _ = _run(tmp_path, monkeypatch, {"per_query": 3, "global_max": 6}, collectors)
+    # The slow engine comes first in query x engine order, so it keeps every shared row however the threads race.
+    assert rows == [(query, "slow", rank) for query in ["q1", "q2"] for rank in (1, 2, 3)]
+
+
+class RateLimitedCollector(FakeCollector):
+    def search(self, query, limit):
+        if query == "q1":
+            self.calls.append(query)
+            raise RateLimitError("Rate limit reached")
+        yield from super().search(query, limit)
+
+
+def test_rate_limit_skips_only_the_current_query(tmp_path, monkeypatch):
+    collectors = [RateLimitedCollector("slow", 0.0), FakeCollector("fast", 0.0)]
+    rows, _ = _run(tmp_path, monkeypatch, {"per_query": 1}, collectors)
+    assert rows == [("q1", "fast", 1), ("q2", "slow", 1), ("q2", "fast", 1), ("q3", "slow", 1), ("q3", "fast", 1)]
+    assert collectors[0].calls == ["q1", "q2", "q3"]
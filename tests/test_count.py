@@ -0,0 +1,102 @@
+import json
+from pathlib import Path
+
+from benchmarks.synthetic import CorpusSpec, iter_web_rows
+from sandcastle.common import counting
+from sandcastle.common.counting import count_file, count_jsonl, stats_paths
+from sandcastle.common.io import append_jsonl
+from sandcastle.common.segments import StorageSettings, set_storage
+
+
+def _reference(path):
+    # The original sequential count: json.loads per line and a set of every id.
+    rows, ids, engines, queries = 0, set(), {}, {}
+    for line in path.read_bytes().splitlines():
+        try:
+            row = json.loads(line)
+        except ValueError:
+            continue
+        rows += 1
+        if isinstance(row, dict):
+            if row.get("id"):
+                ids.add(row["id"])
+            if row.get("engine"):
+                engines[row["engine"]] = engines.get(row["engine"], 0) + 1
+            if row.get("query"):
+                queries[row["query"]] = queries.get(row["query"], 0) + 1
+    return {"valid_objects": rows, "unique_ids": len(ids), "per_engine": engines, "per_query": queries}
+
+
+def _write(path, count, seed=0):
+    rows = list(iter_web_rows(CorpusSpec(rows=count, duplicate_rate=0.3, seed=seed)))
+    rows += rows[:10]  # repeated ids
+    append_jsonl(path, rows)
+
+
+def test_parallel_chunks_match_sequential_count(tmp_path, monkeypatch):
+    monkeypatch.setattr(counting, "CHUNK_BYTES", 4096)
+    path = tmp_path / "raw.jsonl"
+    _write(path, 300)
+    with path.open("ab") as handle:
+        handle.write(b'not json\n[1, 2]\n{"id": 7, "engine": "odd"}\n{"id": "7"}\n\n{"id": "partial", "engine": "searxng"}')
+    expected = _reference(path)
+    for workers in (1, 2):
+        for fields_only in (False, True):
+            assert count_jsonl(path, workers, fields_only, use_cache=False) == expected
+    assert not stats_paths(path)[0].exists()
+
+
+def test_sidecar_serves_repeats_and_scans_only_the_tail(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "raw.jsonl"
+    _write(path, 200)
+    count_file(path, workers=1)
+    first = json.loads(capsys.readouterr().out)
+    assert first == {"file": str(path), **_reference(path)}
+
+    scanned = []
+    original = counting.count_range
+    monkeypatch.setattr(
+        counting, "count_range", lambda path, offset, end, *args: scanned.append((offset, end)) or original(path, offset, end, *args)
+    )
+    assert {"file": str(path), **count_jsonl(path, workers=1)} == first
+    assert scanned == []
+
+    size = path.stat().st_size
+    _write(path, 50, seed=1)
+    assert count_jsonl(path, workers=1) == _reference(path)
+    assert scanned[0] == (size, path.stat().st_size)
+
+    scanned.clear()
+    path.write_bytes(b"")
+    _write(path, 30, seed=2)
+    assert count_jsonl(path, workers=1) == _reference(path)
+    assert scanned[0][0] == 0
+
+
+def test_segmented_log_counts_like_plain_file(tmp_path):
+    plain = tmp_path / "plain.jsonl"
+    _write(plain, 400)
+    set_storage(StorageSettings(segment_bytes=40_000, compression="gzip"))
+    try:
+        log = tmp_path / "raw.jsonl"
+        rows = [json.loads(line) for line in plain.read_text().splitlines()]
+        for start in range(0, len(rows), 60):
+            append_jsonl(log, rows[start:start + 60])
+    finally:
+        set_storage(StorageSettings())
+    summary = count_jsonl(log, workers=2)
+    assert summary["segments"]["segments"] >= 2
+    assert {key: summary[key] for key in ("valid_objects", "unique_ids", "per_engine", "per_query")} == _reference(plain)
+    assert count_jsonl(log, workers=2) == summary
+
+
+def test_unwritable_sidecar_still_returns_the_count(tmp_path, monkeypatch):
+    path = tmp_path / "raw.jsonl"
+    _write(path, 50)
+
+    def read_only(target, data):
+        raise PermissionError(13, "Permission denied", str(target))
+
+    monkeypatch.setattr(Path, "write_bytes", read_only)
+    assert count_jsonl(path, workers=1) == _reference(path)
+    assert not any(candidate.exists() for candidate in stats_paths(path))
@@ -1,4 +1,9 @@
-from sandcastle.processor.dedupe import dedupe_items
+import random
+from collections import defaultdict
+
+from sandcastle.common.records import RawRow, record_from_dict
+from sandcastle.processor.dedupe import DedupeIndex, UnionFind, dedupe_items, union_find_groups
+from sandcastle.processor.minhash import jaccard_similarity
 
 
 def test_dedupe_by_canonical_url():
@@ -50,3 +55,73 @@ def test_dedupe_by_similarity():
     ]
     deduped = dedupe_items(raw_items)
     assert len(deduped) == 1
+
+
+def test_dedupe_items_skips_rows_failing_the_schema():
+    row = {
+        "id": "a",
+        "source_url": "https://example.com/a",
+        "title": "Focus journal tips",
+        "snippet": "Deep focus journal tips",
+        "query": "focus",
+        "engine": "searxng",
+        "collected_at": "2024-01-01T00:00:00Z",
+    }
+    missing_query = {key: value for key, value in row.items() if key != "query"} | {"id": "b"}
+    assert dedupe_items([row, missing_query, dict(row, id="c", rank="1")]) == dedupe_items([row])
+
+
+def _all_pairs_groups(items, similarity_threshold):
+    sorted_items = sorted(items)
+    uf = UnionFind(sorted_items)
+    for idx, item in enumerate(sorted_items):
+        for other in sorted_items[idx + 1:]:
+            if jaccard_similarity(item, other, shingle_size=2) >= similarity_threshold:
+                uf.union(item, other)
+    groups = defaultdict(list)
+    for item in sorted_items:
+        groups[uf.find(item)].append(item)
+    return [sorted(group) for group in groups.values()]
+
+
+def test_union_find_groups_matches_all_pairs():
+    rng = random.Random(7)
+    words = ["focus", "deep", "work", "journal", "adhd", "planner", "the", "daily", "habit"]
+    phrases = [" ".join(rng.choice(words) for _ in range(rng.randint(1, 5))) for _ in range(150)]
+    phrases += ["", "the", "a the", phrases[0]]
+    for threshold in (0.0, 0.3, 0.5, 0.6, 0.85, 1.0):
+        assert union_find_groups(phrases, threshold) == _all_pairs_groups(phrases, threshold)
+
+
+def test_union_find_long_chain_keeps_smallest_representative():
+    items = [f"{idx:064x}" for idx in range(50_000)]
+    uf = UnionFind()
+    for item in reversed(items):
+        uf.add(item)
+    for left, right in zip(reversed(items), reversed(items[:-1])):
+        uf.union(left, right)
+    assert uf.find(items[-1]) == items[0]
+    restored = UnionFind.from_parents(uf.to_parents())
+    assert all(restored.find(item) == items[0] for item in items[::997])
+
+
+def test_state_round_trip_rebuilds_lsh_buckets():
+    rng = random.Random(3)
+    words = ["focus", "deep", "work", "journal", "adhd", "planner", "daily", "habit"]
+    dedupe = DedupeIndex(verify=False)
+    for idx in reversed(range(200)):
+        row = {
+            "id": f"item-{idx:03d}",
+            "source_url": f"https://example.com/{idx}",
+            "title": " ".join(rng.choice(words) for _ in range(3)),
+            "snippet": " ".join(rng.choice(words) for _ in range(6)),
+            "query": "focus",
+            "engine": "searxng",
+            "collected_at": "2024-01-01T00:00:00Z",
+        }
+        dedupe.add(record_from_dict(RawRow, row))
+    restored = DedupeIndex.from_state(dedupe.to_state(), verify=False)
+    assert {key: sorted(keys) for key, keys in restored.index.buckets.items()} == {
+        key: sorted(keys) for key, keys in dedupe.index.buckets.items()
+    }
+    assert all(list(restored._signature(item)) == list(dedupe._signature(item)) for item in dedupe.uf.items)
@@ -0,0 +1,83 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from benchmarks.synthetic import CorpusSpec, iter_reddit_posts, iter_web_rows
+from sandcastle.common import columnar
+from sandcastle.common.columnar import column_values
+from sandcastle.common.io import append_jsonl, read_json
+from sandcastle.config import Config
+from sandcastle.export import run_export
+from sandcastle.processor.run import run_process
+
+
+def _config(tmp_path, **outputs):
+    raw = {
+        "outputs": {
+            "raw_results": "raw.jsonl",
+            "reddit_posts": "posts.jsonl",
+            "deduped": "deduped.json",
+            "clusters": "clusters.json",
+            "terms": "terms.json",
+            "quality": "quality.json",
+            "process_state": "state.json",
+            "export_dir": "export",
+            **outputs,
+        },
+        "export": {"row_group_rows": 100},
+    }
+    return Config(raw=raw, path=tmp_path / "config.yaml")
+
+
+def test_column_values_coerce_to_typed_columns():
+    assert column_values("timestamp", ["2024-01-02T03:04:05+00:00", "2024-01-02T03:04:05Z", "2024-01-02", "", None]) == [
+        datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        datetime(2024, 1, 2, tzinfo=timezone.utc),
+        None,
+        None,
+    ]
+    assert column_values("int", [3, "3", True, None]) == [3, None, None, None]
+    assert column_values("string_list", [["a", 1], None]) == [["a", "1"], None]
+    assert column_values("flags", [{"blocked": True}, None]) == [{"blocked": True, "suspicious": False}, None]
+    assert column_values("json", [{"b": 1, "a": 2}, {}]) == ['{"a": 2, "b": 1}', None]
+
+
+def test_export_requires_pyarrow(tmp_path, monkeypatch):
+    monkeypatch.setattr(columnar, "pyarrow", None)
+    with pytest.raises(ValueError, match="pyarrow"):
+        run_export(_config(tmp_path))
+    with pytest.raises(ValueError, match="pyarrow"):
+        run_process(_config(tmp_path, deduped_parquet="deduped.parquet"))
+
+
+def test_export_and_process_write_typed_parquet(tmp_path):
+    pyarrow = pytest.importorskip("pyarrow")
+    parquet = pytest.importorskip("pyarrow.parquet")
+    append_jsonl(tmp_path / "raw.jsonl", iter_web_rows(CorpusSpec(rows=250, duplicate_rate=0.3)))
+    append_jsonl(tmp_path / "posts.jsonl", iter_reddit_posts(CorpusSpec(rows=120)))
+    config = _config(tmp_path, deduped_parquet="deduped.parquet")
+    run_process(config)
+    written = run_export(config)
+    assert sorted(written) == ["deduped", "raw_results", "reddit_posts"]
+
+    deduped = read_json(tmp_path / "deduped.json")
+    for path in (written["deduped"], tmp_path / "deduped.parquet"):
+        table = parquet.read_table(path)
+        assert table.num_rows == len(deduped)
+        assert table.column("queries").to_pylist() == [item["queries"] for item in deduped]
+        assert table.schema.field("first_seen").type == pyarrow.timestamp("us", tz="UTC")
+        assert table.schema.field("flags").type.num_fields == 2
+
+    raw = parquet.ParquetFile(written["raw_results"])
+    assert raw.metadata.num_rows == 250 and raw.metadata.num_row_groups == 3
+    engines = parquet.read_table(written["raw_results"], columns=["engine"])
+    assert engines.column_names == ["engine"]
+    assert pyarrow.types.is_dictionary(engines.schema.field("engine").type)
+
+    posts = parquet.read_table(written["reddit_posts"], columns=["subreddit", "created_utc"])
+    assert pyarrow.types.is_dictionary(posts.schema.field("subreddit").type)
+    # Parquet has no second-resolution timestamps; the column comes back as milliseconds, still UTC.
+    assert pyarrow.types.is_timestamp(posts.schema.field("created_utc").type)
+    first = next(iter_reddit_posts(CorpusSpec(rows=120)))
+    assert posts.column("created_utc")[0].as_py() == datetime.fromtimestamp(first["created_utc"], tz=timezone.utc)
@@ -0,0 +1,119 @@
+import json
+import threading
+
+import pytest
+
+pytest.importorskip("requests")
+
+from sandcastle.collector.run import run_collect
+from sandcastle.common import http_cache
+from sandcastle.common.http_cache import CacheMissError, CachingTransport, ResponseCache, cache_key
+from sandcastle.common.http_stub import StubServer, searxng_route
+from sandcastle.config import Config
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None, content=b"{}"):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = content
+
+
+class RecordingTransport:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.sent_headers = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.sent_headers.append(headers or {})
+        return self.responses.pop(0)
+
+    def close(self):
+        pass
+
+
+def collect_config(tmp_path, endpoint, output):
+    raw = {
+        "queries": ["focus journal", "deep work"],
+        "engines": [{"name": "searxng", "endpoint": endpoint, "rate_limit_s": 0.0, "pages": 2}],
+        "outputs": {"raw_results": output},
+        "http": {"cache": {"mode": "online", "path": "cache.sqlite", "ttl_s": {"searxng": 600}}},
+    }
+    return Config(raw=raw, path=tmp_path / "config.yaml")
+
+
+def read_rows(path):
+    return [(row["query"], row["source_url"]) for row in map(json.loads, path.read_text().splitlines())]
+
+
+def test_rerun_is_served_from_cache_and_replays_offline(tmp_path):
+    with StubServer({"/search": searxng_route(results_per_page=5)}) as server:
+        endpoint = server.url("/search")
+        run_collect(collect_config(tmp_path, endpoint, "first.jsonl"))
+        assert server.requests == 4
+        run_collect(collect_config(tmp_path, endpoint, "second.jsonl"))
+        assert server.requests == 4
+
+    # The stub is gone: offline replay must not need the network.
+    run_collect(collect_config(tmp_path, endpoint, "offline.jsonl"), offline=True)
+    first = read_rows(tmp_path / "first.jsonl")
+    assert len(first) == 20
+    assert read_rows(tmp_path / "second.jsonl") == first
+    assert read_rows(tmp_path / "offline.jsonl") == first
+
+
+def test_expired_entry_is_revalidated_with_etag(tmp_path):
+    inner = RecordingTransport(
+        [FakeResponse(200, {"ETag": '"v1"', "X-Ratelimit-Remaining": "5"}, b'{"page": 1}'), FakeResponse(304)]
+    )
+    with ResponseCache(tmp_path / "cache.sqlite") as cache:
+        transport = CachingTransport(inner, cache, ttl_s=0.0)
+        transport.get("https://example.com/search", params={"q": "focus"})
+        response = transport.get("https://example.com/search", params={"q": "focus"})
+        assert inner.sent_headers[1] == {"If-None-Match": '"v1"'}
+        assert response.json() == {"page": 1}
+        assert response.headers == {"ETag": '"v1"'}
+        assert cache.revalidated == 1
+
+        offline = CachingTransport(inner, cache, offline=True)
+        with pytest.raises(CacheMissError):
+            offline.get("https://example.com/search", params={"q": "other"})
+
+
+def test_lru_eviction_keeps_recently_used_entries(tmp_path):
+    body = b"x" * 1000
+    with ResponseCache(tmp_path / "cache.sqlite", max_bytes=3500) as cache:
+        for name in ("a", "b", "c"):
+            cache.put(name, f"https://example.com/{name}", 200, {}, body)
+        assert cache.get("a") is not None
+        cache.put("d", "https://example.com/d", 200, {}, body)
+        assert [cache.get(name) is not None for name in "abcd"] == [True, False, True, True]
+        assert cache.size_bytes <= 3500
+
+
+def test_eviction_frees_space_across_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(http_cache, "EVICT_BATCH", 2)
+    with ResponseCache(tmp_path / "cache.sqlite", max_bytes=12_000) as cache:
+        for idx in range(10):
+            cache.put(f"small-{idx}", f"https://example.com/{idx}", 200, {}, b"x" * 1000)
+        cache.put("large", "https://example.com/large", 200, {}, b"y" * 8000)
+        kept = [idx for idx in range(10) if cache.get(f"small-{idx}") is not None]
+        assert kept == [7, 8, 9] and cache.get("large") is not None
+        assert cache.size_bytes <= 12_000 and len(cache) == 4
+
+
+def test_lookup_counters_are_shared_safely_across_threads(tmp_path):
+    with ResponseCache(tmp_path / "cache.sqlite") as cache:
+        workers = [threading.Thread(target=lambda: [cache.record("hit") for _ in range(2000)]) for _ in range(8)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        assert cache.hits == 16_000 and cache.misses == 0
+
+
+def test_cache_key_ignores_param_order_and_types():
+    assert cache_key("https://example.com/search/", {"q": "a", "pageno": 1}) == cache_key(
+        "https://example.com/search", {"pageno": "1", "q": "a"}
+    )
+    assert cache_key("https://example.com/search", {"q": "a"}) != cache_key("https://example.com/search", {"q": "b"})
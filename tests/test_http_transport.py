@@ -0,0 +1,30 @@
+import pytest
+
+pytest.importorskip("requests")
+
+from sandcastle.collector.searxng import SearxNGCollector
+from sandcastle.common.http import HttpSettings, HttpTransport
+from sandcastle.common.http_stub import StubServer, reddit_route, searxng_route
+from sandcastle.reddit.search import RedditSearchClient, iter_posts
+
+
+def test_searxng_pages_reuse_one_connection():
+    transport = HttpTransport(HttpSettings(host_pool_sizes={"127.0.0.1": 2}))
+    with StubServer({"/search": searxng_route(results_per_page=5)}) as server:
+        collector = SearxNGCollector(server.url("/search"), rate_limit_s=0.0, transport=transport)
+        pages = [collector.search_page("focus", limit=3, page=page) for page in range(1, 5)]
+        assert [len(results) for results in pages] == [3, 3, 3, 3]
+        assert server.requests == 4
+        assert server.connections == 1
+    transport.close()
+
+
+def test_reddit_client_is_reused_across_queries():
+    transport = HttpTransport()
+    with StubServer({"/search.json": reddit_route(posts_per_page=4, pages=2)}) as server:
+        client = RedditSearchClient(rate_limit_s=0.0, transport=transport, base_url=server.url("/search.json"))
+        first = list(iter_posts("focus", 3, 0, 0, False, True, client))
+        second = list(iter_posts("planner", 3, 0, 0, False, True, client))
+        assert len(first) == len(second) == 8
+        assert server.connections == 1
+    transport.close()
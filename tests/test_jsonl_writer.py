@@ -0,0 +1,45 @@
+import time
+
+from sandcastle.common.io import JsonlWriter, read_jsonl, write_json, write_json_array
+
+
+def test_writer_buffers_until_row_threshold(tmp_path):
+    path = tmp_path / "rows.jsonl"
+    writer = JsonlWriter(path, flush_rows=3, flush_interval_s=60)
+    writer.write({"id": "a"})
+    writer.write({"id": "b"})
+    assert not path.exists()
+    writer.write({"id": "c"})
+    assert [row["id"] for row in read_jsonl(path)] == ["a", "b", "c"]
+    writer.close()
+
+
+def test_checkpoint_and_close_flush_pending_rows(tmp_path):
+    path = tmp_path / "rows.jsonl"
+    with JsonlWriter(path, flush_rows=100, flush_interval_s=60) as writer:
+        writer.write({"id": "a"})
+        writer.checkpoint()
+        assert [row["id"] for row in read_jsonl(path)] == ["a"]
+        writer.write_many([{"id": "b"}, {"id": "c"}])
+    assert [row["id"] for row in read_jsonl(path)] == ["a", "b", "c"]
+
+
+def test_maybe_flush_writes_rows_once_the_interval_passes(tmp_path):
+    path = tmp_path / "rows.jsonl"
+    writer = JsonlWriter(path, flush_rows=100, flush_interval_s=0.05)
+    writer.write({"id": "a"})
+    writer.maybe_flush()
+    assert not path.exists()
+    time.sleep(0.06)
+    writer.maybe_flush()
+    assert [row["id"] for row in read_jsonl(path)] == ["a"]
+    writer.close()
+
+
+def test_write_json_array_matches_write_json(tmp_path):
+    items = [{"id": "a", "titles": ["x", "y"], "flags": {"blocked": False}}, {"id": "b", "titles": []}]
+    for compact in (False, True):
+        for payload in (items, []):
+            write_json(tmp_path / "list.json", payload, compact=compact)
+            write_json_array(tmp_path / "stream.json", iter(payload), compact=compact)
+            assert (tmp_path / "stream.json").read_bytes() == (tmp_path / "list.json").read_bytes()
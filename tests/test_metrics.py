@@ -0,0 +1,83 @@
+import json
+import logging
+
+import yaml
+
+from sandcastle.cli import main
+from sandcastle.common.io import append_jsonl
+from sandcastle.common.logging import JsonFormatter
+from sandcastle.common.metrics import Metrics, render_prometheus, write_metrics
+
+
+def test_json_formatter_keeps_extra_fields():
+    record = logging.LogRecord("sandcastle", logging.INFO, __file__, 1, "Processing complete", (), None)
+    record.deduped = 12
+    payload = json.loads(JsonFormatter().format(record))
+    assert payload["message"] == "Processing complete"
+    assert payload["deduped"] == 12
+
+
+def test_histograms_counters_and_prometheus_textfile(tmp_path):
+    metrics = Metrics("collect")
+    for seconds in (0.004, 0.03, 0.03, 2.0):
+        metrics.record_request("searxng", 200, seconds)
+    metrics.inc("http_cache_requests_total", source="searxng", result="hit")
+    with metrics.stage("fetch") as stage:
+        stage.rows = 40
+
+    snapshots = write_metrics(metrics, tmp_path / "metrics.json", tmp_path / "metrics.prom")
+    write_metrics(Metrics("process"), tmp_path / "metrics.json")
+    stored = json.loads((tmp_path / "metrics.json").read_text())
+    assert sorted(stored) == ["collect", "process"]
+
+    histogram = snapshots["collect"]["histograms"]["http_request_seconds"][0]
+    assert histogram["labels"] == {"cached": "False", "engine": "searxng"}
+    assert histogram["count"] == 4
+    assert dict((str(bound), count) for bound, count in histogram["buckets"])["0.05"] == 3
+    assert snapshots["collect"]["stages"][0]["rows"] == 40
+
+    text = (tmp_path / "metrics.prom").read_text()
+    assert "# TYPE sandcastle_http_request_seconds histogram" in text
+    assert 'sandcastle_http_request_seconds_bucket{command="collect",cached="False",engine="searxng",le="+Inf"} 4' in text
+    assert 'sandcastle_stage_rows{command="collect",stage="fetch"} 40' in text
+    assert render_prometheus({}) == "\n"
+
+
+def test_process_command_writes_stage_metrics_and_profiles(tmp_path):
+    rows = [
+        {
+            "id": f"row-{idx}",
+            "query": "focus",
+            "engine": "searxng",
+            "source_url": f"https://example.com/{idx % 7}",
+            "title": "focus journal",
+            "snippet": f"deep work planner {idx % 3}",
+            "collected_at": "2024-01-01T00:00:00Z",
+        }
+        for idx in range(30)
+    ]
+    append_jsonl(tmp_path / "raw.jsonl", rows)
+    outputs = {
+        "raw_results": "raw.jsonl",
+        "deduped": "deduped.json",
+        "clusters": "clusters.json",
+        "terms": "terms.json",
+        "quality": "quality.json",
+        "process_state": "state.json",
+    }
+    (tmp_path / "config.yaml").write_text(yaml.safe_dump({"outputs": outputs}))
+
+    main(["process", "--config", str(tmp_path / "config.yaml"), "--profile"])
+
+    snapshot = json.loads((tmp_path / "data" / "metrics.json").read_text())["process"]
+    stages = {stage["name"]: stage for stage in snapshot["stages"]}
+    assert list(stages) == ["dedupe", "cluster", "terms", "write"]
+    assert stages["dedupe"]["rows"] == 30
+    assert stages["dedupe"]["rows_per_s"] > 0
+    assert snapshot["counters"]["dedupe_comparisons_total"][0]["value"] > 0
+    assert sorted(path.name for path in (tmp_path / "data" / "profiles").iterdir()) == [
+        "process.cluster.pstats",
+        "process.dedupe.pstats",
+        "process.terms.pstats",
+        "process.write.pstats",
+    ]
@@ -0,0 +1,42 @@
+import pytest
+
+from sandcastle.common.text import shingles
+from sandcastle.processor.minhash import (
+    LSHIndex,
+    LSHParams,
+    MinHasher,
+    estimate_similarity,
+    hash_shingle,
+    jaccard_similarity,
+)
+
+
+def _signature(hasher: MinHasher, text: str) -> tuple[int, ...]:
+    return hasher.signature(hash_shingle(shingle) for shingle in shingles(text))
+
+
+def test_signature_is_seeded_and_deterministic():
+    text = "deep focus journal printable with daily prompts"
+    assert _signature(MinHasher(64, seed=7), text) == _signature(MinHasher(64, seed=7), text)
+    assert _signature(MinHasher(64, seed=7), text) != _signature(MinHasher(64, seed=8), text)
+
+
+def test_estimate_tracks_exact_jaccard():
+    hasher = MinHasher(256)
+    text_a = "focus journal tips for deep work and daily planning routines"
+    text_b = "focus journal tips for deep work and weekly planning routines"
+    estimate = estimate_similarity(_signature(hasher, text_a), _signature(hasher, text_b))
+    assert abs(estimate - jaccard_similarity(text_a, text_b)) < 0.15
+
+
+def test_lsh_index_returns_bucket_candidates_only():
+    hasher = MinHasher(128)
+    index = LSHIndex(bands=16, rows=8)
+    assert index.insert("a", _signature(hasher, "gratitude journal printable pages")) == []
+    assert index.insert("b", _signature(hasher, "gratitude journal printable pages")) == ["a"]
+    assert index.insert("c", _signature(hasher, "shadow work prompts inner child healing")) == []
+
+
+def test_params_reject_oversized_bands():
+    with pytest.raises(ValueError):
+        LSHParams(num_perm=32, bands=8, rows=8)
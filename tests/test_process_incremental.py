@@ -0,0 +1,136 @@
+import json
+import random
+
+from sandcastle.common.io import append_jsonl
+from sandcastle.config import Config
+from sandcastle.processor.dedupe import DedupeIndex
+from sandcastle.processor.run import run_process
+
+WORDS = ["focus", "deep", "work", "journal", "gratitude", "shadow", "healing", "adhd", "planner", "printable"]
+CLUSTERS = [
+    {"cluster_id": "focus_journal", "label": "Focus", "keywords": ["focus", "deep work"]},
+    {"cluster_id": "gratitude", "label": "Gratitude", "keywords": ["gratitude"]},
+    {"cluster_id": "shadow_work", "label": "Shadow", "keywords": ["shadow", "healing"]},
+]
+OUTPUTS = ["deduped", "clusters", "terms", "quality"]
+
+
+def _rows(count, seed):
+    rng = random.Random(seed)
+    rows = []
+    for idx in range(count):
+        rows.append(
+            {
+                "id": f"{seed}-{idx:04d}",
+                "source_url": f"https://example.com/{rng.randrange(count)}",
+                "title": " ".join(rng.choice(WORDS) for _ in range(3)),
+                "snippet": " ".join(rng.choice(WORDS) for _ in range(8)),
+                "query": "focus",
+                "engine": "searxng",
+                "collected_at": f"2024-01-{rng.randrange(1, 28):02d}T00:00:00Z",
+            }
+        )
+    return rows
+
+
+def _config(base):
+    outputs = {name: f"{name}.json" for name in OUTPUTS}
+    outputs.update({"raw_results": "raw.jsonl", "process_state": "state.json"})
+    raw = {"outputs": outputs, "clustering": {"clusters": CLUSTERS}}
+    return Config(raw=raw, path=base / "config.yaml")
+
+
+def _read_outputs(base):
+    return {name: json.loads((base / f"{name}.json").read_text()) for name in OUTPUTS}
+
+
+def test_incremental_matches_full_rebuild(tmp_path):
+    config = _config(tmp_path)
+    raw_path = tmp_path / "raw.jsonl"
+    for seed in range(3):
+        append_jsonl(raw_path, _rows(60, seed))
+        run_process(config)
+    incremental = _read_outputs(tmp_path)
+    assert json.loads((tmp_path / "state.json").read_text())["offset"] == raw_path.stat().st_size
+
+    run_process(config, full_rebuild=True)
+    assert _read_outputs(tmp_path) == incremental
+    assert incremental["quality"]["summary"]["raw_count"] == 180
+
+
+def test_rewritten_raw_file_triggers_rebuild(tmp_path):
+    config = _config(tmp_path)
+    raw_path = tmp_path / "raw.jsonl"
+    append_jsonl(raw_path, _rows(40, 0))
+    run_process(config)
+    raw_path.unlink()
+    append_jsonl(raw_path, _rows(50, 1))
+    run_process(config)
+    assert _read_outputs(tmp_path)["quality"]["summary"]["raw_count"] == 50
+
+
+def test_tiny_shingle_cache_reads_rows_back_from_disk(tmp_path):
+    config = _config(tmp_path)
+    append_jsonl(tmp_path / "raw.jsonl", _rows(120, 4))
+    run_process(config)
+    expected = _read_outputs(tmp_path)
+
+    config.raw["dedupe"] = {"shingle_cache": 1}
+    run_process(config, full_rebuild=True)
+    assert _read_outputs(tmp_path) == expected
+
+
+def test_worker_pool_matches_single_process(tmp_path):
+    config = _config(tmp_path)
+    append_jsonl(tmp_path / "raw.jsonl", _rows(1500, 5))
+    run_process(config)
+    expected = _read_outputs(tmp_path)
+
+    run_process(config, full_rebuild=True, workers=2)
+    assert _read_outputs(tmp_path) == expected
+
+
+def test_garbage_lines_between_rows_do_not_break_rereads(tmp_path):
+    config = _config(tmp_path)
+    raw_path = tmp_path / "raw.jsonl"
+    rows = _rows(80, 6)
+    # Each of the first rows follows a malformed and a schema-invalid line; their copies under other URLs come last.
+    for row in rows[:20]:
+        with raw_path.open("ab") as handle:
+            handle.write(b'{"id": "broken\n{"id": 5}\n')
+        append_jsonl(raw_path, [row])
+    append_jsonl(raw_path, rows[20:])
+    copies = [dict(row, id=f"dup-{idx}", source_url=f"https://mirror.example.org/{idx}") for idx, row in enumerate(rows[:20])]
+    append_jsonl(raw_path, copies)
+
+    run_process(config)
+    expected = _read_outputs(tmp_path)
+    assert expected["quality"]["summary"]["raw_count"] == 100
+    assert len(expected["deduped"]) <= 80
+    for dedupe in ({"verify": False}, {"shingle_cache": 1}, {"verify": False, "shingle_cache": 1}):
+        config.raw["dedupe"] = dedupe
+        run_process(config, full_rebuild=True)
+        assert _read_outputs(tmp_path) == expected
+
+
+def test_unverified_dedupe_keeps_signatures_across_runs(tmp_path, monkeypatch):
+    config = _config(tmp_path)
+    config.raw["dedupe"] = {"verify": False}
+    raw_path = tmp_path / "raw.jsonl"
+    rows = _rows(60, 7)
+    copies = [dict(row, id=f"dup-{idx}", source_url=f"https://mirror.example.org/{idx}") for idx, row in enumerate(rows)]
+    append_jsonl(raw_path, rows)
+    run_process(config)
+    append_jsonl(raw_path, copies)
+
+    def no_reread(self, item_id):
+        raise AssertionError(f"re-read {item_id}")
+
+    # Candidates are scored from the stored signatures; nothing is read back from the raw log.
+    monkeypatch.setattr(DedupeIndex, "_item_text", no_reread)
+    run_process(config)
+    incremental = _read_outputs(tmp_path)
+    monkeypatch.undo()
+    run_process(config, full_rebuild=True)
+    assert _read_outputs(tmp_path) == incremental
+    assert len(incremental["deduped"]) <= 60
@@ -0,0 +1,79 @@
+import time
+
+from sandcastle.common.rate_limit import TokenBucket, parse_retry_after
+from sandcastle.reddit.search import RedditSearchClient
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None, payload=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.payload = payload or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def json(self):
+        return self.payload
+
+
+class FakeTransport:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.calls += 1
+        return self.responses.pop(0)
+
+    def close(self):
+        pass
+
+
+def test_burst_then_steady_rate():
+    bucket = TokenBucket(rate=20.0, capacity=3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.acquire() > 0.0
+
+
+def test_429_halves_rate_and_honours_retry_after():
+    bucket = TokenBucket(rate=100.0)
+    assert not bucket.handle_response(429, {"Retry-After": "0.2"})
+    assert bucket._state.rate == 50.0
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.15
+    bucket.handle_response(200, {})
+    assert bucket._state.rate == 60.0
+
+
+def test_quota_headers_set_rate_and_pause_when_exhausted():
+    bucket = TokenBucket(rate=10.0)
+    bucket.handle_response(200, {"X-Ratelimit-Remaining": "30", "X-Ratelimit-Reset": "60"})
+    assert bucket._state.rate == 0.625
+    bucket.handle_response(200, {"X-Ratelimit-Remaining": "0", "X-Ratelimit-Reset": "5"})
+    assert bucket._state.blocked_until > time.time() + 4
+
+
+def test_state_file_is_shared_between_buckets(tmp_path):
+    first = TokenBucket(rate=1000.0, state_path=tmp_path / "bucket.json")
+    second = TokenBucket(rate=1000.0, state_path=tmp_path / "bucket.json")
+    first.penalize(retry_after=0.2)
+    start = time.monotonic()
+    second.acquire()
+    assert time.monotonic() - start >= 0.15
+
+
+def test_retry_after_accepts_http_dates():
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT", now=1445412470.0) == 10.0
+    assert parse_retry_after("garbage") is None
+
+
+def test_reddit_client_retries_after_429():
+    transport = FakeTransport(
+        [FakeResponse(429, {"Retry-After": "0"}), FakeResponse(200, payload={"data": {"children": []}})]
+    )
+    client = RedditSearchClient(rate_limit_s=0.0, transport=transport)
+    assert client.search("focus", limit=10) == {"data": {"children": []}}
+    assert transport.calls == 2
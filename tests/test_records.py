@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from sandcastle.common.records import (
+    RawRow,
+    RecordDecoder,
+    RecordError,
+    RedditPostRow,
+    convert_records,
+    read_records,
+    record_from_dict,
+)
+
+ROW = (
+    '{"id": "a", "query": "focus", "engine": "searxng", "rank": 1, "source_url": "https://example.com",'
+    ' "title": "Guide", "snippet": "Great guide", "collected_at": "2024-01-01T00:00:00Z", "extra": true}'
+)
+
+
+def test_read_records_counts_malformed_and_invalid_rows(tmp_path):
+    path = tmp_path / "raw.jsonl"
+    path.write_text("\n".join([ROW, "{not json", '{"id": "b"}', ROW.replace('"rank": 1', '"rank": "1"')]) + "\n")
+    decoder = RecordDecoder(RawRow)
+    records = [record for record, _ in read_records(path, decoder)]
+    assert [record.id for record in records] == ["a"]
+    assert isinstance(records[0], RawRow)
+    assert (decoder.stats.rows, decoder.stats.malformed, decoder.stats.invalid) == (1, 1, 2)
+
+
+def test_unterminated_trailing_line_is_left_for_next_read(tmp_path):
+    path = tmp_path / "raw.jsonl"
+    path.write_text(ROW + "\n" + ROW[:20])
+    decoder = RecordDecoder(RawRow)
+    offsets = [offset for _, offset in read_records(path, decoder)]
+    assert offsets == [len(ROW) + 1]
+    assert decoder.stats.malformed == 0
+
+
+def test_record_from_dict_validates_schema():
+    with pytest.raises(RecordError):
+        record_from_dict(RedditPostRow, {"id": "a"})
+    with pytest.raises(RecordError):
+        record_from_dict(RawRow, {"id": "a", "query": "q", "engine": "e", "source_url": "u", "title": "t",
+                                  "snippet": "s", "collected_at": "c", "rank": True})
+    row = record_from_dict(RawRow, {"id": "a", "query": "q", "engine": "e", "source_url": "u", "title": "t",
+                                    "snippet": "s", "collected_at": "c"})
+    assert row.rank == 0 and row.meta == {}
+    assert not hasattr(row, "__dict__")
+
+
+def test_convert_records_skips_rows_like_the_file_reader(tmp_path):
+    rows = [json.loads(ROW), {"id": "b"}, json.loads(ROW.replace('"rank": 1', '"rank": "1"')), "not a row"]
+    path = tmp_path / "raw.jsonl"
+    path.write_text("\n".join(json.dumps(row) for row in rows) + "\n")
+    for typed in (True, False):
+        from_file = RecordDecoder(RawRow)
+        in_memory = RecordDecoder(RawRow)
+        if not typed:
+            from_file._typed = in_memory._typed = None  # the plain-codec path used without msgspec
+        assert list(convert_records(rows, in_memory)) == [record for record, _ in read_records(path, from_file)]
+        assert (in_memory.stats.rows, in_memory.stats.invalid) == (from_file.stats.rows, from_file.stats.invalid)
+        assert (in_memory.stats.rows, in_memory.stats.invalid) == (1, 3)
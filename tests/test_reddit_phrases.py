@@ -0,0 +1,88 @@
+import json
+from collections import Counter
+
+from benchmarks.synthetic import REFERENCE_UTC, CorpusSpec, iter_reddit_posts
+from sandcastle.common.io import append_jsonl
+from sandcastle.common.records import RecordDecoder, RedditPostRow, read_records
+from sandcastle.common.time import now_timestamp
+from sandcastle.config import Config
+from sandcastle.reddit.phrases import PhraseStore, extract_phrases, load_phrase_store, save_phrase_store
+from sandcastle.reddit.run import build_intents, intents_from_store, run_reddit
+from sandcastle.reddit.windows import DAY_S, build_windows
+
+
+def _catch_up(tmp_path, posts_path):
+    store = load_phrase_store(tmp_path / "phrases.json", posts_path)
+    added = store.catch_up(posts_path)
+    save_phrase_store(tmp_path / "phrases.json", store)
+    return store, added
+
+
+def test_store_only_reads_appended_posts_and_matches_full_rebuild(tmp_path):
+    posts = list(iter_reddit_posts(CorpusSpec(rows=300, duplicate_rate=0.4)))
+    posts_path = tmp_path / "posts.jsonl"
+    append_jsonl(posts_path, posts[:200])
+    _, added = _catch_up(tmp_path, posts_path)
+    assert added == 200
+
+    append_jsonl(posts_path, posts[200:])
+    store, added = _catch_up(tmp_path, posts_path)
+    assert added == 100
+    assert store.posts == 300
+
+    decoded = (post for post, _ in read_records(posts_path, RecordDecoder(RedditPostRow)))
+    full = build_intents(decoded, now=REFERENCE_UTC)
+    assert intents_from_store(store, now=REFERENCE_UTC) == full
+    assert sum(sum(intent["evidence_counts"].values()) for intent in full["intents"]) > 0
+
+
+def test_rewritten_posts_file_rebuilds_the_store(tmp_path):
+    posts = list(iter_reddit_posts(CorpusSpec(rows=40)))
+    posts_path = tmp_path / "posts.jsonl"
+    append_jsonl(posts_path, posts[:30])
+    _catch_up(tmp_path, posts_path)
+
+    posts_path.unlink()
+    append_jsonl(posts_path, posts[10:])
+    store, added = _catch_up(tmp_path, posts_path)
+    assert added == 30
+    assert store.posts == 30
+
+
+def test_window_counts_match_per_post_assignment_for_custom_windows():
+    posts = [RedditPostRow(**post) for post in iter_reddit_posts(CorpusSpec(rows=500))]
+    store = PhraseStore()
+    for post in posts:
+        store.add(post)
+    windows = build_windows(["7d", "2w", {"label": "quarter", "days": 90}, "365d", "bogus"])
+    assert [(window.label, window.days) for window in windows] == [("7d", 7), ("2w", 14), ("quarter", 90), ("365d", 365)]
+
+    phrase = max(store.phrases(), key=lambda phrase: sum(store.days[phrase].values()))
+    expected = Counter()
+    today = REFERENCE_UTC // DAY_S
+    for post in posts:
+        if phrase in extract_phrases(f"{post.title} {post.selftext}"):
+            age = today - post.created_utc // DAY_S
+            label = next((window.label for window in windows if 0 <= age < window.days), None)
+            if label:
+                expected[label] += 1
+    assert store.window_counts([phrase], windows, REFERENCE_UTC) == dict(expected)
+    assert sum(expected.values()) > 1
+
+
+def test_changed_windows_apply_without_fetching(tmp_path):
+    posts_path = tmp_path / "posts.jsonl"
+    now = now_timestamp()
+    rows = list(iter_reddit_posts(CorpusSpec(rows=60)))
+    for row in rows:
+        row["created_utc"] += now - REFERENCE_UTC
+    append_jsonl(posts_path, rows)
+    raw = {
+        "outputs": {"reddit_posts": "posts.jsonl", "reddit_intents": "intents.json", "reddit_phrases": "phrases.json"},
+        "reddit": {"endpoint": "http://127.0.0.1:9/unreachable", "windows": ["30d", "365d"]},
+    }
+    run_reddit(Config(raw=raw, path=tmp_path / "config.yaml"), fetch=False)
+    intents = json.loads((tmp_path / "intents.json").read_text())
+    labels = {label for intent in intents["intents"] for label in intent["evidence_counts"]}
+    assert labels == {"30d", "365d"}
+    assert intents["rules"]["structural_if"].startswith("evidence in >=2 windows including one of {365d}")
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+pytest.importorskip("requests")
+
+from sandcastle.common.http_stub import StubServer, reddit_route
+from sandcastle.common.time import now_timestamp
+from sandcastle.config import Config
+from sandcastle.reddit.run import run_reddit
+
+
+def test_each_query_is_fetched_once_and_bucketed_into_windows(tmp_path):
+    route = reddit_route(posts_per_page=10, pages=10, newest_utc=now_timestamp(), step_s=86_400 - 7)
+    with StubServer({"/search.json": route}) as server:
+        raw = {
+            "outputs": {"reddit_posts": "posts.jsonl", "reddit_intents": "intents.json"},
+            "reddit": {
+                "endpoint": server.url("/search.json"),
+                "rate_limit_s": 0.0,
+                "queries": ["focus journal"],
+                "windows": ["14d", "60d"],
+                "filters": {"max_pages": 10},
+            },
+        }
+        run_reddit(Config(raw=raw, path=tmp_path / "config.yaml"))
+        # Page 7 reaches past the 60d bound, so pagination stops there instead of fetching 10 pages per window.
+        assert server.requests == 7
+
+    rows = [json.loads(line) for line in (tmp_path / "posts.jsonl").read_text().splitlines()]
+    labels = [row["window"] for row in rows]
+    assert labels == ["14d"] * 15 + ["60d"] * 46
+    assert len({row["id"] for row in rows}) == len(rows)
@@ -0,0 +1,56 @@
+from sandcastle.common.hash import sha256_text
+from sandcastle.common.io import JsonlWriter, append_jsonl
+from sandcastle.common.seen import SeenIndex
+
+
+def _row(idx):
+    return {"id": sha256_text(f"row-{idx}"), "title": f"row {idx}"}
+
+
+def test_index_survives_reopen_and_catches_up(tmp_path):
+    path = tmp_path / "raw.jsonl"
+    append_jsonl(path, [_row(idx) for idx in range(5)])
+    with SeenIndex(path) as seen, JsonlWriter(path) as writer:
+        assert len(seen) == 5
+        assert not seen.add(_row(0)["id"])
+        assert seen.add(_row(5)["id"])
+        writer.write(_row(5))
+    append_jsonl(path, [_row(6)])
+
+    with SeenIndex(path) as seen:
+        assert len(seen) == 7
+        assert all(_row(idx)["id"] in seen for idx in range(7))
+        assert _row(7)["id"] not in seen
+
+
+def test_rewritten_file_rebuilds_index(tmp_path):
+    path = tmp_path / "raw.jsonl"
+    append_jsonl(path, [_row(idx) for idx in range(5)])
+    SeenIndex(path).close()
+    path.unlink()
+    append_jsonl(path, [_row(idx) for idx in range(10, 12)])
+    with SeenIndex(path) as seen:
+        assert len(seen) == 2
+        assert _row(0)["id"] not in seen
+
+
+def test_snapshot_ignores_ids_added_after_it(tmp_path):
+    with SeenIndex(tmp_path / "raw.jsonl") as seen:
+        seen.add(_row(0)["id"])
+        snapshot = seen.snapshot()
+        seen.add(_row(1)["id"])
+        assert _row(0)["id"] in snapshot
+        assert _row(1)["id"] not in snapshot
+        assert _row(1)["id"] in seen
+
+
+def test_failed_run_does_not_commit_ids(tmp_path):
+    path = tmp_path / "raw.jsonl"
+    try:
+        with SeenIndex(path) as seen:
+            seen.add(_row(0)["id"])
+            raise RuntimeError("collector crashed")
+    except RuntimeError:
+        pass
+    with SeenIndex(path) as seen:
+        assert _row(0)["id"] not in seen
@@ -0,0 +1,155 @@
+import gzip
+from pathlib import Path
+
+import pytest
+
+from benchmarks.synthetic import CorpusSpec, iter_web_rows
+from sandcastle.common import segments
+from sandcastle.common.io import JsonlWriter, append_jsonl, file_checkpoint, iter_jsonl_lines, read_jsonl
+from sandcastle.common.segments import (
+    LogReader,
+    StorageSettings,
+    load_manifest,
+    log_size,
+    read_segment,
+    roll_segment,
+    save_manifest,
+    segments_dir,
+    set_storage,
+)
+
+
+@pytest.fixture
+def storage():
+    def configure(**section):
+        return set_storage(StorageSettings.from_config({"compression": "gzip", **section}))
+
+    yield configure
+    set_storage(StorageSettings())
+
+
+def _rows(count):
+    rows = list(iter_web_rows(CorpusSpec(rows=count)))
+    for idx, row in enumerate(rows):
+        row["collected_at"] = f"2024-01-{1 + idx // 100:02d}T00:00:{idx % 60:02d}+00:00"
+    return rows
+
+
+def test_segmented_log_reads_like_the_plain_file(tmp_path, storage):
+    rows = _rows(600)
+    plain = tmp_path / "plain.jsonl"
+    append_jsonl(plain, rows)
+
+    storage(segment_mb=0.02, workers=3)
+    log = tmp_path / "raw.jsonl"
+    for start in range(0, len(rows), 50):
+        append_jsonl(log, rows[start:start + 50])
+
+    manifest = load_manifest(log)
+    assert len(manifest.segments) >= 3
+    assert sum(segment.rows for segment in manifest.segments) + len(log.read_text().splitlines()) == 600
+    first = manifest.segments[0]
+    assert first.min_collected_at == rows[0]["collected_at"]
+    assert gzip.decompress((segments_dir(log) / first.name).read_bytes()).startswith(plain.read_bytes()[:100])
+
+    assert list(read_jsonl(log)) == rows
+    assert log_size(log) == plain.stat().st_size
+    # Logical offsets, checkpoints and random reads match the single plain file, so offset-based state carries over.
+    assert list(iter_jsonl_lines(log)) == list(iter_jsonl_lines(plain))
+    middle = list(iter_jsonl_lines(plain))[333][1]
+    assert list(iter_jsonl_lines(log, middle)) == list(iter_jsonl_lines(plain, middle))
+    for segment in manifest.segments:
+        for offset in (segment.end, segment.end - 7, middle):
+            assert file_checkpoint(log, offset) == file_checkpoint(plain, offset)
+    with LogReader(log) as reader, plain.open("rb") as handle:
+        for segment in manifest.segments:
+            handle.seek(segment.start)
+            assert reader.read_line(segment.start) == handle.readline()
+
+
+def test_readers_skip_sealed_segments(tmp_path, storage, monkeypatch):
+    storage(segment_mb=0.02)
+    log = tmp_path / "raw.jsonl"
+    rows = _rows(600)
+    for start in range(0, len(rows), 100):
+        append_jsonl(log, rows[start:start + 100])
+    tail = {"id": "tail", "collected_at": "2024-02-01T00:00:00+00:00"}
+    append_jsonl(log, [tail])
+    manifest = load_manifest(log)
+
+    opened = []
+    original = segments.read_segment
+    monkeypatch.setattr(segments, "read_segment", lambda path, segment: opened.append(segment.name) or original(path, segment))
+    assert [row["id"] for row in read_jsonl(log, since="2024-01-05")] == [row["id"] for row in rows[400:]] + ["tail"]
+    assert all(segment.max_collected_at >= "2024-01-05" for segment in manifest.segments if segment.name in opened)
+    assert len(opened) < len(manifest.segments)
+
+    opened.clear()
+    unsealed = list(iter_jsonl_lines(log, manifest.sealed_bytes))
+    assert opened == []
+    assert unsealed == [entry for entry in iter_jsonl_lines(log) if entry[1] > manifest.sealed_bytes]
+    assert [entry[0] for entry in unsealed] == log.read_bytes().splitlines()
+
+
+def test_roll_streams_the_active_file_into_line_aligned_segments(tmp_path, storage, monkeypatch):
+    log = tmp_path / "raw.jsonl"
+    rows = _rows(600)
+    append_jsonl(log, rows)
+    size = log.stat().st_size
+    settings = storage(segment_mb=0.02)
+
+    original = Path.read_bytes
+    monkeypatch.setattr(Path, "read_bytes", lambda path: pytest.fail("read whole log") if path == log else original(path))
+    assert roll_segment(log) is not None
+    monkeypatch.undo()
+
+    manifest = load_manifest(log)
+    assert len(manifest.segments) >= 2
+    assert all(settings.segment_bytes <= segment.size < settings.segment_bytes + 1024 for segment in manifest.segments)
+    assert all(read_segment(log, segment).endswith(b"\n") for segment in manifest.segments)
+    assert 0 < log.stat().st_size < settings.segment_bytes and manifest.tail_offset == 0
+    assert sum(segment.rows for segment in manifest.segments) + len(log.read_bytes().splitlines()) == 600
+    assert log_size(log) == size
+    assert list(read_jsonl(log)) == rows
+
+
+def test_writer_rolls_at_checkpoint_and_interrupted_roll_recovers(tmp_path, storage):
+    storage(segment_mb=0.01)
+    log = tmp_path / "raw.jsonl"
+    rows = _rows(300)
+    with JsonlWriter(log, flush_rows=1000, flush_interval_s=60) as writer:
+        for start in range(0, 300, 60):
+            writer.write_many(rows[start:start + 60])
+            writer.checkpoint()
+    assert len(load_manifest(log).segments) >= 2
+    assert list(read_jsonl(log)) == rows
+
+    # Simulate a crash after the segment was recorded but before the active file was emptied.
+    storage(segment_mb=1)
+    append_jsonl(log, rows[:40])
+    size = log_size(log)
+    sealed = roll_segment(log, force=True)
+    manifest = load_manifest(log)
+    log.write_bytes(gzip.decompress((segments_dir(log) / sealed.name).read_bytes()))
+    manifest.tail_offset = sealed.size
+    save_manifest(log, manifest)
+    assert log_size(log) == size
+    assert list(read_jsonl(log)) == rows + rows[:40]
+
+    append_jsonl(log, rows[40:41])
+    assert load_manifest(log).tail_offset == 0
+    assert list(read_jsonl(log)) == rows + rows[:41]
+
+
+def test_daily_roll_starts_a_segment_per_day(tmp_path, storage):
+    storage(roll="daily")
+    log = tmp_path / "posts.jsonl"
+    old = _rows(20)
+    append_jsonl(log, old)
+    assert load_manifest(log) is None or len(load_manifest(log).segments) == 1
+
+    append_jsonl(log, [{"id": "today", "collected_at": "2999-01-01T00:00:00+00:00"}])
+    manifest = load_manifest(log)
+    assert [segment.rows for segment in manifest.segments] == [20]
+    assert manifest.segments[0].max_collected_at == old[-1]["collected_at"]
+    assert [row["id"] for row in read_jsonl(log)][-1] == "today"
@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+from sandcastle.common.text import top_bigrams, top_terms
+from sandcastle.processor import terms as terms_module
+from sandcastle.processor.analysis import analyze_items
+from sandcastle.processor.terms import build_terms
+
+
+def _reference(items, clusters):
+    analyses = analyze_items(items)
+    cluster_terms = {}
+    for cluster in clusters["clusters"]:
+        tokens = [token for item_id in cluster["items"] if item_id in analyses for token in analyses[item_id].tokens]
+        cluster_terms[cluster["cluster_id"]] = {
+            "top_terms": [{"term": term, "count": count} for term, count in top_terms(tokens, limit=20)],
+            "top_bigrams": [{"bigram": bigram, "count": count} for bigram, count in top_bigrams(tokens, limit=20)],
+        }
+    return {"cluster_terms": cluster_terms}
+
+
+@pytest.mark.parametrize("vectorised", [True, False])
+def test_build_terms_matches_counter_most_common(monkeypatch, vectorised):
+    if not vectorised:
+        monkeypatch.setattr(terms_module, "np", None)
+    elif terms_module.np is None:
+        pytest.skip("numpy not installed")
+    rng = random.Random(11)
+    words = [f"w{idx}" for idx in range(60)]
+    items = [
+        {"id": f"{idx:03d}", "titles": [" ".join(rng.choice(words) for _ in range(rng.randint(0, 6)))], "snippets": []}
+        for idx in range(120)
+    ]
+    ids = [item["id"] for item in items]
+    clusters = {
+        "clusters": [
+            {"cluster_id": f"c{idx}", "items": sorted(rng.sample(ids, rng.randint(0, 30)) + ["missing"])}
+            for idx in range(12)
+        ]
+    }
+    assert build_terms(items, clusters) == _reference(items, clusters)